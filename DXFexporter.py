@@ -58,13 +58,21 @@ def EasyEDAlayerName(layer:int=0, totalLayers:int=2) -> str:
     else: # if its an inner layer
         return('Inner'+str(layer)) # e.g. 'Inner1', 'Inner2' for a 4-layer PCB
 
-def saveDXF(coil: 'coilClass', DXFoutputFormat: str) -> list[str]:
+defaultChordTolerance: float = 0.01 # (mm) the maximum deviation of the exported lines from the true curve (for circular coils), same as PCBcoilV2.chordToleranceDefault
+useArcsDefault: bool = False # export circular coils as arcs (bulges) instead of (many) straight lines. NOTE: i have not yet tested whether EasyEDA's DXF importer handles bulges
+useOutlineDefault: bool = False # export the (closed) copper outline instead of the centerline. NOTE: EasyEDA imports every line as a track (of the width you enter), so this is only useful for other software
+
+def saveDXF(coil: 'coilClass', DXFoutputFormat: str, chordTolerance: float = defaultChordTolerance, useArcs: bool = useArcsDefault, useOutline: bool = useOutlineDefault) -> list[str]:
     """ generates and saves a .dxf file to be imported in the software of your choosing (DXFoutputFormat)
+        circular coils are exported with the fewest lines that stay within chordTolerance (mm) of the true curve,
+         or, if useArcs, as a 2D polyline of arcs (bulge-encoded vertices, within the same tolerance), which is ~10x smaller
+        if useOutline, the copper outline (see coilClass.renderAsPolygon()) is exported as a closed polyline, instead of the centerline (useArcs is ignored)
         returns: a list of the names of the files it made """
     filenames: list[str] = []
     if(DXFoutputFormat not in DXFoutputFormats):  print("makeDXF() output format:", DXFoutputFormat, " not in list:", DXFoutputFormats);  return(filenames)
     if(DXFoutputFormat == 'EasyEDA'): # EasyEDA
-        renderedCoils: list[list[tuple[float,float]]] = [coil.renderAsCoordinateList(False), coil.renderAsCoordinateList(True)]
+        renderedCoils: 'renderedCoilClass' = coil.render(chordTolerance=chordTolerance) # renderedCoils[0] and [1] are (N,2) arrays, dxf.polyline() accepts those just fine
+        outlinePolygons: list['np.ndarray'] = (renderedCoils.asPolygons(coil.traceWidth, coil.layers) if useOutline else None) # (same as coil.renderAsPolygon(), but from the same render, and only once)
         try: # the code should not hang on something so trivial as a filename
             filenames: list[str] = [(DXFoutputFormat+'_'+coil.generateCoilFilename()+'_')  for i in range(min(coil.layers, 2))] # from PCBcoilV2 onwards, this is the proper way to do it
         except:
@@ -81,7 +89,17 @@ def saveDXF(coil: 'coilClass', DXFoutputFormat: str) -> list[str]:
             # for j in range(1, len(renderedCoils[i%2])):
             #     dxfFile.add(dxf.line(renderedCoils[i%2][j-1], renderedCoils[i%2][j], layer=layerName, thickness=coil.traceWidth)) # NOTE: EasyEDA ignores all parameters except position
             ## or you can just add it as a long (continuous) line
-            dxfFile.add(dxf.polyline(renderedCoils[i%2], layer=layerName, thickness=coil.traceWidth, startwidth=coil.traceWidth, endwidth=coil.traceWidth)) # NOTE: EasyEDA ignores all parameters except position
+            if(useOutline):
+                polyline = dxf.polyline(outlinePolygons[i].tolist(), layer=layerName, flags=0) # (2D)
+                polyline.close()
+                dxfFile.add(polyline)
+            elif(useArcs): # DXF R12 has no LWPOLYLINE, but a 2D POLYLINE (flags=0) can have a bulge on each vertex
+                polyline = dxf.polyline(layer=layerName, flags=0, thickness=coil.traceWidth, startwidth=coil.traceWidth, endwidth=coil.traceWidth)
+                for (x, y, bulge) in coil.renderAsArcs((i%2)!=0, chordTolerance).tolist():
+                    polyline.add_vertex((x, y), bulge=bulge)
+                dxfFile.add(polyline)
+            else:
+                dxfFile.add(dxf.polyline(renderedCoils[i%2], layer=layerName, thickness=coil.traceWidth, startwidth=coil.traceWidth, endwidth=coil.traceWidth)) # NOTE: EasyEDA ignores all parameters except position
             dxfFile.save()
         # ## now generate a little silkscreen to identify the coil:     NOTE: can't, cause EasyEDA ignores text...
         # filenames.append( generateCoilFilename(coil)+'_silkscreen'+'.dxf' )
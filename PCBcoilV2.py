@@ -9,16 +9,19 @@ For details on these test samples i analyzed, please refer to the documentation/
 
 I am not the first to try this, and others have already done this BETTER: 
 - (probably better alternative solution) https://www.mdpi.com/1424-8220/21/14/4864      <-- models every single line segment using Maxwell equations (like a nerd). Probably more accurate than this though
+    (a similar segment-level calculation is now available as formula='greenhouse', see segmentInductance.py. It's a lot slower, but not limited to the range the paper[1] coefficients were fitted for)
 
 in the making of this code, i used these papers:
 paper[1] @ https://stanford.edu/~boyd/papers/pdf/inductance_expressions.pdf     which is applied for demo purposes @ https://coil32.net/pcb-coil.html
 paper[2] @ http://www.edatop.com/down/paper/NFC/A_new_calculation_for_designing_multilayer_planar_spiral_inductors_PDF.pdf
 paper[3] @ https://www.researchgate.net/publication/271291453_Design_and_Optimization_of_Printed_Circuit_Board_Inductors_for_Wireless_Power_Transfer_System
-UNUSED (for now): paper[4] @ https://inpressco.com/wp-content/uploads/2017/10/Paper26.1835-1841.pdf
+paper[4] @ https://inpressco.com/wp-content/uploads/2017/10/Paper26.1835-1841.pdf
 
 the single-layer math comes from paper[1]
 the multilayer coil calculations originally came from paper[2] and paper[3], but now come from a formula based on my own samples
-(paper[4] may provide an altermate calculation for mutual inductance, but that code is currently unfinished)
+(the constants of that formula, and the formula coefficients, can be refitted to new measurements with calibration.py, and loaded with loadCoefficientSet())
+(paper[4] provides an alternate calculation for mutual inductance, which can be selected with multilayerFormula='paper4')
+besides L and (DC) R, there are (simple) estimates of the parasitic capacitance (and self-resonant frequency) and of the AC resistance (skin and proximity effect) and Q factor at a given frequency
 
 the current sheet formula from paper[1] is also mentioned in paper[2] and paper[3], which gives some confidence to prefer that method
 the coefficients tables are exactly the same, as they all draw from another paper, under the name 'Greenhouse'
@@ -42,12 +45,16 @@ TODO list:
 
 import numpy as np
 from typing import Callable # just for type-hints to provide some nice syntax colering
+import functools # used for functools.wraps()
+import inspect # used for inspect.signature()
 import time # used for time.sleep()
+import os # used for os.environ (see instrumentation.py)
 
 visualization = True # if you don't have pygame, you can still use the math
 saveToFile = True # if visualization == False! (if True, then just use 's' key)
 
 angleRenderResDefault = np.deg2rad(5) # angular resolution when rendering continous (circular) coils
+chordToleranceDefault = 0.01 # (mm) the maximum deviation from the true curve when exporting continous (circular) coils (the angular resolution is then picked per turn, see circularSpiral.calcAnglesForChordTolerance())
 rotateNthDimSpirals = True
 
 ## scientific constants:
@@ -57,6 +64,8 @@ ozCopperToMM: Callable[[float],float] = lambda ozCopper : (34.8 * ozCopper  * 10
 mmCopperToOz: Callable[[float],float] = lambda mmCopper : ((mmCopper * 10**-3) / 34.8) # the copperThickness is stored as millimeters
 umCopperToOz: Callable[[float],float] = lambda umCopper : (umCopper / 34.8) # just in case you know the exact height in micrometers
 RhoCopper = 1.72 * 10**-8 # Ohms * meter
+vacuumPermittivity = 8.8541878128 * 10**-12 # epsilon_0 = Farads / meter
+PCBrelativePermittivity = 4.4 # epsilon_r of FR4 (roughly, it depends on the manufacturer and the frequency), used for the parasitic capacitance
 ## code constants
 distUnitMult = 1/1000 # all distance units are in mm, so to convert back to meters, multiply with this
 
@@ -67,8 +76,16 @@ class _shapeBaseClass:
     @staticmethod
     def calcPos(itt:int|float,diam:float,clearance:float,traceWidth:float,CCW:bool)->tuple[float, float]:  ... # the modern python way of type-hinting an undefined function
     @staticmethod
+    def calcPosArray(itt:np.ndarray,diam:float,clearance:float,traceWidth:float,CCW:bool)->np.ndarray:  ... # same as calcPos(), but for a whole array of itt at once, returns a (N,2) array
+    @staticmethod
     def calcLength(itt:int|float,diam:float,clearance:float,traceWidth:float)->float:  ...
     isDiscrete: bool = True # most of the shapes have a discrete number points/corners/vertices by default. Only continous functions will need a render-resolution parameter
+    @staticmethod
+    def reverseDirectionMatrix() -> np.ndarray:
+        """ returns the (2x2) reflection matrix that turns a rendered coil into the same coil in the opposite direction (CW <-> CCW)
+            for most shapes, that's just flipping the sign of x (see the 'CCW ^ reverseDirection' term in calcPos()) """
+        return(np.array([[-1.0, 0.0],
+                         [ 0.0, 1.0]]))
     def __repr__(self): # prints the name of the shape
         return("shape("+(self.__class__.__name__)+")")
 
@@ -76,7 +93,8 @@ class squareSpiral(_shapeBaseClass):
     """ (static class) class to hold parameters and functions for square shaped coils """
     formulaCoefficients = {'wheeler' : (2.34, 2.75),
                             'monomial' : (1.62, -1.21, -0.147, 2.40, 1.78, -0.030),
-                            'cur_sheet' : (1.27, 2.07, 0.18, 0.13)}
+                            'cur_sheet' : (1.27, 2.07, 0.18, 0.13),
+                            'greenhouse' : ()}
     stepsPerTurn: int = 4 # multiply with number of turns to get 'itt' for functions below
     @staticmethod
     def calcPos(itt: int, diam: float, clearance: float, traceWidth: float, CCW=False) -> tuple[float, float]:
@@ -87,6 +105,16 @@ class squareSpiral(_shapeBaseClass):
         y = (1 if (((itt%4)==1) or ((itt%4)==2)) else -1) * (((diam-traceWidth)/2) - (((itt-1)//4) * spacing))
         return(x,y)
     @staticmethod
+    def calcPosArray(itt: np.ndarray, diam: float, clearance: float, traceWidth: float, CCW=False) -> np.ndarray:
+        """ same as calcPos(), but for a whole (1D) array of itt values at once
+            output is a (contiguous, float64) array of 2D coordinates with shape (len(itt), 2) """
+        spacing = calcTraceSpacing(clearance, traceWidth)
+        itt = np.asarray(itt)
+        output = np.empty((len(itt), 2), dtype=np.float64)
+        output[:,0] = np.where(((itt%4)>=2) ^ CCW, 1.0, -1.0)               * (((diam-traceWidth)/2) - ((itt//4)     * spacing))
+        output[:,1] = np.where(((itt%4)==1) | ((itt%4)==2), 1.0, -1.0) * (((diam-traceWidth)/2) - (((itt-1)//4) * spacing))
+        return(output)
+    @staticmethod
     def calcLength(itt: int, diam: float, clearance: float, traceWidth: float) -> float:
         """ returns the length of the spiral at a given itt (without iterating, direct calculation) """
         ## NOTE: if the spiral goes beyond the center point and grows larger again (it shouldn't), then the length will be negative). I'm intentionally not fixing that, becuase it makes for good debug info
@@ -94,7 +122,7 @@ class squareSpiral(_shapeBaseClass):
         horLines = (itt//2)
         sumOfWidths = (horLines * (diam-traceWidth)) - ((((horLines-1)*horLines) / 2) * spacing) # length of all hor. lines = (horLines * diam) - triangular number of (horLines-1)
         vertLines = ((itt+1)//2)
-        sumOfHeights = (vertLines * (diam-traceWidth)) - ((max(((vertLines-2)*(vertLines-1)) / 2, 0) - 1) * spacing) # length of all vert. lines
+        sumOfHeights = (vertLines * (diam-traceWidth)) - ((np.maximum(((vertLines-2)*(vertLines-1)) / 2, 0) - 1) * spacing) # length of all vert. lines (np.maximum() instead of max(), sothat this also works on arrays)
         return(sumOfWidths + sumOfHeights)
         ## paper[3] mentioned the formula: 4*turns*diam - 4*turns*tracewidth - (2*turns+1)^2 * (spacing)   but, please review their definitions of outer diameter and spacing before using this!
 
@@ -102,7 +130,8 @@ class circularSpiral(_shapeBaseClass):
     """ (static class) class to hold parameters and functions for circularly shaped coils """
     formulaCoefficients = {'wheeler' : (2.23, 3.45),
                             # the monomial formula does cover circular spirals
-                            'cur_sheet' : (1.00, 2.46, 0.00, 0.20)}
+                            'cur_sheet' : (1.00, 2.46, 0.00, 0.20),
+                            'greenhouse' : ()}
     stepsPerTurn: float = 2*np.pi # multiply with number of turns to get 'angle' for functions below
     isDiscrete = False # let the renderer know that this shape needs a resolution parameter
     @staticmethod
@@ -115,6 +144,49 @@ class circularSpiral(_shapeBaseClass):
         y =         -1         * np.cos(angle) * (((diam-traceWidth)/2) - ((angle/(2*np.pi)) * spacing))
         return(x,y)
     @staticmethod
+    def calcPosArray(angle: np.ndarray, diam: float, clearance: float, traceWidth: float, CCW=False) -> np.ndarray:
+        """ same as calcPos(), but for a whole (1D) array of angles at once
+            output is a (contiguous, float64) array of 2D coordinates with shape (len(angle), 2) """
+        spacing = calcTraceSpacing(clearance, traceWidth)
+        angle = np.asarray(angle, dtype=np.float64)
+        radius = ((diam-traceWidth)/2) - ((angle/(2*np.pi)) * spacing) # (the sin() and cos() are the only other expensive bit)
+        output = np.empty((len(angle), 2), dtype=np.float64)
+        output[:,0] = (1 if CCW else -1) * np.sin(angle) * radius
+        output[:,1] =         -1         * np.cos(angle) * radius
+        return(output)
+    @staticmethod
+    def calcAnglesForChordTolerance(turns: float, diam: float, clearance: float, traceWidth: float, chordTolerance: float) -> np.ndarray:
+        """ the (fewest) angles to render the spiral at, sothat no chord (the straight line between 2 points) deviates more than chordTolerance (mm) from the curve.
+            an arc of radius r needs a step of (at most) 2*acos(1 - chordTolerance/r), the step is picked per turn (using the radius at the start of the turn, the largest one),
+             so the outer turns of a big coil get more points, and the inner turns (and small coils) get fewer. (the vertex count is just len() of the result) """
+        spacing = calcTraceSpacing(clearance, traceWidth)
+        totalAngle = circularSpiral.stepsPerTurn * turns
+        turnStarts = np.arange(int(np.ceil(turns))) * circularSpiral.stepsPerTurn
+        turnAngles = np.minimum(turnStarts + circularSpiral.stepsPerTurn, totalAngle) - turnStarts # (the last turn may be partial, for fractional turns)
+        turnRadii = ((diam-traceWidth)/2) - ((turnStarts/(2*np.pi)) * spacing)
+        maxSteps = 2 * np.arccos(1 - np.clip(chordTolerance / np.where(turnRadii > 0, turnRadii, chordTolerance), 0.0, 1.0)) # (at least 2 steps per turn, even for tiny radii)
+        turnSteps = np.maximum(np.ceil((turnAngles / maxSteps) - 1e-9), 1).astype(int) # (the 1e-9 prevents an extra step due to rounding errors)
+        stepIndices = np.arange(np.sum(turnSteps)) - np.repeat(np.cumsum(turnSteps) - turnSteps, turnSteps) # (the index of each step within its turn)
+        return(np.concatenate((np.repeat(turnStarts, turnSteps) + (stepIndices * np.repeat(turnAngles / turnSteps, turnSteps)), [totalAngle])))
+    @staticmethod
+    def calcArcsForTolerance(turns: float, diam: float, clearance: float, traceWidth: float, tolerance: float, CCW=False) -> np.ndarray:
+        """ the spiral as a chain of circular arcs (biarcs) that stay within tolerance (mm) of the curve, as a (N,3) array of (x, y, bulge) vertices (see calcBiarcs())
+            it starts with quarter-turn pieces, and keeps splitting the pieces that deviate too much (in half), a few pieces at a time """
+        totalAngle = circularSpiral.stepsPerTurn * turns
+        pieceAngles = np.linspace(0.0, totalAngle, max(int(np.ceil(turns*4)), 1) + 1)
+        calcTangents: Callable[[np.ndarray],np.ndarray] = lambda angles : (circularSpiral.calcPosArray(angles+1e-6, diam, clearance, traceWidth, CCW) - circularSpiral.calcPosArray(angles-1e-6, diam, clearance, traceWidth, CCW))
+        sampleFractions = np.linspace(0.0, 1.0, 10)[1:-1] # (the deviation is checked at these points along each piece)
+        for iteration in range(32): # (each iteration halves the failing pieces, so this is plenty)
+            startAngles, endAngles = pieceAngles[:-1], pieceAngles[1:]
+            vertices = calcBiarcs(circularSpiral.calcPosArray(startAngles, diam, clearance, traceWidth, CCW), calcTangents(startAngles),
+                                  circularSpiral.calcPosArray(endAngles, diam, clearance, traceWidth, CCW), calcTangents(endAngles))
+            samplePoints = circularSpiral.calcPosArray((startAngles[:,None] + (sampleFractions[None,:] * (endAngles-startAngles)[:,None])).ravel(), diam, clearance, traceWidth, CCW).reshape(len(startAngles), len(sampleFractions), 2)
+            deviation = np.max(calcBiarcDeviation(vertices, samplePoints), axis=1)
+            tooFar = (deviation > tolerance)
+            if(not np.any(tooFar)):  break
+            pieceAngles = np.sort(np.concatenate((pieceAngles, (startAngles[tooFar] + endAngles[tooFar]) / 2)))
+        return(vertices)
+    @staticmethod
     def calcLength(angle: float, diam: float, clearance: float, traceWidth: float) -> float:
         """ returns the length of the spiral at a given angle (without iterating, direct calculation) """
         turns = (angle/circularSpiral.stepsPerTurn) # (float)
@@ -141,6 +213,26 @@ class NthDimSpiral(_shapeBaseClass): # a general class for Nth dimensional polyg
         y =         -1         * np.cos(angle+phaseShift) * ((circumscribedDiam/2) - ((angle/(2*np.pi)) * spacing))
         return(x,y)
     @classmethod
+    def calcPosArray(subclass, itt: np.ndarray, diam: float, clearance: float, traceWidth: float, CCW=False) -> np.ndarray:
+        """ same as calcPos(), but for a whole (1D) array of itt values at once
+            output is a (contiguous, float64) array of 2D coordinates with shape (len(itt), 2) """
+        spacing = calcTraceSpacing(subclass.circumDiam(clearance), subclass.circumDiam(traceWidth))
+        angle = np.asarray(itt, dtype=np.float64) * np.deg2rad(360/subclass.stepsPerTurn)
+        circumscribedDiam = subclass.circumDiam(diam-traceWidth)
+        phaseShift = ((np.deg2rad(180/subclass.stepsPerTurn)*(-1 if CCW else 1)) if rotateNthDimSpirals else 0.0)
+        radius = (circumscribedDiam/2) - ((angle/(2*np.pi)) * spacing)
+        output = np.empty((len(angle), 2), dtype=np.float64)
+        output[:,0] = (1 if CCW else -1) * np.sin(angle+phaseShift) * radius
+        output[:,1] =         -1         * np.cos(angle+phaseShift) * radius
+        return(output)
+    @classmethod
+    def reverseDirectionMatrix(subclass) -> np.ndarray:
+        """ returns the (2x2) reflection matrix that turns a rendered coil into the same coil in the opposite direction (CW <-> CCW)
+            the phaseShift (in calcPos()) also flips when the direction flips, so it's not just a mirror in the y-axis, but a mirror in a slightly rotated axis """
+        doublePhaseShift = (np.deg2rad(360/subclass.stepsPerTurn) if rotateNthDimSpirals else 0.0) # the difference between the CW and CCW phaseShift
+        return(np.array([[-np.cos(doublePhaseShift), np.sin(doublePhaseShift)],
+                         [ np.sin(doublePhaseShift), np.cos(doublePhaseShift)]]))
+    @classmethod
     def calcLength(subclass, itt: int, diam: float, clearance: float, traceWidth: float) -> float:
         """ returns the length of the spiral at a given itt (without iterating, direct calculation) """
         return(itt * np.sin(np.deg2rad(180/subclass.stepsPerTurn)) * (subclass.circumDiam(diam) + calcSimpleInnerDiam(itt/subclass.stepsPerTurn, subclass.circumDiam(diam), subclass.circumDiam(clearance), subclass.circumDiam(traceWidth), NthDimSpiral())) / 2)
@@ -150,14 +242,16 @@ class hexagonSpiral(NthDimSpiral):
     """ (static class) class to hold parameters and functions for hexagonally-shaped (sortof, the angles are not actually 60deg) coils """
     formulaCoefficients = {'wheeler' : (2.33, 3.82),
                             'monomial' : (1.28, -1.24, -0.174, 2.47, 1.77, -0.049),
-                            'cur_sheet' : (1.09, 2.23, 0.00, 0.17)}
+                            'cur_sheet' : (1.09, 2.23, 0.00, 0.17),
+                            'greenhouse' : ()}
     stepsPerTurn: int = 6
 
 class octagonSpiral(NthDimSpiral):
     """ (static class) class to hold parameters and functions for octagonally-shaped (sortof, the angles are not actually 45deg) coils """
     formulaCoefficients = {'wheeler' : (2.25, 3.55),
                             'monomial' : (1.33, -1.21, -0.163, 2.43, 1.75, -0.049),
-                            'cur_sheet' : (1.07, 2.29, 0.00, 0.19)}
+                            'cur_sheet' : (1.07, 2.29, 0.00, 0.19),
+                            'greenhouse' : ()}
     stepsPerTurn: int = 8
 
 # class squareSpiral(NthDimSpiral): # NOTE: this is not a square (same way the hexagon and octagon are also technically illigal), and it has significantly different values (length!) to the hardcoded sqaure above.
@@ -242,12 +336,63 @@ def calcTotalResistance(turns: int, diam: float, clearance: float, traceWidth: f
 
 def calcLayerSpacing(layers: int, PCBthickness: float, copperThickness: float) -> float:
     """ just a macro for ((PCBthickness - copperThickness) / (layers-1)) """
+    if(np.ndim(layers) > 0): # (numpy) array input, see calcCoilBatch()
+        return(np.where(layers > 1, (PCBthickness - copperThickness) / np.maximum(layers-1, 1), 0.0))
     if(layers <= 1): return(0.0)
     return((PCBthickness - copperThickness) / (layers-1)) # spacing between layers (in mm) (assuming PCBthickness includes all copper layers)
 
-def calcInductanceSingleLayer(turns: int, diam: float, clearance: float, traceWidth: float, shape: _shapeBaseClass, formula: str) -> float:
+class layerStackClass:
+    """ a PCB stack-up (from top to bottom): the copper thickness of every layer, and the dielectric (core/prepreg) thickness between each pair of copper layers (all in mm)
+        real stack-ups are often not equidistant (e.g. thin prepreg on the outside, a thick core in the middle) and have thinner inner copper layers.
+        many stack-ups (with the same number of layers) can be stored in one object, by using 2D arrays (one row per stack-up), all calculations are vectorized """
+    def __init__(self, copperThicknesses: list[float]|np.ndarray, dielectricThicknesses: list[float]|np.ndarray):
+        self.copperThicknesses = np.asarray(copperThicknesses, dtype=float) # shape (layers,) or (stackups, layers)
+        self.dielectricThicknesses = np.asarray(dielectricThicknesses, dtype=float) # shape (layers-1,) or (stackups, layers-1)
+        if((self.copperThicknesses.shape[-1] - 1) != self.dielectricThicknesses.shape[-1]):  raise(Exception("layerStackClass needs exactly 1 dielectric thickness between every pair of copper layers, got: "+str(self.copperThicknesses.shape)+" and "+str(self.dielectricThicknesses.shape)))
+
+    @classmethod
+    def equidistant(cls, layers: int, PCBthickness: float|np.ndarray, copperThickness: float|np.ndarray):
+        """ the stack-up that the rest of the code assumes (see calcLayerSpacing()), evenly spaced layers of equal copper thickness """
+        PCBthickness = np.asarray(PCBthickness, dtype=float)[...,None];  copperThickness = np.asarray(copperThickness, dtype=float)[...,None] # (one stack-up per value, if arrays are provided)
+        dielectricThickness = ((PCBthickness - copperThickness) / max(layers-1, 1)) - copperThickness # layerSpacing is measured between the centers of the copper layers
+        return(cls(np.broadcast_to(copperThickness, np.broadcast_shapes(copperThickness.shape[:-1], PCBthickness.shape[:-1]) + (layers,)),
+                   np.broadcast_to(dielectricThickness, dielectricThickness.shape[:-1] + (layers-1,))))
+
+    @property
+    def layers(self) -> int:
+        return(self.copperThicknesses.shape[-1])
+    @property
+    def PCBthickness(self) -> float|np.ndarray:
+        return(np.sum(self.copperThicknesses, axis=-1) + np.sum(self.dielectricThicknesses, axis=-1))
+    def __len__(self) -> int:
+        """ the number of stack-ups """
+        return(self.copperThicknesses.shape[0] if (self.copperThicknesses.ndim > 1) else 1)
+    def __getitem__(self, index: int|slice|np.ndarray):
+        """ select stack-up(s), if this object holds multiple (e.g. stack[indices] for a sweep chunk) """
+        return(layerStackClass(self.copperThicknesses[index], self.dielectricThicknesses[index]))
+    def __repr__(self):
+        return("layerStack(copper="+str(np.round(self.copperThicknesses, 4).tolist())+", dielectric="+str(np.round(self.dielectricThicknesses, 4).tolist())+")")
+
+    def calcLayerCenters(self) -> np.ndarray:
+        """ the height of the center of each copper layer, relative to the center of the top layer (in mm) (a prefix sum of the layer thicknesses) """
+        centerSteps = ((self.copperThicknesses[...,:-1] + self.copperThicknesses[...,1:]) / 2) + self.dielectricThicknesses # from the center of one layer to the center of the next
+        return(np.concatenate((np.zeros(centerSteps.shape[:-1] + (1,)), np.cumsum(centerSteps, axis=-1)), axis=-1))
+    def calcSumOfSpacings(self) -> float|np.ndarray:
+        """ the sum of the (center-to-center) distances between every pair of layers (in mm), in linear time:
+            for sorted positions z, sum(z[j]-z[i] for i<j) = sum(z[i] * (2*i - (layers-1))), because layer i is subtracted (layers-1-i) times and added i times """
+        return(np.sum(self.calcLayerCenters() * ((2*np.arange(self.layers)) - (self.layers-1)), axis=-1))
+    def calcMeanLayerSpacing(self) -> float|np.ndarray:
+        """ the average (center-to-center) spacing between neighbouring layers (equal to calcLayerSpacing() for an equidistant stack-up) """
+        if(self.layers <= 1):  return(np.zeros(self.copperThicknesses.shape[:-1]) if (self.copperThicknesses.ndim > 1) else 0.0)
+        return(self.calcLayerCenters()[...,-1] / (self.layers-1))
+    def calcResistanceMult(self) -> float|np.ndarray:
+        """ sum(1/copperThickness) of all layers (in 1/mm), the total resistance is (the resistance of one layer with 1mm thick copper) times this """
+        return(np.sum(1.0 / self.copperThicknesses, axis=-1))
+
+def calcInductanceSingleLayer(turns: int, diam: float, clearance: float, traceWidth: float, shape: _shapeBaseClass, formula: str, copperThickness: float = ozCopperToMM(1.0)) -> float:
     """ returns inducance (in Henry) of a PCB coil (single layer)
-        math comes from: https://stanford.edu/~boyd/papers/pdf/inductance_expressions.pdf """
+        math comes from: https://stanford.edu/~boyd/papers/pdf/inductance_expressions.pdf
+        (copperThickness is only used by formula='greenhouse', the formulas from the paper don't include it) """
     if(formula not in shape.formulaCoefficients):  print("could not calcInductanceSingleLayer(), for shape=", shape, " and formula=", formula);  return(-1.0)
     trueInnerDiamM = calcTrueInnerDiam(turns, diam, clearance, traceWidth, shape) * distUnitMult # inner diameter as defined in the papers
     trueDiamM = calcTrueDiam(diam, clearance, traceWidth, shape) * distUnitMult # outer diameter as defined in the papers
@@ -261,8 +406,22 @@ def calcInductanceSingleLayer(turns: int, diam: float, clearance: float, traceWi
         return(outputMult * coeff[0] * (trueDiamM**coeff[1]) * ((traceWidth*distUnitMult)**coeff[2]) * (averageDiamM**coeff[3]) * (turns**coeff[4]) * (clearance**coeff[5]))
     elif(formula == 'cur_sheet'):
         return((coeff[0] * magneticConstant * (turns**2) * averageDiamM * (np.log(coeff[1]/fillFactor) + (coeff[2]*fillFactor) + (coeff[3]*(fillFactor**2)))) / 2)
+    elif(formula == 'greenhouse'): # (numerical, see calcInductanceNumerical())
+        return(calcInductanceNumerical(turns, diam, clearance, traceWidth, shape, (0.0,), copperThickness))
     else: print("impossible point reached in calcInductanceSingleLayer(), check the formulaCoefficients formula names in this function!");  return(-1.0) # should never happen due to earlier check
 
+def calcInductanceNumerical(turns: int, diam: float, clearance: float, traceWidth: float, shape: _shapeBaseClass, layerCenters: tuple[float] = (0.0,), copperThickness: float = ozCopperToMM(1.0)) -> float:
+    """ returns inductance (in Henry) of a PCB coil, calculated numerically from the rendered coil (formula='greenhouse', see segmentInductance.py)
+        layerCenters is the height of each layer (in mm), e.g. (0, layerSpacing, 2*layerSpacing) or layerStackClass.calcLayerCenters(), the mutual inductance between layers is included.
+        the layers are connected in series, every other layer is the reverse-direction version, traversed from the inside out (sothat the current circulates the same way on all layers) """
+    import segmentInductance # (only imported when needed)
+    renderedCoil = coilClass(turns, diam, clearance, traceWidth, shape=shape).render()
+    polylines: list[np.ndarray] = []
+    for (layer, layerHeight) in enumerate(layerCenters):
+        layerCoords = (renderedCoil[layer] if ((layer%2) == 0) else renderedCoil[layer][::-1])
+        polylines.append(np.column_stack((layerCoords, np.full(len(layerCoords), -layerHeight))))
+    return(segmentInductance.calcPolylineInductance(polylines, traceWidth, copperThickness))
+
 ################ original formula
 # def calcInductanceMultilayer(turns: int, diam: float, clearance: float, traceWidth: float, layers: int, layerSpacing: float, shape: _shapeBaseClass, formula: str) -> float:
 #     """ returns inducance (in Henry) of PCB coil (multi-layer) """
@@ -286,99 +445,445 @@ def calcInductanceSingleLayer(turns: int, diam: float, clearance: float, traceWi
 #     return(totalInduct)
 
 
-################ unfinished rework using a 4th paper
-# def calcInductanceMultilayer(turns: int, diam: float, clearance: float, traceWidth: float, layers: int, layerSpacing: float, shape: _shapeBaseClass, formula: str) -> float:
-#     """ returns inducance (in Henry) of PCB coil (multi-layer) """
-#     singleInduct = calcInductanceSingleLayer(turns, diam, clearance, traceWidth, shape, formula) # calculate the inductance of a single layer the same way
-#     if(singleInduct < 0):  print("can't calcInductanceMultilayer(), calcInductanceSingleLayer() returned <0:", singleInduct);  return(-1.0) # should never happen
-    
-#     ## This is a trial for a new paper i found, paper[4]
-#     ## it has its own magic formula for mutual inductance between the transmitter and receiver coil
-#     ## i'm attempting to apply it to multi-layer coils
-#     ## if im reading it correctly, it attempts to model each line of a rectangular coil individually, adding the mutual couplings of all of them at the end.
-#     ## a_i and b_J seem like they're calculating either a line segment length or maybe an inner diameter
-#     # radiusOther = ((diam/2)*distUnitMult);  turnsOther = turns;  traceWidthOther = (traceWidth*distUnitMult);  clearanceOther = (clearance*distUnitMult) # the second coil in question is the same as the first coil
-#     for i_layer in range(1, layers):
-#         totalMutualInduct = 0.0
-#         for i in range(turns):
-#             for j in range(turns): # turnsOther
-#                 a_i = ((diam/2)*distUnitMult) - (turns - 1)*((traceWidth*distUnitMult) + (clearance*distUnitMult)) - ((traceWidth*distUnitMult)/2)
-#                 # b_j = radiusOther - (turnsOther - 1)*(traceWidthOther + clearanceOther) - (traceWidthOther/2)
-#                 b_j = a_i # the coils are the same on each layer
-#                 d_r = i_layer * layerSpacing * distUnitMult # relative distance between coils
-#                 Y_ij = (2*a_i*b_j)/((a_i**2)+(b_j**2)+(d_r**2))
-#                 K = (15/32, 315/1024) # tuple of magic numbers
-#                 M_ij = ((magneticConstant*np.pi*(a_i**2)*(b_j**2)) / (2*(((a_i**2)+(b_j**2)+(d_r**2))**(3/2)))) * (1 + K[0]*(Y_ij**2) + K[1]*(Y_ij**4))
-#                 totalMutualInduct += M_ij
-#         v = 1+(r_i2/r_i1)
-#         totalMutualInduct *= ((4/np.pi)**v)
-#     ## mutual inductance to total inductance math here!
-#     return(totalInduct)
+################ rework using a 4th paper (selectable with multilayerFormula='paper4')
+## paper[4] models the mutual inductance between 2 coils as the sum of the mutual inductances between every pair of turns, where each turn is a circular loop:
+##  M_ij = ((mu0*pi*(a_i^2)*(b_j^2)) / (2*((a_i^2)+(b_j^2)+(d^2))^(3/2))) * (1 + K0*(Y_ij^2) + K1*(Y_ij^4))   with   Y_ij = (2*a_i*b_j)/((a_i^2)+(b_j^2)+(d^2))   and   K = (15/32, 315/1024)
+## that is the start of a series expansion of the (exact) mutual inductance of 2 coaxial loops. Between the layers of a PCB, d is tiny compared to the radii (Y is close to 1),
+##  where the series converges very slowly (only the 2 K terms underestimate the coupling by ~40%), so the exact (elliptic integral) version of the same formula is used instead (paper4SeriesTerms=False)
+## applied to multi-layer coils: every layer is the same spiral, so each pair of layers (k,l) adds 2*sum_ij(M_ij(d_kl)), with per-turn radii a_i = b_i. Polygon turns are replaced by a circle of equal area
+multilayerFormulas: tuple[str] = ('linear_coupling', 'paper4') # 'linear_coupling' is my formula (see calcMultilayerCouplingMult()), 'paper4' is the one above
+paper4SeriesTerms: bool = False # use the (truncated) series with the K magic numbers from paper[4], instead of the exact formula (just for comparison)
+
+def calcEqualAreaRadiusMult(shape: _shapeBaseClass) -> float:
+    """ the radius of a circle with the same area as one turn of the shape, relative to the inscribed radius of the turn (1.0 for circularSpiral) """
+    if(not shape.isDiscrete):  return(1.0)
+    return(np.sqrt(shape.stepsPerTurn * np.tan(np.pi/shape.stepsPerTurn) / np.pi)) # a regular N-gon with inscribed radius r has an area of N*(r^2)*tan(pi/N)
+
+def _calcCompleteEllipticIntegrals(m: np.ndarray) -> tuple[np.ndarray, np.ndarray]:
+    """ the complete elliptic integrals of the first and second kind K(m) and E(m) (with parameter m = k^2), using the (vectorized) arithmetic-geometric mean """
+    a = np.ones_like(m);  b = np.sqrt(1.0 - m);  powerOfTwo = 0.5;  cSquaredSum = m / 2
+    for i in range(8): # the AGM converges quadratically, 8 iterations is enough for m up to ~(1 - 1e-12)
+        c = (a - b) / 2;  a, b = (a + b) / 2, np.sqrt(a * b)
+        powerOfTwo *= 2;  cSquaredSum = cSquaredSum + (powerOfTwo * (c**2))
+    K = np.pi / (2 * a)
+    return(K, K * (1.0 - cSquaredSum))
+
+def calcLoopMutualInductance(radius1: float|np.ndarray, radius2: float|np.ndarray, distance: float|np.ndarray) -> float|np.ndarray:
+    """ the mutual inductance (in Henry) between 2 coaxial circular loops (radii and distance in meters) (works on (broadcastable) arrays) """
+    if(paper4SeriesTerms): # (truncated) series from paper[4]
+        K = (15/32, 315/1024) # tuple of magic numbers
+        sumOfSquares = (radius1**2) + (radius2**2) + (distance**2)
+        Y = (2*radius1*radius2) / sumOfSquares
+        return(((magneticConstant*np.pi*(radius1**2)*(radius2**2)) / (2*(sumOfSquares**(3/2)))) * (1 + K[0]*(Y**2) + K[1]*(Y**4)))
+    m = (4*radius1*radius2) / (((radius1 + radius2)**2) + (distance**2)) # (k^2)
+    K, E = _calcCompleteEllipticIntegrals(m)
+    k = np.sqrt(m)
+    return(magneticConstant * np.sqrt(radius1*radius2) * ((((2/k) - k) * K) - ((2/k) * E))) # Maxwell's formula
+
+def calcMultilayerMutualInductance(turns: int, diam: float|np.ndarray, clearance: float|np.ndarray, traceWidth: float|np.ndarray, layerCenters: np.ndarray, shape: _shapeBaseClass) -> float|np.ndarray:
+    """ the sum of the mutual inductances between every pair of layers (in Henry), using the paper[4] approach (see above)
+        layerCenters is the height of each layer (in mm), with shape (layers,), or (..., layers) to match the other parameters (which may be (broadcastable) arrays, except turns)
+        the whole (layerPairs, turns, turns) tensor is calculated at once, but only the unique parts of it:
+         M_ij = M_ji (so only the upper triangle of turn pairs), and for equidistant layers, all the pairs at distance (n*layerSpacing) are the same (so only (layers-1) distances) """
+    spacing = calcTraceSpacing(clearance, traceWidth)
+    outerRadius = (np.asarray(diam) - traceWidth) / 2 # (centerline) radius at the start of the spiral
+    turnRadii = (outerRadius[...,None] - ((np.arange(turns) + 0.5) * np.asarray(spacing)[...,None])) * calcEqualAreaRadiusMult(shape) * distUnitMult # average (centerline) radius of each turn, shape (..., turns)
+    layerCenters = np.asarray(layerCenters)
+    layerCount = layerCenters.shape[-1]
+    layerSteps = np.diff(layerCenters, axis=-1)
+    if(np.allclose(layerSteps, layerSteps[...,:1])): # equidistant, there are (layers-n) pairs of layers at distance (n*layerSpacing)
+        pairDistances = np.arange(1, layerCount) * layerSteps[...,:1] # shape (..., layers-1)
+        pairWeights = (layerCount - np.arange(1, layerCount)).astype(float)
+    else: # every pair of layers (once)
+        upperTriangle = np.triu_indices(layerCount, 1)
+        pairDistances = np.abs(layerCenters[...,upperTriangle[0]] - layerCenters[...,upperTriangle[1]]) # shape (..., layerPairs)
+        pairWeights = np.ones(len(upperTriangle[0]))
+    turnPairs = np.triu_indices(turns) # (i <= j)
+    turnPairWeights = np.where(turnPairs[0] == turnPairs[1], 1.0, 2.0) # the off-diagonal pairs count twice
+    mutualInduct = calcLoopMutualInductance(turnRadii[...,None,turnPairs[0]], turnRadii[...,None,turnPairs[1]], pairDistances[...,:,None] * distUnitMult) # shape (..., layerPairs, turnPairs)
+    return(np.sum(mutualInduct * pairWeights[:,None] * turnPairWeights, axis=(-2,-1)))
 
 ################ my formula (Note: based on somewhat limited sample size (see documentation))
-def calcInductanceMultilayer(turns: int, diam: float, clearance: float, traceWidth: float, layers: int, layerSpacing: float, shape: _shapeBaseClass, formula: str) -> float:
-    """ returns inducance (in Henry) of PCB coil (multi-layer) """
+def calcInductanceMultilayer(turns: int, diam: float, clearance: float, traceWidth: float, layers: int, layerSpacing: float, shape: _shapeBaseClass, formula: str, layerStack: layerStackClass = None,
+                             multilayerFormula: str = 'linear_coupling', copperThickness: float = ozCopperToMM(1.0)) -> float:
+    """ returns inducance (in Henry) of PCB coil (multi-layer)
+        if a layerStack is provided, its (uneven) spacings are used instead of the (equidistant) layerSpacing
+        multilayerFormula selects how the coupling between layers is calculated, see multilayerFormulas (copperThickness is only used by formula='greenhouse') """
+    if(formula == 'greenhouse'): # the numerical calculation includes the mutual inductance between layers, so no coupling factor is needed
+        return(calcInductanceNumerical(turns, diam, clearance, traceWidth, shape, (np.arange(layers)*layerSpacing if (layerStack is None) else layerStack.calcLayerCenters()), copperThickness))
     singleInduct = calcInductanceSingleLayer(turns, diam, clearance, traceWidth, shape, formula) # calculate the inductance of a single layer the same way
     if(singleInduct < 0):  print("can't calcInductanceMultilayer(), calcInductanceSingleLayer() returned <0:", singleInduct);  return(-1.0) # should never happen
-    
+    if(multilayerFormula == 'paper4'):
+        layerCenters = (np.arange(layers)*layerSpacing if (layerStack is None) else layerStack.calcLayerCenters())
+        return((len(layerCenters) * singleInduct) + (2 * calcMultilayerMutualInductance(turns, diam, clearance, traceWidth, layerCenters, shape)))
+    if(layerStack is not None):  return(singleInduct * calcMultilayerCouplingMult(layerStack.layers, layerSpacing, layerStack.calcSumOfSpacings()))
+    return(singleInduct * calcMultilayerCouplingMult(layers, layerSpacing))
+
+## the constants for my formula, a 1st-order polynomial like (D0,D1) where k = D1*s + D0 (s in mm). Fitted (by hand) on the samples in 'documentation/measurement data in excel.xlsx'
+couplingConstant_D: tuple[float] = (1.025485443, -0.201166582) # (may be replaced by loadCoefficientSet())
+coefficientSetVersion: str = 'builtin' # which coefficient set is in use (the formulaCoefficients of the shapes and couplingConstant_D), see loadCoefficientSet()
+coefficientGeneration: int = 0 # incremented every time a coefficient set is loaded, sothat the cached results of all coilClass objects are recalculated (see _validCoilCache())
+
+def calcMultilayerCouplingMult(layers: int, layerSpacing: float, sumOfSpacings: float = None) -> float:
+    """ returns the factor between single-layer inductance and multi-layer inductance: (layers + 2*sumOfCouplingFactors)
+        sumOfSpacings is the sum of the distances between every pair of layers (see layerStackClass.calcSumOfSpacings()), if None, equidistant layers (layerSpacing) are assumed
+        (works on (broadcastable) arrays too, and returns 1.0 for single-layer coils) """
     ## instead of using an inverted 4th-order polynomial for the spacing, and another wacky function for the turns-coefficient,
     ## this assumes the relation between layerSpacing and coupling to be roughly linear (because that is what my sample data showed (see documentation))
     ## I am aware that another parameter should be taken into account, but my sample size was too limited to definitively identify it...
     ## therefore, i should mention that my smallest samples (12mm coils) had ~10% prediction overshoot (which i find to be just too much).
 
     ## the new constants are a 1st-order polynomial (a.k.a. a linear function), applied to each spacing individually (or to the sum, using the triangular number for D0, like i do below)
-    couplingConstant_D : tuple[float] = (1.025485443, -0.201166582) # like (D0,D1) where k = D1*s + D0 (1st order polynomial)
-
-    ## layer stack management stuff is all TODO!
-    # outerLayerCopperThickness = 0.035
-    # innerLayerCopperThickness = 0.0152
-    # layerStack : tuple[float] \
-    #             = (outerLayerCopperThickness,
-    #                 0.0994,
-    #                 innerLayerCopperThickness,
-    #                 0.35,
-    #                 innerLayerCopperThickness,
-    #                 0.1088,
-    #                 innerLayerCopperThickness,
-    #                 0.35,
-    #                 innerLayerCopperThickness,
-    #                 0.0994,
-    #                 outerLayerCopperThickness,
-    #                 )
-    # sumOfSpacings = 0.0
-    # for i in range(0, len(layerStack)-2, 2): # Note: this could go to len(layerStack), but the last entry would skip the j for-loop below entirely.
-    #     for j in range(i+1, len(layerStack)-1, 2):
-    #         spacing = sum(layerStack[i:(j+2)]) # total thickness (incuding copper) from layer i to layer (j+1)
-    #         spacing -= (layerStack[i] + layerStack[(j+1)]) / 2 # subtract half the thickness of both copper layers, (so the calculations are done from the centers of the copper layers)
-    #         sumOfSpacings += spacing
-    #         # sumOfCouplingFactors += (couplingConstant_D[1] * spacing) + couplingConstant_D[0] # DEPRICATED. The sumOfSpacings is used instead (along with a triangular number for D[0], see code below)
-    sumOfSpacings = layerSpacing * ((layers*(layers+1)*(layers-1))/6) # TODO: replace with layer stack! (this assumes equidistant layers, uses a calculation similar to triangular_number to skip forloop)
+    ## (the constants are stored globally (couplingConstant_D), sothat a (re)fitted coefficient set can replace them, see loadCoefficientSet() and calibration.py)
+
+    ## the coupling factor is linear in the spacing, so the (per-pair) coupling factors can be summed by summing the spacings of every pair of layers
+    ## (see layerStackClass for (uneven) stack-ups, like: outer copper 0.035, prepreg 0.0994, inner copper 0.0152, core 0.35, etc.)
+    if(sumOfSpacings is None):
+        sumOfSpacings = layerSpacing * ((layers*(layers+1)*(layers-1))/6) # assumes equidistant layers, uses a calculation similar to triangular_number to skip forloop
 
     triangularNumber = (layers*(layers-1))/2 # triangular number
     sumOfCouplingFactors = (couplingConstant_D[1] * sumOfSpacings) + (triangularNumber * couplingConstant_D[0]) # preliminary formula (final formula may include more parameters)
-    totalInduct = singleInduct * (layers + 2*sumOfCouplingFactors) # preliminary formula (final formula may include more parameters)
-    return(totalInduct)
+    return(layers + 2*sumOfCouplingFactors) # preliminary formula (final formula may include more parameters)
 
-def generateCoilFilename(coil: 'coilClass') -> str:
-    """ return a (consistently formatted) string based on the properties of the coil """
-    filename = coil.shape.__class__.__name__[0:2]   # shape (first 2 letters)
-    filename += '_di'+str(int(round(coil.diam, 0)))  # diam (millimeters)
-    filename += '_tu'+str(coil.turns)                # turns
-    filename += '_wi'+str(int(round(coil.traceWidth * 1000, 0))) # traceWidth (micrometers)
-    filename += '_cl'+str(int(round(coil.clearance * 1000, 0)))  # clearance (micrometers)
+_builtinCoefficients: dict = {'couplingConstant_D' : couplingConstant_D, 'formulaCoefficients' : {shapeName : dict(shapes[shapeName].formulaCoefficients) for shapeName in shapes}} # (to restore them, see loadCoefficientSet('builtin'))
+
+def loadCoefficientSet(filename: str|dict = 'builtin') -> bool:
+    """ replace the formula coefficients (of the shapes in the 'shapes' dict) and couplingConstant_D with a (re)fitted coefficient set (a .json file, see calibration.py)
+        the file looks like: {"coefficientSetVersion": "...", "couplingConstant_D": [D0, D1], "formulaCoefficients": {"circle": {"cur_sheet": [...]}, ...}}
+        (formulas/shapes that are not in the file keep their current coefficients). filename may also be an (already loaded) dict, or 'builtin' to restore the original constants.
+        this applies to all coils, including the cached results of existing coilClass objects (see coefficientGeneration)
+        returns True if the coefficient set was loaded """
+    global couplingConstant_D, coefficientSetVersion, coefficientGeneration
+    if(isinstance(filename, dict)):  coefficientSet = filename
+    elif(filename == 'builtin'):  coefficientSet = dict(_builtinCoefficients, coefficientSetVersion='builtin')
+    else:
+        import json # (only imported when needed)
+        try:
+            with open(filename, 'r') as coefficientFile:
+                coefficientSet = json.load(coefficientFile)
+        except Exception as excep:
+            print("loadCoefficientSet() failed to read", filename, ":", excep);  return(False)
+    ## check everything before changing anything, sothat a bad file doesn't leave a half-loaded set:
+    newCouplingConstant_D = tuple([float(value) for value in coefficientSet.get('couplingConstant_D', couplingConstant_D)])
+    if(len(newCouplingConstant_D) != len(couplingConstant_D)):  print("loadCoefficientSet() couplingConstant_D should have", len(couplingConstant_D), "values, not:", newCouplingConstant_D);  return(False)
+    newFormulaCoefficients: list[tuple[_shapeBaseClass,str,tuple[float]]] = []
+    for (shapeName, formulas) in coefficientSet.get('formulaCoefficients', {}).items():
+        if(shapeName not in shapes):  print("loadCoefficientSet() unknown shape:", shapeName, " options are:", list(shapes.keys()));  return(False)
+        for (formula, coefficients) in formulas.items():
+            if((formula not in shapes[shapeName].formulaCoefficients) or (len(coefficients) != len(shapes[shapeName].formulaCoefficients[formula]))):
+                print("loadCoefficientSet() formula", formula, "with", len(coefficients), "coefficients does not match", shapes[shapeName], shapes[shapeName].formulaCoefficients);  return(False)
+            newFormulaCoefficients.append((shapes[shapeName], formula, tuple([float(value) for value in coefficients])))
+    couplingConstant_D = newCouplingConstant_D
+    for (shapeObj, formula, coefficients) in newFormulaCoefficients:
+        shapeObj.formulaCoefficients[formula] = coefficients
+    coefficientSetVersion = str(coefficientSet.get('coefficientSetVersion', 'unversioned'))
+    coefficientGeneration += 1
+    return(True)
+
+## parasitic capacitance (for the self-resonant frequency):
+## the coil is modelled as one lumped capacitor across its terminals, with the voltage along the trace assumed to rise linearly (from one terminal to the other)
+## every bit of capacitance between 2 parts of the trace then stores the energy 0.5*C*(dV^2), and the equivalent capacitance is the sum of C*((dV/V)^2) over all parts:
+## - inter-turn: neighbouring turns (on the same layer) are 1 turn apart, so dV = V/(turns*layers), along (layerLength * (turns-1)/turns) of gap per layer (coplanar strips)
+## - inter-layer: the next layer runs the spiral backwards, so the voltage difference between (overlapping) traces of 2 neighbouring layers goes from 2 layers-worth (at the outside) to 0 (at the inside),
+##    integrating (2*(1-x))^2 over the length gives 4/3, so each pair of neighbouring layers adds (4/3)*C_plate/(layers^2) (non-neighbouring layers are shielded by the ones in between, so they're ignored)
+## the pads/vias, return trace and any (ground) planes nearby are not included, so the real SRF will be somewhat lower than this (it's an upper bound, useful for rejecting designs)
+def calcCoplanarCapacitancePerLength(clearance: float|np.ndarray, traceWidth: float|np.ndarray, copperThickness: float|np.ndarray = 0.0, relativePermittivity: float = PCBrelativePermittivity) -> float|np.ndarray:
+    """ the capacitance (in Farads per meter) between 2 parallel traces on the surface of a (thick) PCB, using the conformal mapping of coplanar strips: C = eps0 * epsEff * K(k')/K(k)  with  k = clearance/(clearance + 2*traceWidth)
+        half the field is in the PCB and half in the air, so epsEff = (epsR+1)/2. The (parallel-plate) capacitance between the sides of the copper is added on top of that """
+    k = clearance / (clearance + 2*traceWidth)
+    K, _ = _calcCompleteEllipticIntegrals(np.asarray(k**2, dtype=float))
+    Kprime, _ = _calcCompleteEllipticIntegrals(np.asarray(1.0 - (k**2), dtype=float))
+    effectivePermittivity = (relativePermittivity + 1) / 2
+    return(vacuumPermittivity * effectivePermittivity * ((Kprime / K) + (copperThickness / clearance)))
+
+def calcParasiticCapacitance(turns: int|np.ndarray, diam: float|np.ndarray, clearance: float|np.ndarray, traceWidth: float|np.ndarray, layers: int|np.ndarray, layerSpacing: float|np.ndarray, copperThickness: float|np.ndarray,
+                             shape: _shapeBaseClass, relativePermittivity: float = PCBrelativePermittivity, layerStack: layerStackClass = None) -> float|np.ndarray:
+    """ returns the (equivalent) parasitic capacitance (in Farads) of the coil, see the explanation above (works on (broadcastable) arrays too)
+        the layer length comes from shape.calcLength(), the inter-turn gap from the clearance and the inter-layer gap from the layerSpacing (minus the copper)
+        if a layerStack is provided, its (uneven) dielectric thicknesses are used instead of the layerSpacing """
+    layerLength = shape.calcLength(turns*shape.stepsPerTurn, diam, clearance, traceWidth) * distUnitMult # (in meters)
+    turnsInSeries = turns * layers
+    interTurn = calcCoplanarCapacitancePerLength(clearance, traceWidth, copperThickness, relativePermittivity) * (layerLength * (turns-1) / turns) * layers / (turnsInSeries**2)
+    if(layerStack is None):
+        dielectricThickness = (layerSpacing - copperThickness) * distUnitMult
+        with np.errstate(divide='ignore', invalid='ignore'): # (single-layer coils have a layerSpacing of 0)
+            sumOfInverseThickness = np.where(layers > 1, (layers-1) / dielectricThickness, 0.0) # sum(1/thickness) of all neighbouring pairs
+    else:
+        sumOfInverseThickness = np.sum(1.0 / (layerStack.dielectricThicknesses * distUnitMult), axis=-1)
+    interLayer = vacuumPermittivity * relativePermittivity * (traceWidth * distUnitMult) * layerLength * sumOfInverseThickness * (4/3) / (layers**2) # parallel plate (the overlapping traces)
+    return(interTurn + interLayer)
+
+def calcSelfResonantFrequency(inductance: float|np.ndarray, capacitance: float|np.ndarray) -> float|np.ndarray:
+    """ just a macro for 1/(2*pi*sqrt(L*C)) (in Hz) """
+    return(1 / (2*np.pi*np.sqrt(inductance * capacitance)))
+
+## AC resistance (skin and proximity effect):
+## at higher frequencies the current is pushed to the surface of the copper (skin effect), and towards the edges of the trace by the field of the neighbouring turns (proximity effect)
+## - skin effect: the current flows in a layer of (skin depth) delta = sqrt(rho/(pi*f*mu0)), for a trace of thickness t that gives: R_ac/R_dc = (t/delta) / (1 - e^(-t/delta))
+## - proximity effect: the formula from Kuhn & Ma (2001): R_ac/R_dc = 1 + 0.1*(omega/omega_crit)^2   with   omega_crit = (3.1/mu0) * ((traceWidth+clearance) / traceWidth^2) * (rho/t)
+##    that quadratic is only valid up to ~omega_crit, above that the eddy currents are limited by their own skin effect (and grow with ~sqrt(f)), so it's rolled off: 0.1*x^2 / (1 + x^1.5)
+## both multipliers are applied to the DC resistance. All of these functions broadcast, so a (designs x frequencies) grid is just (frequencies[None,:], parameters[:,None]), see calcCoilBatch()
+def calcSkinDepth(frequency: float|np.ndarray) -> float|np.ndarray:
+    """ the skin depth of copper (in mm) at a frequency (in Hz) (infinite at DC) """
+    with np.errstate(divide='ignore'):
+        return(np.sqrt(RhoCopper / (np.pi * np.asarray(frequency, dtype=float) * magneticConstant)) / distUnitMult)
+
+def calcSkinEffectMult(frequency: float|np.ndarray, copperThickness: float|np.ndarray) -> float|np.ndarray:
+    """ R_ac/R_dc due to the skin effect (1.0 at DC) """
+    thicknessRatio = copperThickness / calcSkinDepth(frequency)
+    with np.errstate(divide='ignore', invalid='ignore'):
+        return(np.where(thicknessRatio > 0.0, thicknessRatio / (-np.expm1(-thicknessRatio)), 1.0))
+
+def calcProximityEffectMult(frequency: float|np.ndarray, turns: int|np.ndarray, clearance: float|np.ndarray, traceWidth: float|np.ndarray, copperThickness: float|np.ndarray) -> float|np.ndarray:
+    """ R_ac/R_dc due to the proximity effect (see above), single-turn coils have no neighbouring turns, so it's 1.0 for those """
+    criticalOmega = (3.1 / magneticConstant) * ((traceWidth + clearance) * distUnitMult / ((traceWidth * distUnitMult)**2)) * (RhoCopper / (copperThickness * distUnitMult))
+    omegaRatio = (2*np.pi*np.asarray(frequency, dtype=float)) / criticalOmega
+    return(np.where(turns > 1, 1 + ((0.1 * (omegaRatio**2)) / (1 + (omegaRatio**1.5))), 1.0))
+
+def calcACresistanceMult(frequency: float|np.ndarray, turns: int|np.ndarray, clearance: float|np.ndarray, traceWidth: float|np.ndarray, copperThickness: float|np.ndarray, layerStack: layerStackClass = None) -> float|np.ndarray:
+    """ returns R_ac/R_dc (skin and proximity effect) at a frequency (in Hz), multiply the (DC) calcTotalResistance() with this to get the AC resistance
+        if a layerStack is provided, every layer uses its own copper thickness (weighted by the DC resistance of each layer). The stack-up axis is broadcast against the
+         parameters, so frequency must be the last axis of the (broadcasted) parameters (e.g. frequencies of shape (F,) with parameters of shape (designs,1)) """
+    if(layerStack is None):
+        return(calcSkinEffectMult(frequency, copperThickness) * calcProximityEffectMult(frequency, turns, clearance, traceWidth, copperThickness))
+    layerThicknesses = layerStack.copperThicknesses[...,None,:] # (..., 1, layers), sothat the layers don't interfere with the frequency axis
+    frequency, turns, clearance, traceWidth = [np.asarray(param)[...,None] for param in (frequency, turns, clearance, traceWidth)]
+    layerMults = calcSkinEffectMult(frequency, layerThicknesses) * calcProximityEffectMult(frequency, turns, clearance, traceWidth, layerThicknesses)
+    return(np.sum(layerMults / layerThicknesses, axis=-1) / np.sum(1.0 / layerThicknesses, axis=-1)) # (the DC resistance of every layer is proportional to 1/thickness)
+
+def calcQualityFactor(frequency: float|np.ndarray, inductance: float|np.ndarray, resistance: float|np.ndarray, capacitance: float|np.ndarray = 0.0) -> float|np.ndarray:
+    """ Q = Im(Z)/Re(Z) of the coil, modelled as L in series with R (the AC resistance at that frequency), with the parasitic capacitance C across both
+        (with capacitance=0, this is just omega*L/R). Q drops to 0 at the self-resonant frequency, and is negative above it (where the coil acts like a capacitor) """
+    omega = 2*np.pi*np.asarray(frequency, dtype=float)
+    return(((omega * inductance * (1 - ((omega**2) * inductance * capacitance))) - (omega * (resistance**2) * capacitance)) / resistance)
+
+## batch (vectorized) math:
+def calcCoilBatch(turns: int|np.ndarray, diam: float|np.ndarray, clearance: float|np.ndarray, traceWidth: float|np.ndarray, layers: int|np.ndarray = 1, PCBthickness: float|np.ndarray = 1.6,
+                  copperThickness: float|np.ndarray = ozCopperToMM(1.0), shape: _shapeBaseClass = shapes['circle'], formula: str = 'cur_sheet', layerStack: layerStackClass = None,
+                  multilayerFormula: str = 'linear_coupling', relativePermittivity: float = PCBrelativePermittivity, frequencies: float|np.ndarray = None,
+                  surrogate: 'surrogateClass' = None) -> dict[str, np.ndarray]:
+    """ calculate the properties of many coils at once, without making a coilClass for each one.
+        all numerical parameters may be (broadcastable) numpy arrays, the shape and formula are shared by the whole batch.
+        if a layerStack is provided (which may hold many stack-ups, one per row), it replaces layers, PCBthickness and copperThickness (its stack-ups are broadcast like the other parameters)
+        multilayerFormula selects how the coupling between layers is calculated, see multilayerFormulas
+        relativePermittivity (of the PCB material) is used for the parasitic capacitance and self-resonant frequency ('capacitance' and 'SRF' results)
+        if frequencies (a 1D list/array, in Hz) are provided, the 'ACresistance' and 'Q' results are added, which have an extra (last) axis: one value per frequency (so shape (..., len(frequencies)))
+        if a surrogate (a lookup table of the same shape+formula, see surrogateModel.py) is provided, the single-layer inductance is interpolated from that, instead of calculated
+         (multi-layer 'greenhouse' coils are still calculated numerically, as the table does not include the spacing between the layers)
+        returns a dict of arrays (all with the broadcasted shape of the inputs), units are the same as the coilClass functions (mm, Ohms, Henry) """
+    if(layerStack is not None):
+        layers = layerStack.layers;  PCBthickness = layerStack.PCBthickness;  copperThickness = layerStack.copperThicknesses[...,0] # (the top layer)
+        sumOfSpacings = layerStack.calcSumOfSpacings();  stackResistanceMult = layerStack.calcResistanceMult();  stackLayerSpacing = layerStack.calcMeanLayerSpacing()
+    turns, diam, clearance, traceWidth, layers, PCBthickness, copperThickness = np.broadcast_arrays(*[np.asarray(param) for param in (turns, diam, clearance, traceWidth, layers, PCBthickness, copperThickness)])
+    layers = np.maximum(layers, 1) # same as the coilClass constructor
+    with np.errstate(divide='ignore', invalid='ignore'): # impossible coils (e.g. a negative inner diameter) just produce NaNs, a warning for every batch is not useful
+        results: dict[str, np.ndarray] = {}
+        results['simpleInnerDiam'] = calcSimpleInnerDiam(turns, diam, clearance, traceWidth, shape) * np.ones(turns.shape) # (the multiplication just makes sure the output has the full batch shape)
+        results['trueInnerDiam'] = calcTrueInnerDiam(turns, diam, clearance, traceWidth, shape) * np.ones(turns.shape)
+        results['trueDiam'] = calcTrueDiam(diam, clearance, traceWidth, shape) * np.ones(turns.shape)
+        results['layerSpacing'] = (calcLayerSpacing(layers, PCBthickness, copperThickness) if (layerStack is None) else stackLayerSpacing) * np.ones(turns.shape)
+        results['traceLength'] = shape.calcLength(turns*shape.stepsPerTurn, diam, clearance, traceWidth) * layers # (same as coilClass.calcCoilTraceLength())
+        if(layerStack is None):
+            results['resistance'] = calcTotalResistance(turns, diam, clearance, traceWidth, layers, RhoCopper / (copperThickness*distUnitMult), shape)
+        else: # every layer has its own copper thickness
+            results['resistance'] = calcCoilTraceResistance(turns, diam, clearance, traceWidth, RhoCopper / distUnitMult, shape) * stackResistanceMult
+        if((surrogate is not None) and ((surrogate.formula != formula) or (surrogate.shape.__class__ != shape.__class__))):
+            print("calcCoilBatch() ignoring surrogate", surrogate, "because it's for a different shape/formula than:", shape, formula);  surrogate = None
+        def _calcBatchSingleLayer() -> np.ndarray: # (from the lookup table, if there is one)
+            if(surrogate is not None):  return(surrogate.calcInductanceSingleLayer(turns, diam, clearance, traceWidth, copperThickness))
+            return(calcInductanceSingleLayer(turns, diam, clearance, traceWidth, shape, formula) * np.ones(turns.shape))
+        if(formula not in shape.formulaCoefficients):
+            print("could not calcCoilBatch(), for shape=", shape, " and formula=", formula)
+            results['inductanceSingleLayer'] = np.full(turns.shape, -1.0);  results['inductance'] = np.full(turns.shape, -1.0) # same as the scalar functions
+        elif(formula == 'greenhouse'): # the numerical calculation can't be vectorized over designs, so it's just a (slow) loop
+            results['inductanceSingleLayer'] = np.full(turns.shape, np.nan);  results['inductance'] = np.full(turns.shape, np.nan)
+            if(surrogate is not None):  results['inductanceSingleLayer'] = np.where(results['trueInnerDiam'] > 0.0, surrogate.calcInductanceSingleLayer(turns, diam, clearance, traceWidth, copperThickness), np.nan)
+            layerCenters = (np.arange(layers.max()) * results['layerSpacing'][...,None]) if (layerStack is None) else np.broadcast_to(layerStack.calcLayerCenters(), turns.shape + (layerStack.layers,))
+            for index in np.ndindex(turns.shape):
+                if(not (results['trueInnerDiam'][index] > 0.0)):  continue # (impossible coils stay NaN)
+                if(surrogate is None):  results['inductanceSingleLayer'][index] = calcInductanceNumerical(turns[index], diam[index], clearance[index], traceWidth[index], shape, (0.0,), copperThickness[index])
+                results['inductance'][index] = (results['inductanceSingleLayer'][index] if (layers[index] == 1) else \
+                                                calcInductanceNumerical(turns[index], diam[index], clearance[index], traceWidth[index], shape, layerCenters[index][:layers[index]], copperThickness[index]))
+        elif(multilayerFormula == 'paper4'): # the (layerPairs, turns, turns) tensor size depends on turns and layers, so designs are grouped by those
+            results['inductanceSingleLayer'] = _calcBatchSingleLayer()
+            results['inductance'] = np.array(results['inductanceSingleLayer'] * layers, dtype=float) # (np.array, sothat a 0-dimensional batch is still an array (not a numpy scalar))
+            layerCenters = (np.arange(layers.max()) * results['layerSpacing'][...,None]) if (layerStack is None) else np.broadcast_to(layerStack.calcLayerCenters(), turns.shape + (layerStack.layers,))
+            flatInductance = results['inductance'].reshape(-1) # (a view, also works for 0-dimensional batches)
+            flatDiam, flatClearance, flatTraceWidth = diam.ravel(), clearance.ravel(), traceWidth.ravel()
+            flatLayerCenters = np.broadcast_to(layerCenters, turns.shape + layerCenters.shape[-1:]).reshape(-1, layerCenters.shape[-1])
+            groups = np.unique(np.stack((turns.ravel(), layers.ravel()), axis=1), axis=0)
+            for (groupTurns, groupLayers) in groups[groups[:,1] > 1]:
+                groupIndices = np.flatnonzero((turns.ravel() == groupTurns) & (layers.ravel() == groupLayers))
+                subChunkSize = max((2**22) // ((groupLayers*(groupLayers-1)//2) * ((groupTurns*(groupTurns+1))//2)), 1) # (limits the size of the tensor to ~32MB)
+                for subStart in range(0, len(groupIndices), subChunkSize):
+                    indices = groupIndices[subStart:subStart+subChunkSize]
+                    flatInductance[indices] += 2 * calcMultilayerMutualInductance(int(groupTurns), flatDiam[indices], flatClearance[indices], flatTraceWidth[indices], flatLayerCenters[indices][...,:groupLayers], shape)
+        else:
+            results['inductanceSingleLayer'] = _calcBatchSingleLayer()
+            results['inductance'] = results['inductanceSingleLayer'] * calcMultilayerCouplingMult(layers, results['layerSpacing'], (None if (layerStack is None) else sumOfSpacings)) # (the coupling multiplier is 1.0 for single-layer coils)
+        results['capacitance'] = calcParasiticCapacitance(turns, diam, clearance, traceWidth, layers, results['layerSpacing'], copperThickness, shape, relativePermittivity, layerStack) * np.ones(turns.shape)
+        results['SRF'] = np.where(results['inductance'] > 0.0, calcSelfResonantFrequency(results['inductance'], results['capacitance']), np.nan) # (NaN for impossible coils, or when the formula failed)
+        if(frequencies is not None): # (designs x frequencies) in one go, by adding a (last) frequency axis to everything
+            frequencies = np.atleast_1d(np.asarray(frequencies, dtype=float))
+            turns, clearance, traceWidth, copperThickness = [param[...,None] for param in (turns, clearance, traceWidth, copperThickness)]
+            results['ACresistance'] = results['resistance'][...,None] * calcACresistanceMult(frequencies, turns, clearance, traceWidth, copperThickness, layerStack)
+            results['Q'] = calcQualityFactor(frequencies, results['inductance'][...,None], results['ACresistance'], results['capacitance'][...,None])
+        return(results)
+
+def formatCoilFilename(shape: _shapeBaseClass, diam: float, turns: int, traceWidth: float, clearance: float, copperThickness: float, layers: int, PCBthickness: float, resistance: float, inductance: float) -> str:
+    """ return a (consistently formatted) string based on the properties of a coil, from the values themselves (e.g. from calcCoilBatch() results, without making a coilClass) """
+    filename = shape.__class__.__name__[0:2]   # shape (first 2 letters)
+    filename += '_di'+str(int(round(diam, 0)))  # diam (millimeters)
+    filename += '_tu'+str(turns)                # turns
+    filename += '_wi'+str(int(round(traceWidth * 1000, 0))) # traceWidth (micrometers)
+    filename += '_cl'+str(int(round(clearance * 1000, 0)))  # clearance (micrometers)
     ## the following values are (more) dependent on the production process, and should be verified or ignored:
-    filename += '_cT'+str(int(round(coil.copperThickness * 1000, 0)))  # copper thickness (micrometers)
-    if(coil.layers > 1):
-        filename += '_La'+str(coil.layers)               # Layers
-        filename += '_Pt'+str(int(round(coil.PCBthickness * 1000, 0)))  # PCBthickness (micrometers)
+    filename += '_cT'+str(int(round(copperThickness * 1000, 0)))  # copper thickness (micrometers)
+    if(layers > 1):
+        filename += '_La'+str(layers)               # Layers
+        filename += '_Pt'+str(int(round(PCBthickness * 1000, 0)))  # PCBthickness (micrometers)
     ## the following values are only valid if the previous (production-dependent ones) hold true. If not, these should be ignored:
-    filename += '_Re'+str(int(round(coil.calcTotalResistance() * 1000, 0))) # Resistance (milliOhms) (assuming nothing changes!)
-    filename += '_In'+str(int(round(coil.calcInductance() * 1000000000, 0)))  # Inductance (nanoHenry) (assuming nothing changes!)
+    filename += '_Re'+str(int(round(resistance * 1000, 0))) # Resistance (milliOhms) (assuming nothing changes!)
+    filename += '_In'+str(int(round(inductance * 1000000000, 0)))  # Inductance (nanoHenry) (assuming nothing changes!)
     return(filename)
 
+def generateCoilFilename(coil: 'coilClass') -> str:
+    """ return a (consistently formatted) string based on the properties of the coil (see formatCoilFilename()) """
+    return(formatCoilFilename(coil.shape, coil.diam, coil.turns, coil.traceWidth, coil.clearance, coil.copperThickness, coil.layers, coil.PCBthickness, coil.calcTotalResistance(), coil.calcInductance()))
+
+## arc (bulge) geometry: a curve can be stored as (x, y, bulge) vertices, where the bulge of a vertex describes the arc from that vertex to the next one (like in DXF polylines):
+##  bulge = tan(includedAngle/4), positive for counter-clockwise arcs, 0 for a straight line. This is a lot more compact than a polyline, for the same accuracy
+def calcBiarcs(startPoints: np.ndarray, startTangents: np.ndarray, endPoints: np.ndarray, endTangents: np.ndarray) -> np.ndarray:
+    """ fit a biarc (2 arcs, with a smooth joint) between each pair of points, matching the direction (tangent, doesn't need to be normalized) at both points
+        (the 'equal tangent length' biarc, see https://www.ryanjuckett.com/biarc-interpolation/). All inputs are (N,2) arrays, the pieces are assumed to be connected (end i == start i+1)
+        returns a (2N+1, 3) array of (x, y, bulge) vertices: start, joint, start, joint, ..., end """
+    startTangents = startTangents / np.linalg.norm(startTangents, axis=-1, keepdims=True);  endTangents = endTangents / np.linalg.norm(endTangents, axis=-1, keepdims=True)
+    chords = endPoints - startPoints
+    chordTangentDot = np.sum(chords * (startTangents + endTangents), axis=-1)
+    tangentsDot = np.sum(startTangents * endTangents, axis=-1)
+    with np.errstate(divide='ignore', invalid='ignore'):
+        tangentLength = np.where(np.abs(1 - tangentsDot) > 1e-12, (-chordTangentDot + np.sqrt((chordTangentDot**2) + (2 * (1 - tangentsDot) * np.sum(chords**2, axis=-1)))) / (2 * (1 - tangentsDot)),
+                                 np.sum(chords**2, axis=-1) / (4 * np.sum(chords * endTangents, axis=-1))) # (parallel tangents)
+    joints = (startPoints + endPoints + (tangentLength[:,None] * (startTangents - endTangents))) / 2
+    signedAngle: Callable[[np.ndarray,np.ndarray],np.ndarray] = lambda fromVec, toVec : np.arctan2((fromVec[:,0]*toVec[:,1]) - (fromVec[:,1]*toVec[:,0]), np.sum(fromVec * toVec, axis=-1))
+    vertices = np.zeros((2*len(startPoints) + 1, 3))
+    vertices[0:-1:2,:2] = startPoints;  vertices[1::2,:2] = joints;  vertices[-1,:2] = endPoints[-1]
+    vertices[0:-1:2,2] = np.tan(signedAngle(startTangents, joints - startPoints) / 2) # (the included angle is twice the angle between the tangent and the chord)
+    vertices[1::2,2] = np.tan(signedAngle(endPoints - joints, endTangents) / 2)
+    return(vertices)
+
+def calcArcCenters(startVertices: np.ndarray, endPoints: np.ndarray) -> tuple[np.ndarray, np.ndarray]:
+    """ the centers and radii of the arcs from (x, y, bulge) startVertices to endPoints (broadcastable (...,3) and (...,2) arrays). Straight lines (bulge 0) have an infinite radius """
+    chords = endPoints[...,:2] - startVertices[...,:2]
+    halfAngles = 2 * np.arctan(startVertices[...,2]) # (half of the included angle)
+    chordLengths = np.linalg.norm(chords, axis=-1)
+    with np.errstate(divide='ignore', invalid='ignore'):
+        centers = ((startVertices[...,:2] + endPoints[...,:2]) / 2) + (np.stack((-chords[...,1], chords[...,0]), axis=-1) / (2 * np.tan(halfAngles)[...,None])) # (from the middle of the chord, along its (left) normal)
+        radii = np.abs(chordLengths / (2 * np.sin(halfAngles)))
+    return(centers, radii)
+
+def calcBiarcDeviation(vertices: np.ndarray, samplePoints: np.ndarray) -> np.ndarray:
+    """ the distance from samplePoints (N,S,2) to the nearest of the 2 arcs of each biarc in vertices (a (2N+1,3) array from calcBiarcs()), returns (N,S)
+        (it's the distance to the (full) circles of the arcs, which is only meaningful for points that are (close to being) along the biarc, like samples of the curve it was fitted to) """
+    distances = []
+    for (startVertices, endPoints) in ((vertices[0:-1:2], vertices[1::2]), (vertices[1::2], vertices[2::2])):
+        centers, radii = calcArcCenters(startVertices[:,None], endPoints[:,None])
+        chords = endPoints[:,None,:2] - startVertices[:,None,:2]
+        lineDistances = np.abs((chords[...,0]*(samplePoints[...,1]-startVertices[:,None,1])) - (chords[...,1]*(samplePoints[...,0]-startVertices[:,None,0]))) / np.linalg.norm(chords, axis=-1) # (for straight lines)
+        with np.errstate(invalid='ignore'):
+            distances.append(np.where(np.isfinite(radii), np.abs(np.linalg.norm(samplePoints - centers, axis=-1) - radii), lineDistances))
+    return(np.minimum(distances[0], distances[1]))
+
+## outline (polygon) geometry: the copper itself, instead of the centerline (for filling, rather than stroking with a thick line)
+miterLimitDefault: float = 2.0 # (in half-traceWidths) corners where the miter would stick out further than this are bevelled instead (only very sharp corners, like in SVG)
+
+def calcOutlinePolygon(centerline: np.ndarray, traceWidth: float, miterLimit: float = miterLimitDefault) -> np.ndarray:
+    """ the outline of a trace (of traceWidth) along an (N,2) centerline, as one closed (M,2) polygon (the first point is not repeated at the end):
+         the left side (offset by traceWidth/2) followed by the right side in reverse. The ends are cut off square, and the corners are mitered
+         (or bevelled, where the miter would be longer than miterLimit, on the inside of those corners the miter is just shortened) """
+    points = np.asarray(centerline, dtype=float)
+    points = points[np.concatenate(([True], np.any(points[1:] != points[:-1], axis=1)))] # (duplicate points have no direction)
+    directions = points[1:] - points[:-1]
+    directions /= np.linalg.norm(directions, axis=1, keepdims=True)
+    normals = np.stack((-directions[:,1], directions[:,0]), axis=1) # (left-hand normals of every segment)
+    normalsIn = np.concatenate((normals[:1], normals));  normalsOut = np.concatenate((normals, normals[-1:])) # the normals before and after every point (the ends only have one)
+    normalsSum = normalsIn + normalsOut
+    miters = normalsSum * (2 / np.maximum(np.sum(normalsSum**2, axis=1), 1e-12))[:,None] # (nIn+nOut)/(1+nIn.nOut), as |nIn+nOut|^2 = 2*(1+nIn.nOut). The length of a miter is 1/cos(half the corner angle)
+    miterLengths = np.linalg.norm(miters, axis=1)
+    bevel = (miterLengths > miterLimit)
+    miters *= np.minimum(1.0, miterLimit / miterLengths)[:,None] # (only used as-is on the inside of the bevelled corners)
+    turnsLeft = (((normalsIn[:,0]*normalsOut[:,1]) - (normalsIn[:,1]*normalsOut[:,0])) > 0.0)
+    halfWidth = traceWidth / 2
+    sides: list[np.ndarray] = []
+    for (sideSign, bevelSide) in ((1.0, bevel & (~turnsLeft)), (-1.0, bevel & turnsLeft)): # the bevel is on the outside of the corner (the right side when turning left)
+        sidePoints = np.empty((len(points), 2, 2)) # 2 points per corner, the second one is only kept for bevels
+        sidePoints[:,0] = points + (sideSign * halfWidth * np.where(bevelSide[:,None], normalsIn, miters))
+        sidePoints[:,1] = points + (sideSign * halfWidth * normalsOut)
+        sides.append(sidePoints.reshape(-1, 2)[np.stack((np.ones(len(points), dtype=bool), bevelSide), axis=1).ravel()])
+    return(np.concatenate((sides[0], sides[1][::-1])))
+
+class renderedCoilClass:
+    """ the rendered (centerline) coordinates of a coil, in both directions.
+        The geometry is only calculated once, the opposite-direction layer is derived from it with a (cheap) reflection.
+        Indexing works like the old [renderAsCoordinateList(False), renderAsCoordinateList(True)] list, so renderedCoil[layer%2] still works """
+    def __init__(self, forward: np.ndarray, reverseDirectionMatrix: np.ndarray):
+        self.forward: np.ndarray = forward # (N,2) array, same as coilClass.renderAsArray(False)
+        self._reverseDirectionMatrix = reverseDirectionMatrix
+        self._reverse: np.ndarray = None # only calculated when it's actually needed (single-layer coils don't)
+    @property
+    def reverse(self) -> np.ndarray:
+        """ (N,2) array, same as coilClass.renderAsArray(True) """
+        if(self._reverse is None):
+            self._reverse = self.forward @ self._reverseDirectionMatrix.T
+        return(self._reverse)
+    def __getitem__(self, reverseDirection: int) -> np.ndarray:
+        return(self.reverse if ((reverseDirection % 2) != 0) else self.forward)
+    def __len__(self) -> int:
+        return(2)
+    def __iter__(self):
+        return(iter((self.forward, self.reverse)))
+    def calcReturnTrace(self) -> np.ndarray:
+        """ (2,2) array, the centerline of the return trace (for an uneven number of layers), from below/above the start of the coil to the end """
+        return(np.array([(self.forward[-1][0], self.forward[0][1]), self.forward[-1]]))
+    def asPolygons(self, traceWidth: float, layers: int) -> list[np.ndarray]:
+        """ the (filled) copper outline of every layer (see calcOutlinePolygon()), plus the return trace (for an uneven number of layers), as a list of (M,2) arrays
+            only the forward outline is calculated, the reverse one is derived from it (like the centerline) """
+        forwardOutline = calcOutlinePolygon(self.forward, traceWidth)
+        outlines = [forwardOutline, ((forwardOutline @ self._reverseDirectionMatrix.T) if (layers > 1) else None)]
+        polygons = [outlines[layer % 2] for layer in range(layers)]
+        if((layers%2)!=0):  polygons.append(calcOutlinePolygon(self.calcReturnTrace(), traceWidth))
+        return(polygons)
+
+coilParameterNames: tuple[str] = ('turns', 'diam', 'clearance', 'traceWidth', 'layers', 'PCBthickness', 'copperThickness', 'shape', 'formula', 'CCW', 'layerStack', 'multilayerFormula') # assigning any of these (coilClass attributes) clears the cached results
+
+def _validCoilCache(coil: 'coilClass') -> dict[str,float]:
+    """ the cached results of a coil, cleared first if a coefficient set was loaded since they were calculated (the cache stores the coefficientGeneration it belongs to) """
+    cache = coil._cache
+    if(cache.get('coefficientGeneration') != coefficientGeneration):
+        cache.clear();  cache['coefficientGeneration'] = coefficientGeneration
+    return(cache)
+
+def _cachedCoilMethod(func: Callable) -> Callable:
+    """ (decorator) remember the result of a (parameterless) coilClass method, until one of the coilParameterNames attributes is assigned (see coilClass.__setattr__) or a coefficient set is loaded
+        NOTE: changing the inside of a parameter (e.g. an attribute of the shape object) is not detected, just assign the parameter again to clear the cache """
+    @functools.wraps(func)
+    def cachedFunc(self):
+        cache = _validCoilCache(self)
+        if(func.__name__ not in cache):  cache[func.__name__] = func(self)
+        return(cache[func.__name__])
+    return(cachedFunc)
+
+def _coilClassDefault(parameterName: str):
+    """ the default value of a coilClass constructor parameter (by name, sothat adding parameters doesn't break the fallbacks in the constructor) """
+    return(inspect.signature(coilClass.__init__).parameters[parameterName].default)
+
 class coilClass:
     """ a class to hold the parameter set and rendered output of a coil """
-    def __init__(self, turns:int, diam:float, clearance:float, traceWidth:float, layers:int=1, PCBthickness:float=1.6, copperThickness:float=ozCopperToMM(1.0), shape:_shapeBaseClass=shapes['circle'], formula:str='cur_sheet', CCW:bool=False):
+    layerStack: layerStackClass = None # (class-level defaults, for subclasses that don't run __init__)
+    multilayerFormula: str = 'linear_coupling'
+    def __init__(self, turns:int, diam:float, clearance:float, traceWidth:float, layers:int=1, PCBthickness:float=1.6, copperThickness:float=ozCopperToMM(1.0), shape:_shapeBaseClass=shapes['circle'], formula:str='cur_sheet', CCW:bool=False,
+                 layerStack:layerStackClass=None, multilayerFormula:str='linear_coupling'):
+        self._cache: dict[str,float] = {} # results of the calc functions (cleared when a parameter changes)
         ## the parameters of the coil are stored as local non-static class variables:
         self.turns = turns # number of turns in coil
         self.diam = diam # (mm) diameter (target) of coil
@@ -389,47 +894,109 @@ class coilClass:
         self.PCBthickness = PCBthickness # (mm) (only used if layers > 1) layerSpacing is calculated as: PCBthickness/(N-1) - copperThickness*(N-1) where N is the number of copper layers (e.g. 2, 4, 6)
         self.copperThickness = copperThickness # (mm) copper thickness (each layer), defaults to 1oz-worth = 30~34.8um = 0.03~0.0348mm
         # if((layers>1) and (PCBthickness <= 0.0)):  raise(Exception("please set PCBthickness in coilClass constructor when layers>1"))
-        self.shape = (shape if issubclass(shape.__class__, _shapeBaseClass) else self.__init__.__defaults__[-2]) # determine if the desired shape string is in the formulaCoefficients dict
+        self.shape = (shape if issubclass(shape.__class__, _shapeBaseClass) else _coilClassDefault('shape')) # determine if the desired shape string is in the formulaCoefficients dict
         if(self.shape.__class__ != shape.__class__):  print("coilClass init() changing shape from:", shape, "to", self.shape, "because it's not a _shapeBaseClass subclass")
-        self.formula = (formula if (formula in self.shape.formulaCoefficients) else self.__init__.__defaults__[-1]) # determine if the desired formula string is in the formulaCoefficients dict
+        self.formula = (formula if (formula in self.shape.formulaCoefficients) else _coilClassDefault('formula')) # determine if the desired formula string is in the formulaCoefficients dict
         if(self.formula != formula):  print("coilClass init() changing formula from:", formula, "to", self.formula, "because it's not in the "+str(self.shape)+".formulaCoefficients")
         self.CCW = CCW # whether the coil runs Counter-ClockWise (on the top-layer)
+        if(layerStack is not None): # (optional) a non-equidistant stack-up, which overrules layers, PCBthickness and copperThickness
+            if(layerStack.copperThicknesses.ndim > 1):  raise(Exception("coilClass can only have 1 layerStack, not "+str(len(layerStack))))
+            self.layers = layerStack.layers;  self.PCBthickness = float(layerStack.PCBthickness);  self.copperThickness = float(layerStack.copperThicknesses[0]) # (only used for display, the stack itself is used in the calculations)
+        self.layerStack = layerStack
+        self.multilayerFormula = (multilayerFormula if (multilayerFormula in multilayerFormulas) else _coilClassDefault('multilayerFormula')) # how the coupling between layers is calculated (see multilayerFormulas)
+        if(self.multilayerFormula != multilayerFormula):  print("coilClass init() changing multilayerFormula from:", multilayerFormula, "to", self.multilayerFormula, "because it's not in multilayerFormulas:", multilayerFormulas)
 
-    ## the non-static class functions just refer to the static (global) functions above
+    def __setattr__(self, name: str, value):
+        """ clear the cached calc results whenever a parameter is (re)assigned, e.g. by the UI (coil.turns += 1) """
+        if(name in coilParameterNames):
+            self.__dict__['_cache'] = {}
+            if((name in ('layers', 'PCBthickness', 'copperThickness')) and (self.layerStack is not None)):
+                print("coilClass removing layerStack, because", name, "was changed (the coil is equidistant again)");  self.__dict__['layerStack'] = None
+        object.__setattr__(self, name, value)
+
+    ## the non-static class functions just refer to the static (global) functions above (the results are cached, see _cachedCoilMethod)
+    @_cachedCoilMethod
     def calcCoilTraceLength(self):  return(self.shape.calcLength(self.turns*self.shape.stepsPerTurn, self.diam, self.clearance, self.traceWidth) * self.layers)
 
+    @_cachedCoilMethod
     def calcSimpleInnerDiam(self):  return(calcSimpleInnerDiam(self.turns, self.diam, self.clearance, self.traceWidth, self.shape))
+    @_cachedCoilMethod
     def calcTrueInnerDiam(self):  return(calcTrueInnerDiam(self.turns, self.diam, self.clearance, self.traceWidth, self.shape))
+    @_cachedCoilMethod
     def calcTrueDiam(self):  return(calcTrueDiam(self.diam, self.clearance, self.traceWidth, self.shape))
+    @_cachedCoilMethod
     def _calcTrueDiamOffset(self):  return(_calcTrueDiamOffset(self.clearance, self.traceWidth, self.shape))
 
+    @_cachedCoilMethod
     def calcTraceSpacing(self):  return(calcTraceSpacing(self.clearance, self.traceWidth))
+    @_cachedCoilMethod
     def calcReturnTraceLength(self):  return(calcReturnTraceLength(self.turns, self.clearance, self.traceWidth) if ((self.layers%2)!=0) else 0.0) # coils with an even number of layers don't need a return trace
     
-    def calcTotalResistance(self):  return(calcTotalResistance(self.turns, self.diam, self.clearance, self.traceWidth, self.layers, RhoCopper / (self.copperThickness*distUnitMult), self.shape))
-    def calcLayerSpacing(self):  return(calcLayerSpacing(self.layers,self.PCBthickness,self.copperThickness))
-    def calcInductanceSingleLayer(self):  return(calcInductanceSingleLayer(self.turns, self.diam, self.clearance, self.traceWidth, self.shape, self.formula))
-    def calcInductance(self):  return(self.calcInductanceSingleLayer() if (self.layers == 1) else \
-                                      calcInductanceMultilayer(self.turns, self.diam, self.clearance, self.traceWidth, self.layers, self.calcLayerSpacing(), self.shape, self.formula))
+    @_cachedCoilMethod
+    def calcTotalResistance(self):  return(calcTotalResistance(self.turns, self.diam, self.clearance, self.traceWidth, self.layers, RhoCopper / (self.copperThickness*distUnitMult), self.shape) if (self.layerStack is None) else \
+                                           (calcCoilTraceResistance(self.turns, self.diam, self.clearance, self.traceWidth, RhoCopper / distUnitMult, self.shape) * float(self.layerStack.calcResistanceMult()))) # every layer has its own copper thickness
+    @_cachedCoilMethod
+    def calcLayerSpacing(self):  return(calcLayerSpacing(self.layers,self.PCBthickness,self.copperThickness) if (self.layerStack is None) else float(self.layerStack.calcMeanLayerSpacing())) # (the average spacing, for non-equidistant stack-ups)
+    @_cachedCoilMethod
+    def calcInductanceSingleLayer(self):  return(calcInductanceSingleLayer(self.turns, self.diam, self.clearance, self.traceWidth, self.shape, self.formula, self.copperThickness)) # (the numerical one ('greenhouse') also uses the copper thickness)
+    @_cachedCoilMethod
+    def calcInductance(self):
+        return(self.calcInductanceSingleLayer() if (self.layers == 1) else \
+               calcInductanceMultilayer(self.turns, self.diam, self.clearance, self.traceWidth, self.layers, self.calcLayerSpacing(), self.shape, self.formula, self.layerStack, self.multilayerFormula, self.copperThickness))
+    @_cachedCoilMethod
+    def calcParasiticCapacitance(self):  return(float(calcParasiticCapacitance(self.turns, self.diam, self.clearance, self.traceWidth, self.layers, self.calcLayerSpacing(), self.copperThickness, self.shape, PCBrelativePermittivity, self.layerStack)))
+    @_cachedCoilMethod
+    def calcSelfResonantFrequency(self):  return(float(calcSelfResonantFrequency(self.calcInductance(), self.calcParasiticCapacitance())))
+    def calcACresistance(self, frequency: float|np.ndarray) -> float|np.ndarray: # (not cached, as it takes a parameter)
+        """ the resistance (in Ohms) at a frequency (in Hz), including the skin and proximity effect. frequency may be an array, for an R(f) curve """
+        ACresistanceMult = calcACresistanceMult(np.atleast_1d(frequency), self.turns, self.clearance, self.traceWidth, self.copperThickness, self.layerStack)
+        return((self.calcTotalResistance() * ACresistanceMult).reshape(np.shape(frequency))[()])
+    def calcQualityFactor(self, frequency: float|np.ndarray) -> float|np.ndarray:
+        """ the Q factor at a frequency (in Hz) (including the parasitic capacitance). frequency may be an array, for a Q(f) curve """
+        return(calcQualityFactor(frequency, self.calcInductance(), self.calcACresistance(frequency), self.calcParasiticCapacitance()))
+    def loadCoefficientSet(self, filename: str|dict = 'builtin') -> bool:
+        """ (macro) load a (re)fitted coefficient set (see the global loadCoefficientSet()). NOTE: the coefficients are global, they apply to (the cached results of) all coils """
+        return(loadCoefficientSet(filename))
     
     ## some ways of rendering the coil:
-    def renderAsCoordinateList(self, reverseDirection=False, angleResOverride: float = None) -> list[tuple[float, float]]:
+    def renderAsArray(self, reverseDirection=False, angleResOverride: float = None, chordTolerance: float = None) -> np.ndarray:
+        """ render the coil as a (contiguous, float64) array of 2D coordinates with shape (N,2)
+            continous shapes are rendered at a fixed angular resolution (angleRenderResDefault or angleResOverride),
+             or, if chordTolerance (mm) is provided, with the fewest points that stay within that distance of the true curve (see circularSpiral.calcAnglesForChordTolerance()) """
         if(self.shape.isDiscrete):
-            if(angleResOverride is not None):  print("renderAsCoordinateList() ignoring angleResOverride, shape not circular")
-            return([self.shape.calcPos(i, self.diam, self.clearance, self.traceWidth, self.CCW ^ reverseDirection) for i in range(self.shape.stepsPerTurn*self.turns + 1)]) # a simple forloop to render all the corner positions
+            if(angleResOverride is not None):  print("renderAsArray() ignoring angleResOverride, shape not circular") # (chordTolerance is ignored silently, as the corners are exact anyway)
+            return(self.shape.calcPosArray(np.arange(self.shape.stepsPerTurn*self.turns + 1), self.diam, self.clearance, self.traceWidth, self.CCW ^ reverseDirection)) # all the corner positions in one go
+        elif((chordTolerance is not None) and (chordTolerance > 0.0)):
+            return(self.shape.calcPosArray(self.shape.calcAnglesForChordTolerance(self.turns, self.diam, self.clearance, self.traceWidth, chordTolerance), self.diam, self.clearance, self.traceWidth, self.CCW ^ reverseDirection))
         else: # for continous shapes (e.g. circularSpiral)
+            if(chordTolerance is not None):  print("renderAsArray() ignoring chordTolerance, it should be > 0, not:", chordTolerance)
             angleRes = (angleResOverride if (angleResOverride is not None) else angleRenderResDefault)
-            return([self.shape.calcPos(i*angleRes, self.diam, self.clearance, self.traceWidth, self.CCW ^ reverseDirection) for i in range(int(round((self.shape.stepsPerTurn*self.turns)/angleRes, 0)) + 1)]) # renders the continous shape
-    # def renderAsPolygon(self):
-    #     # TODO
+            return(self.shape.calcPosArray(np.arange(int(round((self.shape.stepsPerTurn*self.turns)/angleRes, 0)) + 1)*angleRes, self.diam, self.clearance, self.traceWidth, self.CCW ^ reverseDirection)) # renders the continous shape
+    def renderAsCoordinateList(self, reverseDirection=False, angleResOverride: float = None, chordTolerance: float = None) -> list[tuple[float, float]]:
+        """ (thin wrapper) same as renderAsArray(), but as a list of (x,y) tuples """
+        return(list(map(tuple, self.renderAsArray(reverseDirection, angleResOverride, chordTolerance).tolist())))
+    def render(self, angleResOverride: float = None, chordTolerance: float = None) -> renderedCoilClass:
+        """ render the coil only once, and get both directions (for multi-layer coils) from the returned object (see renderAsArray() for the resolution parameters) """
+        return(renderedCoilClass(self.renderAsArray(False, angleResOverride, chordTolerance), self.shape.reverseDirectionMatrix()))
+    def renderAsArcs(self, reverseDirection=False, tolerance: float = chordToleranceDefault) -> np.ndarray:
+        """ render the coil as a (N,3) array of (x, y, bulge) vertices (see calcBiarcs()), continous shapes are approximated with arcs that stay within tolerance (mm) of the curve
+            (a lot fewer vertices than renderAsArray(), for the same accuracy). Discrete shapes are just their corners (all bulges 0) """
+        if(self.shape.isDiscrete):
+            corners = self.renderAsArray(reverseDirection)
+            return(np.column_stack((corners, np.zeros(len(corners)))))
+        return(self.shape.calcArcsForTolerance(self.turns, self.diam, self.clearance, self.traceWidth, tolerance, self.CCW ^ reverseDirection))
+    def renderAsPolygon(self, angleResOverride: float = None, chordTolerance: float = None) -> list[np.ndarray]:
+        """ render the copper outline of the coil, as one closed (M,2) polygon per layer, plus the return trace (for an uneven number of layers)
+            (see renderedCoilClass.asPolygons() and renderAsArray() for the resolution parameters) """
+        return(self.render(angleResOverride, chordTolerance).asPolygons(self.traceWidth, self.layers))
 
     ## some ways of saving/exporting the coil
     def generateCoilFilename(self):  return(generateCoilFilename(self))
-    def saveDXF(self) -> list[str]:
+    def saveDXF(self, chordTolerance: float = chordToleranceDefault, useArcs: bool = None, useOutline: bool = None) -> list[str]:
         import DXFexporter as DXFexp
         filenames: list[str] = []
         for outputFormat in DXFexp.DXFoutputFormats:
-            filenames += DXFexp.saveDXF(self, outputFormat)
+            filenames += DXFexp.saveDXF(self, outputFormat, chordTolerance, (DXFexp.useArcsDefault if (useArcs is None) else useArcs), (DXFexp.useOutlineDefault if (useOutline is None) else useOutline))
         return(filenames)
     def to_excel(self, filename:str = None) -> str:
         """ produce an excel file with only 1 row of data; this coil """
@@ -441,6 +1008,9 @@ class coilClass:
         import cv2exporter as cv2exp
         cv2exp.imwrite(self, *arg)
 
+if(os.environ.get('PCBCOIL_INSTRUMENT')): # (opt-in) profiling of the calc/render/export functions, see instrumentation.py (only imported when needed)
+    import sys, instrumentation
+    instrumentation.enableFromEnvironment(sys.modules[__name__])
 
 if __name__ == "__main__": # normal usage
     try:
@@ -460,7 +1030,13 @@ if __name__ == "__main__": # normal usage
         
         # coil = coilClass(turns=1, diam=40, clearance=0.30, traceWidth=1.0, layers=1,                   copperThickness=0.030, shape=shapes['circle'], formula='cur_sheet') # render test
 
-        renderedLineLists: list[list[tuple[int,int]]] = [coil.renderAsCoordinateList(False), coil.renderAsCoordinateList(True)]
+        coilResultCache = None
+        if(os.environ.get('PCBCOIL_CACHE')): # (opt-in) persistent result cache, see resultCache.py (only imported when needed)
+            import sys, resultCache
+            coilResultCache = resultCache.openFromEnvironment(sys.modules[__name__])
+            coilResultCache.fillCoilCache(coil)
+
+        renderedLineLists: renderedCoilClass = (coil.render() if (coilResultCache is None) else coilResultCache.render(coil))
         
         if(visualization):
             import pygameRenderer as PR # rendering code
@@ -489,7 +1065,8 @@ if __name__ == "__main__": # normal usage
                 if(drawer.localVarUpdated):
                     drawer.localVarUpdated = False
                     coil = drawer.localVar
-                    renderedLineLists = [coil.renderAsCoordinateList(False), coil.renderAsCoordinateList(True)]
+                    if(coilResultCache is not None):  coilResultCache.fillCoilCache(coil) # (the debug text and filename below use the results)
+                    renderedLineLists = (coil.render() if (coilResultCache is None) else coilResultCache.render(coil))
                     drawer.debugText = drawer.makeDebugText(coil)
                     drawer.lastFilename = coil.generateCoilFilename()
 
@@ -0,0 +1,185 @@
+"""
+this file is a (headless) benchmark suite, to see whether a change to PCBcoilV2 (or one of the exporters) made things faster or slower
+it times the math (calcInductance/calcTotalResistance/calcCoilBatch throughput), the rendering, and every exporter (DXF, excel, cv2 images),
+ for a few representative coils (the ones from the PCBcoilV2 __main__ example) at several sizes.
+it also times the cold start of coilCLI.py (a whole new python process), compared to the unavoidable part (starting python and importing numpy), see coldStartBudget
+
+the results are stored as .json files, sothat 2 runs (e.g. before and after a commit) can be compared:
+    python benchmark.py -o before.json
+    (make your changes)
+    python benchmark.py -o after.json --compare before.json
+
+every benchmark is run a few times (each run loops the function enough to take at least minRunTime), the best (fastest) run is the most repeatable number,
+ the median is also stored. The exporters write their files to a temporary folder (which is deleted afterwards).
+exporters whose (optional) libraries are not installed (dxfwrite, pandas, cv2) are skipped
+"""
+
+import numpy as np
+import time
+import timeit
+import json
+import os
+import sys
+import platform
+import tempfile
+import subprocess
+from typing import Callable # just for type-hints to provide some nice syntax colering
+
+import PCBcoilV2 as PCBcoil
+
+benchmarkFormatVersion: int = 1 # increment when the structure of the .json output changes (comparing is only done for matching versions)
+
+## representative coils (see the PCBcoilV2 __main__ example):
+benchmarkCoils: dict[str, dict] = {'6L_24mm' :    dict(turns=8,  diam=24, clearance=0.10,  traceWidth=1.0,   layers=6, PCBthickness=1.2,  copperThickness=0.030,  shape=PCBcoil.shapes['circle']), # 6 layer PCB
+                                   'WLP_40mm' :   dict(turns=9,  diam=40, clearance=0.15,  traceWidth=1.35,  layers=2, PCBthickness=0.13, copperThickness=0.045,  shape=PCBcoil.shapes['circle']), # WLP final one 40mm
+                                   'NFC_square' : dict(turns=11, diam=35, clearance=60/56, traceWidth=10/56, layers=1,                    copperThickness=0.0015, shape=PCBcoil.shapes['square'])} # NFC antenna phase 1 (PET)
+benchmarkSizes: dict[str, float] = {'x1' : 1.0, 'x4' : 4.0} # the rendering/exporting benchmarks are also done with coils that have this many times the turns and diameter
+imwritePixelsPerMM: tuple[float] = (20.0, 56.0) # (56 pixels/mm is what the NFC antenna was printed at)
+batchSize: int = 10000 # number of coils per calcCoilBatch() call
+coldStartArguments: list[str] = ['eval', '--turns', '9', '--diam', '40', '--clearance', '0.15', '--traceWidth', '0.9', '--layers', '2', '--PCBthickness', '0.6', '--json'] # a one-coil query (see coilCLI.py)
+coldStartBudget: float = 0.03 # (seconds) how much longer a one-coil coilCLI.py query may take than just starting python and importing numpy (which can't be avoided, and is most of the total)
+
+minRunTime: float = 0.2 # (seconds) each run loops the benchmarked function until it takes at least this long
+defaultRuns: int = 5
+defaultCompareThreshold: float = 0.10 # ratios beyond +-10% are marked as slower/faster in compareResults()
+
+def makeCoil(coilName: str, sizeMult: float = 1.0) -> PCBcoil.coilClass:
+    """ one of the benchmarkCoils, with sizeMult times the turns and diameter """
+    params = dict(benchmarkCoils[coilName])
+    params['turns'] = max(int(round(params['turns'] * sizeMult)), 1);  params['diam'] = params['diam'] * sizeMult
+    return(PCBcoil.coilClass(**params))
+
+def timeFunction(func: Callable, runs: int = defaultRuns, minTime: float = minRunTime) -> dict[str, float]:
+    """ time a (parameterless) function, returns the best/median time per call (in seconds) and how many calls were made """
+    timer = timeit.Timer(func)
+    loops, autorangeTime = timer.autorange() # (loops until it takes at least 0.2 seconds)
+    loops = max(int(np.ceil(loops * minTime / autorangeTime)), 1)
+    runTimes = np.array(timer.repeat(repeat=runs, number=loops)) / loops
+    return({'best' : float(np.min(runTimes)), 'median' : float(np.median(runTimes)), 'loops' : loops, 'runs' : runs})
+
+def _clearCacheAnd(coil: PCBcoil.coilClass, methodName: str) -> Callable:
+    """ calling a cached coilClass method twice would only time the cache, so clear it first """
+    method = getattr(coil, methodName)
+    def clearedCall():
+        coil.__dict__['_cache'] = {}
+        return(method())
+    return(clearedCall)
+
+def _makeBenchmarks() -> dict[str, Callable]:
+    """ all the benchmarks, by name ('category/coil/size'), as parameterless functions """
+    benchmarks: dict[str, Callable] = {}
+    ## math:
+    for coilName in benchmarkCoils:
+        coil = makeCoil(coilName)
+        for methodName in ('calcInductance', 'calcTotalResistance'):
+            benchmarks[methodName+'/'+coilName] = _clearCacheAnd(coil, methodName)
+        params = {key : value for (key, value) in benchmarkCoils[coilName].items() if (key not in ('shape',))}
+        randomGen = np.random.default_rng(0)
+        batchParams = dict(params, turns=randomGen.integers(1, 2*params['turns'], batchSize), diam=params['diam'] * randomGen.uniform(0.5, 2.0, batchSize)) # (random, but the same every time)
+        benchmarks['calcCoilBatch/'+coilName] = (lambda batchParams=batchParams, shape=benchmarkCoils[coilName]['shape'] : PCBcoil.calcCoilBatch(**batchParams, shape=shape))
+    ## rendering:
+    for coilName in benchmarkCoils:
+        for sizeName in benchmarkSizes:
+            coil = makeCoil(coilName, benchmarkSizes[sizeName])
+            benchmarks['renderAsCoordinateList/'+coilName+'/'+sizeName] = coil.renderAsCoordinateList
+            benchmarks['renderAsPolygon/'+coilName+'/'+sizeName] = coil.renderAsPolygon
+    ## exporters (optional libraries, only imported when needed):
+    try:
+        import DXFexporter
+        for coilName in benchmarkCoils:
+            for sizeName in benchmarkSizes:
+                benchmarks['saveDXF/'+coilName+'/'+sizeName] = (lambda coil=makeCoil(coilName, benchmarkSizes[sizeName]) : DXFexporter.saveDXF(coil, 'EasyEDA')) # (the only format that is implemented)
+    except ImportError as excep:
+        print("skipping saveDXF benchmarks:", excep)
+    try:
+        import excelExporter
+        for coilName in benchmarkCoils:
+            for coilCount in (1, 100):
+                benchmarks['exportCoils/'+coilName+'/'+str(coilCount)+'coils'] = (lambda coilList=[makeCoil(coilName) for _ in range(coilCount)] : excelExporter.exportCoils(coilList, 'benchmark'))  # (the coil results are cached after the first call, so this is mostly the excel writing)
+    except ImportError as excep:
+        print("skipping exportCoils benchmarks:", excep)
+    try:
+        import cv2exporter
+        for coilName in benchmarkCoils:
+            for pixelsPerMM in imwritePixelsPerMM:
+                benchmarks['imwrite/'+coilName+'/'+str(int(pixelsPerMM))+'ppmm'] = (lambda coil=makeCoil(coilName), pixelsPerMM=pixelsPerMM : cv2exporter.imwrite(coil, pixelsPerMM))
+    except ImportError as excep:
+        print("skipping imwrite benchmarks:", excep)
+    ## cold start (a new python process for every call):
+    CLIfilename = os.path.join(os.path.dirname(os.path.abspath(__file__)), 'coilCLI.py')
+    benchmarks['coldStart/importNumpy'] = (lambda : subprocess.run([sys.executable, '-c', 'import numpy'], check=True, capture_output=True))
+    benchmarks['coldStart/coilCLI_eval'] = (lambda : subprocess.run([sys.executable, CLIfilename] + coldStartArguments, check=True, capture_output=True))
+    return(benchmarks)
+
+def _gitCommit() -> str|None:
+    """ the current commit hash (or None if git is not available) """
+    try:
+        return(subprocess.run(['git', 'rev-parse', '--short', 'HEAD'], cwd=os.path.dirname(os.path.abspath(__file__)), capture_output=True, text=True, timeout=10).stdout.strip() or None)
+    except Exception:
+        return(None)
+
+def runBenchmarks(nameFilter: str = None, runs: int = defaultRuns, minTime: float = minRunTime, silent: bool = False) -> dict:
+    """ run all benchmarks (whose name contains nameFilter, if provided), returns a (json-serializable) dict with the results and some info about the machine """
+    benchmarks = _makeBenchmarks()
+    results: dict[str, dict] = {}
+    originalDir = os.getcwd()
+    with tempfile.TemporaryDirectory() as tempDir:
+        os.chdir(tempDir) # the exporters save their files in the current folder
+        try:
+            for name in benchmarks:
+                if((nameFilter is not None) and (nameFilter not in name)):  continue
+                results[name] = timeFunction(benchmarks[name], runs, minTime)
+                if(not silent):  print(name.ljust(45), str(round(results[name]['best']*1000, 4)).rjust(10), "ms")
+        finally:
+            os.chdir(originalDir)
+    if(('coldStart/importNumpy' in results) and ('coldStart/coilCLI_eval' in results)):
+        coldStartOverhead = results['coldStart/coilCLI_eval']['best'] - results['coldStart/importNumpy']['best']
+        if(not silent):  print("coilCLI cold start:", round(results['coldStart/coilCLI_eval']['best']*1000, 1), "ms, of which", round(coldStartOverhead*1000, 1), "ms more than importing numpy", ("(OK)" if (coldStartOverhead <= coldStartBudget) else "(OVER BUDGET: "+str(coldStartBudget*1000)+" ms)"))
+    return({'formatVersion' : benchmarkFormatVersion,
+            'timestamp' : time.strftime('%Y-%m-%d %H:%M:%S'),
+            'commit' : _gitCommit(),
+            'python' : sys.version.split()[0],
+            'numpy' : np.__version__,
+            'platform' : platform.platform(),
+            'processor' : platform.processor(),
+            'coefficientSetVersion' : PCBcoil.coefficientSetVersion,
+            'results' : results})
+
+def saveResults(results: dict, filename: str):
+    with open(filename, 'w') as jsonFile:
+        json.dump(results, jsonFile, indent=2)
+
+def loadResults(filename: str) -> dict:
+    with open(filename, 'r') as jsonFile:
+        return(json.load(jsonFile))
+
+def compareResults(oldResults: dict|str, newResults: dict|str, threshold: float = defaultCompareThreshold, silent: bool = False) -> dict[str, float]:
+    """ compare 2 sets of results (dicts or .json filenames), returns the (new/old) ratio of the best times per benchmark (only those in both)
+        (> 1 means the new one is slower) """
+    oldResults = (loadResults(oldResults) if isinstance(oldResults, str) else oldResults)
+    newResults = (loadResults(newResults) if isinstance(newResults, str) else newResults)
+    if(oldResults.get('formatVersion') != newResults.get('formatVersion')):  print("compareResults() can't compare different formatVersions:", oldResults.get('formatVersion'), newResults.get('formatVersion'));  return({})
+    if((oldResults['platform'] != newResults['platform']) and (not silent)):  print("compareResults() warning: the results were made on different machines:", oldResults['platform'], newResults['platform'])
+    ratios: dict[str, float] = {name : (newResults['results'][name]['best'] / oldResults['results'][name]['best']) for name in newResults['results'] if (name in oldResults['results'])}
+    if(not silent):
+        print("comparing", oldResults['commit'], "("+oldResults['timestamp']+") ->", newResults['commit'], "("+newResults['timestamp']+")")
+        for name in ratios:
+            verdict = ('slower' if (ratios[name] > (1+threshold)) else ('faster' if (ratios[name] < (1/(1+threshold))) else ''))
+            print(name.ljust(45), str(round(oldResults['results'][name]['best']*1000, 4)).rjust(10), "->", str(round(newResults['results'][name]['best']*1000, 4)).rjust(10), "ms", ("x"+str(round(ratios[name], 2))).rjust(7), verdict)
+        missing = [name for name in oldResults['results'] if (name not in newResults['results'])]
+        if(len(missing) > 0):  print("("+str(len(missing)), "benchmarks were not in the new results)")
+    return(ratios)
+
+
+if __name__ == "__main__":
+    import argparse
+    parser = argparse.ArgumentParser(description="benchmark the PCBcoilV2 math, rendering and exporters")
+    parser.add_argument('-o', '--output', default=None, help="save the results to this .json file")
+    parser.add_argument('-c', '--compare', default=None, help="compare the results to an older .json file")
+    parser.add_argument('-f', '--filter', default=None, help="only run the benchmarks whose name contains this (e.g. 'imwrite' or 'WLP')")
+    parser.add_argument('-r', '--runs', type=int, default=defaultRuns, help="runs per benchmark (the fastest run counts)")
+    parser.add_argument('--quick', action='store_true', help="fewer/shorter runs, for a rough idea")
+    args = parser.parse_args()
+    results = runBenchmarks(args.filter, (2 if args.quick else args.runs), (0.02 if args.quick else minRunTime))
+    if(args.output is not None):  saveResults(results, args.output);  print("saved results to", args.output)
+    if(args.compare is not None):  compareResults(args.compare, results)
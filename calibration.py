@@ -0,0 +1,334 @@
+"""
+this file (re)fits the formula coefficients and couplingConstant_D (see PCBcoilV2) to measured coils, and writes them as a (versioned) coefficient set (.json),
+ which can be loaded with PCBcoilV2.loadCoefficientSet() (or coilClass.loadCoefficientSet()), sothat adding new measurements doesn't mean editing the constants in the code.
+
+measurements are a dict of (1D) arrays, one entry per measured coil (like a sweep chunk), see measurementColumns. They can be made from a list of rows (dicts),
+ a .csv file (with those column names), or an excel sheet in the format of 'documentation/measurement data in excel.xlsx', see loadMeasurements()
+
+the fit is done in 2 (linear least-squares) steps:
+- the single-layer formula coefficients, from the single-layer measurements of each shape. Each formula can be rewritten to be linear in (a transformation of) its coefficients:
+   wheeler:   mu0*n^2*d_avg/L = 1/K1 + (K2/K1)*rho
+   cur_sheet: L/(mu0*n^2*d_avg/2) = c1*ln(c2) - c1*ln(rho) + c1*c3*rho + c1*c4*rho^2
+   monomial:  ln(L) = ln(beta) + a1*ln(d_out) + a2*ln(w) + a3*ln(d_avg) + a4*ln(n) + a5*ln(s)
+  with only a few measurements (fewer than 2 per coefficient), only the overall scale (the first coefficient, which all formulas are proportional to) is fitted instead
+- the coupling constants, from the multi-layer measurements: (L_measured/L_single - layers)/2 = D0*triangularNumber + D1*sumOfSpacings   (which is what i did by hand in the excel sheet)
+both steps are weighted to minimize the relative error (instead of the absolute error), sothat the big coils don't dominate the fit.
+
+the confidence intervals come from bootstrapping: the fit is repeated on many resamples (with replacement) of the measurements.
+ a resample is the same as giving every measurement an (integer) weight, so a whole batch of resamples is fitted at once (batched normal equations), and the batches are spread over all CPU cores
+"""
+
+import numpy as np
+import os
+import csv
+import json
+import time
+import hashlib
+from concurrent.futures import ProcessPoolExecutor
+
+import PCBcoilV2 # (for the (global) coefficient set that is currently in use)
+from PCBcoilV2 import calcCoilBatch, calcTrueDiam, calcTrueInnerDiam, shapes, ozCopperToMM, magneticConstant, distUnitMult
+
+## the columns of a measurements dict (and .csv file), units are mm, Henry and Ohm.
+## layerSpacing (center-to-center) is only needed for multi-layer coils, sumOfSpacings (see layerStackClass.calcSumOfSpacings()) only for non-equidistant ones. resistance may be NaN (not measured)
+measurementColumns: dict[str, type] = {'shape' : str, 'turns' : int, 'diam' : float, 'clearance' : float, 'traceWidth' : float, 'layers' : int, 'layerSpacing' : float,
+                                       'sumOfSpacings' : float, 'copperThickness' : float, 'inductance' : float, 'resistance' : float}
+shapeAliases: dict[str, str] = {'square' : 'square', 'circular' : 'circle', 'circle' : 'circle', 'hexagon' : 'hexagon', 'hexagonal' : 'hexagon', 'octagon' : 'octagon', 'octagonal' : 'octagon'} # (lowercase)
+## the column names in the excel sheets (without the ':', lowercase) and the multiplier to get to the units above:
+excelColumnNames: dict[str, tuple[str,float]] = {'shape' : ('shape', None), 'layers' : ('layers', 1), 'turns' : ('turns', 1), 'trace width [mm]' : ('traceWidth', 1), 'clearance [mm]' : ('clearance', 1),
+                                                 'diam. [mm]' : ('diam', 1), 'layer spacing [mm]' : ('layerSpacing', 1), 'measured inductance [µh]' : ('inductance', 10**-6),
+                                                 'measured resistance [mω]' : ('resistance', 10**-3)}
+
+defaultResamples: int = 2000 # number of bootstrap resamples
+minScaleSamples: int = 3 # (fitFormula='auto') shapes with fewer single-layer measurements than this keep their coefficients (one odd sample would just move the scale around)
+fittableFormulas: tuple[str] = ('wheeler', 'monomial', 'cur_sheet') # ('greenhouse' has no coefficients)
+
+def _toFloat(value) -> float:
+    """ float(value), or NaN for anything that isn't a number (empty cells, 'mixed', '#VALUE!', etc.) """
+    try:
+        return(float(value))
+    except (TypeError, ValueError):
+        return(np.nan)
+
+def measurementsFromRows(rows: list[dict], copperThickness: float = ozCopperToMM(1.0)) -> dict[str,np.ndarray]:
+    """ make a measurements dict from a list of rows (dicts with (some of) the measurementColumns as keys)
+        rows with an unknown shape, missing parameters or a missing inductance are skipped, as are multi-layer rows without a (numerical) layerSpacing or sumOfSpacings
+        copperThickness is used for rows that don't have one """
+    columns: dict[str,list] = {key : [] for key in measurementColumns}
+    skipped = 0
+    for row in rows:
+        shapeName = shapeAliases.get(str(row.get('shape', '')).strip().lower(), None)
+        values = {key : _toFloat(row.get(key, None)) for key in measurementColumns if (key != 'shape')}
+        if(np.isnan(values['copperThickness'])):  values['copperThickness'] = copperThickness
+        if(np.isnan(values['layers'])):  values['layers'] = 1
+        if((values['layers'] > 1) and np.isnan(values['sumOfSpacings'])):
+            values['sumOfSpacings'] = values['layerSpacing'] * ((values['layers']*(values['layers']+1)*(values['layers']-1))/6) # (equidistant, see calcMultilayerCouplingMult())
+        elif(values['layers'] <= 1):  values['sumOfSpacings'] = 0.0
+        if((shapeName is None) or any([np.isnan(values[key]) for key in ('turns', 'diam', 'clearance', 'traceWidth', 'sumOfSpacings', 'inductance')]) or (values['inductance'] <= 0.0)):
+            skipped += 1;  continue
+        columns['shape'].append(shapeName)
+        for key in values:  columns[key].append(values[key])
+    if(skipped > 0):  print("measurementsFromRows() skipped", skipped, "of", len(rows), "rows (unknown shape, missing values, or a multi-layer coil with an unknown layer spacing)")
+    measurements = {key : np.array(columns[key], dtype=(object if (key == 'shape') else (np.int64 if (measurementColumns[key] is int) else np.float64))) for key in columns}
+    return(measurements)
+
+def _readExcelRows(filename: str, sheetNames: list[str] = None) -> list[dict]:
+    """ the measurement rows from (some of) the sheets of an excel file in the format of 'documentation/measurement data in excel.xlsx':
+        a header row that includes 'Shape:', followed by one row per sample, up to the first empty row (the rest of the sheet is ignored) """
+    import pandas as pd # (only imported when needed)
+    sheets: dict = pd.read_excel(filename, sheet_name=(None if (sheetNames is None) else list(sheetNames)), header=None)
+    rows: list[dict] = []
+    for (sheetName, sheet) in sheets.items():
+        sheetRows = sheet.values.tolist()
+        headerIndex = next((i for (i, row) in enumerate(sheetRows) if any([(str(cell).strip().lower() == 'shape:') for cell in row])), None)
+        if(headerIndex is None):  print("_readExcelRows() no header row (with 'Shape:') found in sheet:", sheetName);  continue
+        columnKeys = [excelColumnNames.get(str(cell).strip().rstrip(':').strip().lower(), (None, None)) for cell in sheetRows[headerIndex]]
+        for row in sheetRows[headerIndex+1:]:
+            if(all([pd.isna(cell) for cell in row])):  break # (the first empty row ends the table)
+            rowDict = {}
+            for ((key, unitMult), cell) in zip(columnKeys, row):
+                if((key is None) or (key in rowDict)):  continue # (only the first column with a given name is used)
+                rowDict[key] = (cell if (unitMult is None) else (_toFloat(cell) * unitMult))
+            rows.append(rowDict)
+    return(rows)
+
+def loadMeasurements(filename: str, sheetNames: list[str] = None, copperThickness: float = ozCopperToMM(1.0)) -> dict[str,np.ndarray]:
+    """ load measurements from a .csv file (with (some of) the measurementColumns as header) or an excel file (.xlsx, see _readExcelRows(), all sheets unless sheetNames is provided)
+        identical rows are only counted once (the excel sheet lists some samples in multiple places)
+        copperThickness is used for rows that don't have one (the excel sheet doesn't). Returns a measurements dict (empty arrays if the file could not be read) """
+    try:
+        if(filename.lower().endswith(('.xlsx', '.xls'))):
+            rows = _readExcelRows(filename, sheetNames)
+        else:
+            with open(filename, 'r', newline='') as csvFile:
+                rows = list(csv.DictReader(csvFile))
+    except Exception as excep:
+        print("loadMeasurements() failed to read", filename, ":", excep);  rows = []
+    measurements = measurementsFromRows(rows, copperThickness)
+    if(len(measurements['shape']) > 0):
+        _, firstIndices = np.unique(np.stack([np.unique(measurements[key], return_inverse=True)[1].ravel() for key in measurementColumns], axis=1), axis=0, return_index=True)
+        measurements = {key : measurements[key][np.sort(firstIndices)] for key in measurements}
+    return(measurements)
+
+def saveMeasurements(measurements: dict[str,np.ndarray], filename: str):
+    """ save a measurements dict as a .csv file (which loadMeasurements() can read, and is a good place to add your own measurements) """
+    with open(filename, 'w', newline='') as csvFile:
+        writer = csv.writer(csvFile)
+        writer.writerow(list(measurementColumns.keys()))
+        for i in range(len(measurements['shape'])):
+            writer.writerow([measurements[key][i] for key in measurementColumns])
+
+
+## the formulas from PCBcoilV2.calcInductanceSingleLayer(), rewritten to be linear in (a transformation of) the coefficients (see the docstring at the top):
+def _calcDesignMatrix(formula: str, turns: np.ndarray, diam: np.ndarray, clearance: np.ndarray, traceWidth: np.ndarray, shapeName: str) -> tuple[np.ndarray, np.ndarray]:
+    """ returns the (measurements, linearCoefficients) design matrix, and the (mu0*n^2*d_avg) term that the wheeler and cur_sheet formulas are proportional to """
+    shapeObj = shapes[shapeName]
+    trueInnerDiamM = calcTrueInnerDiam(turns, diam, clearance, traceWidth, shapeObj) * distUnitMult
+    trueDiamM = calcTrueDiam(diam, clearance, traceWidth, shapeObj) * distUnitMult
+    fillFactor = (trueDiamM - trueInnerDiamM) / (trueDiamM + trueInnerDiamM)
+    averageDiamM = ((trueDiamM + trueInnerDiamM) / 2) * np.ones(np.shape(turns))
+    ones = np.ones(np.shape(turns))
+    if(formula == 'wheeler'):
+        designMatrix = np.stack((ones, fillFactor), axis=-1)
+    elif(formula == 'cur_sheet'):
+        designMatrix = np.stack((ones, -np.log(fillFactor), fillFactor, fillFactor**2), axis=-1)
+    else: # monomial
+        designMatrix = np.stack((ones, np.log(trueDiamM*ones), np.log(traceWidth*distUnitMult*ones), np.log(averageDiamM), np.log(turns*ones), np.log(clearance*ones)), axis=-1)
+    return(designMatrix, magneticConstant * (turns**2) * averageDiamM)
+
+def _inductanceToLinear(formula: str, inductance: np.ndarray, proportionalTerm: np.ndarray) -> np.ndarray:
+    """ the (linearized) value that the design matrix should produce for a given inductance """
+    if(formula == 'wheeler'):  return(proportionalTerm / inductance)
+    elif(formula == 'cur_sheet'):  return(inductance / (proportionalTerm / 2))
+    else:  return(np.log(inductance))
+
+def _linearToInductance(formula: str, linearValue: np.ndarray, proportionalTerm: np.ndarray) -> np.ndarray:
+    """ the inverse of _inductanceToLinear() """
+    if(formula == 'wheeler'):  return(proportionalTerm / linearValue)
+    elif(formula == 'cur_sheet'):  return(linearValue * (proportionalTerm / 2))
+    else:  return(np.exp(linearValue))
+
+def _coefficientsToLinear(formula: str, coefficients: np.ndarray) -> np.ndarray:
+    """ the formulaCoefficients (..., coefficients) as the linear coefficients of the design matrix """
+    coeff = np.asarray(coefficients, dtype=float)
+    if(formula == 'wheeler'):  return(np.stack((1/coeff[...,0], coeff[...,1]/coeff[...,0]), axis=-1))
+    elif(formula == 'cur_sheet'):  return(np.stack((coeff[...,0]*np.log(coeff[...,1]), coeff[...,0], coeff[...,0]*coeff[...,2], coeff[...,0]*coeff[...,3]), axis=-1))
+    else:  return(np.concatenate((np.log(coeff[...,:1] * (10**-6)), coeff[...,1:]), axis=-1)) # (see the outputMult in calcInductanceSingleLayer())
+
+def _linearToCoefficients(formula: str, linearCoefficients: np.ndarray) -> np.ndarray:
+    """ the inverse of _coefficientsToLinear() """
+    beta = np.asarray(linearCoefficients, dtype=float)
+    if(formula == 'wheeler'):  return(np.stack((1/beta[...,0], beta[...,1]/beta[...,0]), axis=-1))
+    elif(formula == 'cur_sheet'):  return(np.stack((beta[...,1], np.exp(beta[...,0]/beta[...,1]), beta[...,2]/beta[...,1], beta[...,3]/beta[...,1]), axis=-1))
+    else:  return(np.concatenate((np.exp(beta[...,:1]) / (10**-6), beta[...,1:]), axis=-1))
+
+def _solveWeightedLeastSquares(designMatrix: np.ndarray, target: np.ndarray, weights: np.ndarray) -> np.ndarray:
+    """ weighted least squares for a whole batch of weight sets at once: designMatrix (N,k), target (N,) or (B,N), weights (B,N) -> coefficients (B,k)
+        (the normal equations (A^T*W*A)*x = A^T*W*y of every weight set are solved in one go, the pseudo-inverse makes (rare) rank-deficient resamples harmless) """
+    normalMatrix = np.einsum('bn,ni,nj->bij', weights, designMatrix, designMatrix)
+    normalTarget = np.einsum('bn,ni,bn->bi', weights, designMatrix, np.broadcast_to(target, weights.shape))
+    return((np.linalg.pinv(normalMatrix) @ normalTarget[...,None])[...,0])
+
+def _fitBatch(measurements: dict[str,np.ndarray], formula: str, fitModes: dict[str,str], fitCoupling: bool, baseCoefficients: dict, weights: np.ndarray) -> dict[str,np.ndarray]:
+    """ the (vectorized) fit for a batch of resamples at once. weights has shape (resamples, measurements): the number of times each measurement is in each resample
+        fitModes is {shapeName : 'full'/'scale'/None} (see fitCoefficients()), baseCoefficients is the coefficient set that is not fitted (or scaled)
+        (everything is calculated from the baseCoefficients, not the global ones, sothat the worker processes don't need the same coefficient set loaded)
+        returns {'couplingConstant_D' : (resamples, 2), shapeName : (resamples, coefficients)} """
+    weights = np.atleast_2d(np.asarray(weights, dtype=float))
+    singleLayerInductance = np.empty(weights.shape) # the (fitted) single-layer inductance of every measurement, per resample
+    isSingleLayer = (measurements['layers'] == 1)
+    fitted: dict[str,np.ndarray] = {}
+    for shapeName in np.unique(measurements['shape']):
+        rows = (measurements['shape'] == shapeName);  fitRows = isSingleLayer[rows]
+        designMatrix, proportionalTerm = _calcDesignMatrix(formula, *[measurements[key][rows] for key in ('turns', 'diam', 'clearance', 'traceWidth')], shapeName)
+        baseCoeff = np.asarray(baseCoefficients['formulaCoefficients'][shapeName][formula], dtype=float)
+        basePrediction = _linearToInductance(formula, designMatrix @ _coefficientsToLinear(formula, baseCoeff), proportionalTerm)
+        fitMode = fitModes.get(shapeName, None)
+        if(fitMode == 'full'):
+            relativeWeights = (np.ones(np.count_nonzero(fitRows)) if (formula == 'monomial') else (1 / _inductanceToLinear(formula, measurements['inductance'][rows][fitRows], proportionalTerm[fitRows])**2)) # (residual of the linear value -> relative error of L)
+            linearCoefficients = _solveWeightedLeastSquares(designMatrix[fitRows], _inductanceToLinear(formula, measurements['inductance'][rows][fitRows], proportionalTerm[fitRows]), weights[:,rows][:,fitRows] * relativeWeights)
+            tooFewSamples = (np.count_nonzero(weights[:,rows][:,fitRows] > 0, axis=1) < designMatrix.shape[1]) # (resamples that can't determine all the coefficients keep the base coefficients)
+            linearCoefficients = np.where(tooFewSamples[:,None], _coefficientsToLinear(formula, baseCoeff), linearCoefficients)
+            fitted[shapeName] = _linearToCoefficients(formula, linearCoefficients)
+            singleLayerInductance[:,rows] = _linearToInductance(formula, linearCoefficients @ designMatrix.T, proportionalTerm)
+        elif(fitMode == 'scale'): # all formulas are proportional to their first coefficient, so scaling that scales the inductance
+            shapeWeights = weights[:,rows][:,fitRows]
+            logRatios = np.log(measurements['inductance'][rows][fitRows] / basePrediction[fitRows])
+            scale = np.exp(np.sum(shapeWeights * logRatios, axis=1) / np.maximum(np.sum(shapeWeights, axis=1), 1e-12)) # (the least-squares fit of log(scale), 1.0 if there are no samples)
+            fitted[shapeName] = np.concatenate(((baseCoeff[0] * scale)[:,None], np.broadcast_to(baseCoeff[1:], (len(scale), len(baseCoeff)-1))), axis=1)
+            singleLayerInductance[:,rows] = basePrediction * scale[:,None]
+        else:
+            fitted[shapeName] = np.broadcast_to(baseCoeff, (len(weights), len(baseCoeff)))
+            singleLayerInductance[:,rows] = basePrediction
+    ## the coupling constants, from the multi-layer measurements (using the fitted single-layer inductance):
+    multiRows = ~isSingleLayer
+    fitted['couplingConstant_D'] = np.broadcast_to(np.asarray(baseCoefficients['couplingConstant_D'], dtype=float), (len(weights), 2))
+    if(fitCoupling and np.any(multiRows)):
+        layers = measurements['layers'][multiRows]
+        designMatrix = np.stack(((layers*(layers-1))/2, measurements['sumOfSpacings'][multiRows]), axis=-1) # (triangularNumber, sumOfSpacings) -> (D0, D1)
+        inductanceRatios = measurements['inductance'][multiRows] / singleLayerInductance[:,multiRows]
+        fitted['couplingConstant_D'] = _solveWeightedLeastSquares(designMatrix, (inductanceRatios - layers) / 2, weights[:,multiRows] / (inductanceRatios**2)) # (residual of the ratio -> relative error of L)
+    return(fitted)
+
+def _resolveFitModes(measurements: dict[str,np.ndarray], formula: str, fitFormula: str, baseCoefficients: dict) -> dict[str,str]:
+    """ which single-layer fit to do for each shape: 'full' (all coefficients), 'scale' (just the first coefficient) or None (keep the coefficients)
+        fitFormula='auto' does a full fit if there are at least 2 single-layer measurements per coefficient, otherwise just the scale (if there are at least minScaleSamples) """
+    fitModes: dict[str,str] = {}
+    for shapeName in np.unique(measurements['shape']):
+        singleLayerCount = np.count_nonzero((measurements['shape'] == shapeName) & (measurements['layers'] == 1))
+        coefficientCount = len(baseCoefficients['formulaCoefficients'][shapeName][formula])
+        if((not fitFormula) or (singleLayerCount == 0)):  fitModes[shapeName] = None
+        elif(fitFormula == 'scale'):  fitModes[shapeName] = 'scale'
+        elif(fitFormula == 'full'):
+            fitModes[shapeName] = ('full' if (singleLayerCount >= coefficientCount) else 'scale')
+            if(fitModes[shapeName] != 'full'):  print("_resolveFitModes() only", singleLayerCount, "single-layer", shapeName, "measurements, that's not enough for", coefficientCount, formula, "coefficients. Fitting just the scale instead")
+        else:  fitModes[shapeName] = ('full' if (singleLayerCount >= (2*coefficientCount)) else ('scale' if (singleLayerCount >= minScaleSamples) else None)) # 'auto'
+    return(fitModes)
+
+def _currentCoefficients() -> dict:
+    """ the coefficient set that is currently in use (in PCBcoilV2) """
+    return({'couplingConstant_D' : tuple(PCBcoilV2.couplingConstant_D), 'formulaCoefficients' : {shapeName : dict(shapes[shapeName].formulaCoefficients) for shapeName in shapes}})
+
+def _checkFitInput(measurements: dict[str,np.ndarray], formula: str) -> bool:
+    if(formula not in fittableFormulas):  print("can't fit the coefficients of formula:", formula, " options are:", fittableFormulas);  return(False)
+    unsupportedShapes = [shapeName for shapeName in np.unique(measurements['shape']) if (formula not in shapes[shapeName].formulaCoefficients)]
+    if(len(unsupportedShapes) > 0):  print("can't fit formula", formula, "to shapes:", unsupportedShapes, "(formula not in their formulaCoefficients), remove those measurements first");  return(False)
+    if(len(measurements['shape']) == 0):  print("can't fit anything without measurements");  return(False)
+    impossible = [i for i in range(len(measurements['shape'])) if not (calcTrueInnerDiam(*[measurements[key][i] for key in ('turns', 'diam', 'clearance', 'traceWidth')], shapes[measurements['shape'][i]]) > 0.0)]
+    if(len(impossible) > 0):  print("can't fit with impossible coils (inner diameter <= 0) in the measurements, at rows:", impossible);  return(False)
+    return(True)
+
+def fitCoefficients(measurements: dict[str,np.ndarray], formula: str = 'cur_sheet', fitFormula: str = 'auto', fitCoupling: bool = True) -> dict:
+    """ fit the formula coefficients (of every measured shape) and couplingConstant_D to the measurements (see the docstring at the top of this file)
+        fitFormula: 'auto' (full fit if there are enough single-layer measurements, otherwise just the scale, see _resolveFitModes()), 'full', 'scale' or None (keep the current coefficients)
+        returns a coefficient set (dict) like {'couplingConstant_D' : (D0, D1), 'formulaCoefficients' : {shapeName : {formula : (...)}}}, see saveCoefficientSet(). Empty if the fit is not possible """
+    if(not _checkFitInput(measurements, formula)):  return({})
+    baseCoefficients = _currentCoefficients()
+    fitted = _fitBatch(measurements, formula, _resolveFitModes(measurements, formula, fitFormula, baseCoefficients), fitCoupling, baseCoefficients, np.ones((1, len(measurements['shape']))))
+    return({'couplingConstant_D' : tuple(fitted['couplingConstant_D'][0].tolist()),
+            'formulaCoefficients' : {shapeName : {formula : tuple(fitted[shapeName][0].tolist())} for shapeName in fitted if (shapeName != 'couplingConstant_D')}})
+
+def _bootstrapWorkerTask(measurements: dict[str,np.ndarray], formula: str, fitModes: dict[str,str], fitCoupling: bool, baseCoefficients: dict, resampleCount: int, seed: np.random.SeedSequence) -> dict[str,np.ndarray]:
+    """ fit (resampleCount) resamples (in a worker process) """
+    measurementCount = len(measurements['shape'])
+    weights = np.random.default_rng(seed).multinomial(measurementCount, np.full(measurementCount, 1/measurementCount), size=resampleCount) # (drawing N measurements with replacement = multinomial counts)
+    return(_fitBatch(measurements, formula, fitModes, fitCoupling, baseCoefficients, weights))
+
+def bootstrapCoefficients(measurements: dict[str,np.ndarray], formula: str = 'cur_sheet', fitFormula: str = 'auto', fitCoupling: bool = True, resamples: int = defaultResamples,
+                          confidence: float = 0.95, workers: int = None, seed: int = 0) -> dict:
+    """ the (percentile) bootstrap confidence intervals of the fitCoefficients() results, the resamples are spread over (workers) processes (default: all CPU cores)
+        NOTE: on Windows (and MacOS), this must be called from within an 'if __name__ == "__main__":' block (like sweepEngine.parallelSweep())
+        returns {'couplingConstant_D' : (lower, upper), 'formulaCoefficients' : {shapeName : {formula : (lower, upper)}}, 'confidence' : confidence, 'resamples' : resamples}
+         (every lower/upper is a tuple of the same length as the coefficients) """
+    if(not _checkFitInput(measurements, formula)):  return({})
+    workers = (os.cpu_count() if (workers is None) else max(int(workers), 1))
+    baseCoefficients = _currentCoefficients()
+    fitModes = _resolveFitModes(measurements, formula, fitFormula, baseCoefficients)
+    batchSizes = [len(batch) for batch in np.array_split(np.arange(resamples), min(workers, resamples)) if (len(batch) > 0)]
+    seeds = np.random.SeedSequence(seed).spawn(len(batchSizes)) # (the result only depends on the seed, not on the number of workers... as long as the number of batches is the same)
+    taskArgs = [(measurements, formula, fitModes, fitCoupling, baseCoefficients, batchSize, batchSeed) for (batchSize, batchSeed) in zip(batchSizes, seeds)]
+    if(workers == 1):
+        batchResults = [_bootstrapWorkerTask(*args) for args in taskArgs]
+    else:
+        with ProcessPoolExecutor(max_workers=workers) as executor:
+            batchResults = list(executor.map(_bootstrapWorkerTask, *zip(*taskArgs)))
+    fitted = {key : np.concatenate([batch[key] for batch in batchResults]) for key in batchResults[0]}
+    percentiles = (100*(1-confidence)/2, 100*(1+confidence)/2)
+    intervals = {key : tuple([tuple(np.nanpercentile(fitted[key], percentile, axis=0).tolist()) for percentile in percentiles]) for key in fitted}
+    return({'couplingConstant_D' : intervals.pop('couplingConstant_D'), 'formulaCoefficients' : {shapeName : {formula : intervals[shapeName]} for shapeName in intervals},
+            'confidence' : confidence, 'resamples' : resamples})
+
+def calcPredictionErrors(measurements: dict[str,np.ndarray], coefficientSet: dict = None, formula: str = 'cur_sheet') -> dict[str,np.ndarray]:
+    """ the relative prediction error ((predicted-measured)/measured) of every measurement, with a coefficient set (default: the one currently in use)
+        returns {'inductance' : errors, 'resistance' : errors} (NaN where the resistance was not measured) """
+    if(not _checkFitInput(measurements, formula)):  return({})
+    coefficientSet = (_currentCoefficients() if (coefficientSet is None) else coefficientSet)
+    baseCoefficients = _currentCoefficients()
+    for shapeName in coefficientSet.get('formulaCoefficients', {}):  baseCoefficients['formulaCoefficients'][shapeName] = dict(baseCoefficients['formulaCoefficients'][shapeName], **coefficientSet['formulaCoefficients'][shapeName])
+    baseCoefficients['couplingConstant_D'] = tuple(coefficientSet.get('couplingConstant_D', baseCoefficients['couplingConstant_D']))
+    predictedInductance = np.empty(len(measurements['shape']))
+    for shapeName in np.unique(measurements['shape']):
+        rows = (measurements['shape'] == shapeName)
+        designMatrix, proportionalTerm = _calcDesignMatrix(formula, *[measurements[key][rows] for key in ('turns', 'diam', 'clearance', 'traceWidth')], shapeName)
+        predictedInductance[rows] = _linearToInductance(formula, designMatrix @ _coefficientsToLinear(formula, baseCoefficients['formulaCoefficients'][shapeName][formula]), proportionalTerm)
+    layers = measurements['layers'];  couplingConstant_D = baseCoefficients['couplingConstant_D']
+    predictedInductance *= layers + 2*((couplingConstant_D[1] * measurements['sumOfSpacings']) + (((layers*(layers-1))/2) * couplingConstant_D[0])) # (see calcMultilayerCouplingMult())
+    predictedResistance = np.empty(len(measurements['shape']))
+    for shapeName in np.unique(measurements['shape']):
+        rows = (measurements['shape'] == shapeName)
+        predictedResistance[rows] = calcCoilBatch(*[measurements[key][rows] for key in ('turns', 'diam', 'clearance', 'traceWidth', 'layers')], copperThickness=measurements['copperThickness'][rows], shape=shapes[shapeName], formula=formula)['resistance']
+    return({'inductance' : (predictedInductance - measurements['inductance']) / measurements['inductance'],
+            'resistance' : (predictedResistance - measurements['resistance']) / measurements['resistance']})
+
+def saveCoefficientSet(filename: str, coefficientSet: dict, confidenceIntervals: dict = None, name: str = 'calibrated', fitInfo: dict = None) -> str:
+    """ write a coefficient set (from fitCoefficients()) to a .json file, which PCBcoilV2.loadCoefficientSet() can load
+        the coefficientSetVersion is the name plus (the start of) a hash of the coefficients, so every different set gets a different version (which caches can use as a key)
+        the confidenceIntervals (from bootstrapCoefficients()) and fitInfo (anything, e.g. the number of measurements) are just stored for reference
+        returns the coefficientSetVersion """
+    coefficients = {'couplingConstant_D' : list(coefficientSet['couplingConstant_D']),
+                    'formulaCoefficients' : {shapeName : {formula : list(values) for (formula, values) in formulas.items()} for (shapeName, formulas) in coefficientSet['formulaCoefficients'].items()}}
+    coefficientSetVersion = name + '_' + hashlib.sha1(json.dumps(coefficients, sort_keys=True).encode()).hexdigest()[:8]
+    fileContent = dict(coefficientSetVersion=coefficientSetVersion, created=time.strftime('%Y-%m-%d %H:%M:%S'), **coefficients)
+    if(confidenceIntervals is not None):  fileContent['confidenceIntervals'] = confidenceIntervals
+    if(fitInfo is not None):  fileContent['fitInfo'] = fitInfo
+    with open(filename, 'w') as coefficientFile:
+        json.dump(fileContent, coefficientFile, indent=4)
+    return(coefficientSetVersion)
+
+
+if __name__ == "__main__": # an example of how this file may be used
+    measurements = loadMeasurements(os.path.join(os.path.dirname(os.path.abspath(__file__)), 'documentation', 'measurement data in excel.xlsx'), sheetNames=('2L & 4L', '6L'), copperThickness=0.030)
+    print("loaded", len(measurements['shape']), "measurements,", np.count_nonzero(measurements['layers'] > 1), "of which are multi-layer")
+    coefficientSet = fitCoefficients(measurements, 'cur_sheet')
+    bootstrapStartTime = time.time()
+    confidenceIntervals = bootstrapCoefficients(measurements, 'cur_sheet')
+    print("bootstrap (", confidenceIntervals['resamples'], "resamples ) took", round(time.time()-bootstrapStartTime, 2), "seconds")
+    print("couplingConstant_D:", PCBcoilV2.couplingConstant_D, "->", np.round(coefficientSet['couplingConstant_D'], 4), " 95% interval:", np.round(confidenceIntervals['couplingConstant_D'], 4).tolist())
+    for shapeName in coefficientSet['formulaCoefficients']:
+        print(shapeName, "cur_sheet:", shapes[shapeName].formulaCoefficients['cur_sheet'], "->", np.round(coefficientSet['formulaCoefficients'][shapeName]['cur_sheet'], 4), " 95% interval:", np.round(confidenceIntervals['formulaCoefficients'][shapeName]['cur_sheet'], 4).tolist())
+    for (label, coefficients) in (("current", None), ("refitted", coefficientSet)):
+        errors = calcPredictionErrors(measurements, coefficients, 'cur_sheet')
+        print(label, "coefficients: median inductance error:", round(100*np.median(np.abs(errors['inductance'])), 2), "%, RMS:", round(100*np.sqrt(np.mean(errors['inductance']**2)), 2), "%, worst:", round(100*np.max(np.abs(errors['inductance'])), 2), "%")
+    coefficientSetVersion = saveCoefficientSet('calibratedCoefficients.json', coefficientSet, confidenceIntervals, fitInfo={'formula' : 'cur_sheet', 'measurements' : len(measurements['shape'])})
+    PCBcoilV2.loadCoefficientSet('calibratedCoefficients.json')
+    print("saved and loaded coefficient set:", PCBcoilV2.coefficientSetVersion)
@@ -0,0 +1,206 @@
+"""
+this file is a (headless) command-line interface, for scripts/CI that just want numbers or files, without the pygame UI:
+    python coilCLI.py eval --turns 9 --diam 40 --clearance 0.15 --traceWidth 0.9 --layers 2 --PCBthickness 0.6 --json
+    python coilCLI.py sweep --turns 5:15 --diam 20:60:5 --clearance 0.15 --traceWidth 0.5,0.9 --minInductance 1e-6 -o sweep.csv
+    python coilCLI.py export --turns 9 --diam 40 --clearance 0.15 --traceWidth 0.9 --dxf --excel --png 20
+    python coilCLI.py stream < specs.ndjson > results.ndjson         (one JSON coil spec per line in, one JSON result per line out, see coilStream.py)
+eval and sweep can use a persistent result cache with --cache (the default file) or --cache FILE, see resultCache.py
+(or 'python -m coilCLI ...' from this folder)
+
+it starts fast: only numpy and PCBcoilV2 are imported for every command, the optional libraries (pygame, pandas, cv2, matplotlib, dxfwrite)
+ are only imported by the exporters that actually need them. (on my machine, importing numpy is most of the ~0.1s a one-coil 'eval' takes, see benchmark.py's coldStart benchmarks)
+values for the sweep can be a single value, a comma-separated list (0.5,0.9) or an (inclusive) range (start:stop or start:stop:step, the step defaults to 1)
+"""
+
+import sys
+import argparse # (the only imports at the top are quick ones from the standard library, PCBcoilV2 (and numpy) are imported by the commands themselves)
+import json
+import math
+
+coilArgumentDefaults: dict[str, object] = {'layers' : 1, 'PCBthickness' : 1.6, 'copperThickness' : 0.0348, 'shape' : 'circle', 'formula' : 'cur_sheet'} # (same as the coilClass constructor, copperThickness is ozCopperToMM(1.0))
+evalResultNames: tuple[str] = ('inductance', 'inductanceSingleLayer', 'resistance', 'simpleInnerDiam', 'trueInnerDiam', 'trueDiam', 'traceLength', 'capacitance', 'SRF', 'filename') # the results of the 'eval' command
+
+def parseValueList(text: str, integer: bool = False) -> list[float]|list[int]:
+    """ a single value, a comma-separated list ('0.5,0.9') or an inclusive range ('start:stop' or 'start:stop:step') """
+    if(':' in text):
+        rangeParts = [float(part) for part in text.split(':')]
+        if(len(rangeParts) not in (2, 3)):  raise(argparse.ArgumentTypeError("a range should be 'start:stop' or 'start:stop:step', not: "+text))
+        start, stop = rangeParts[0:2];  step = (rangeParts[2] if (len(rangeParts) > 2) else 1.0)
+        if(step <= 0):  raise(argparse.ArgumentTypeError("the step of a range should be > 0, not: "+text))
+        values = [start + (i * step) for i in range(int(round(((stop - start) / step) + 1e-9)) + 1)] # (inclusive, and without the float accumulation of repeatedly adding the step)
+    else:
+        values = [float(part) for part in text.split(',') if part.strip()]
+    return([int(round(value)) for value in values] if integer else values)
+
+def _addCoilArguments(parser: argparse.ArgumentParser, multiple: bool = False):
+    """ the coilClass constructor parameters (if multiple, every numerical parameter accepts a list/range, see parseValueList()) """
+    valueType = ((lambda text : parseValueList(text)) if multiple else float)
+    intType = ((lambda text : parseValueList(text, True)) if multiple else int)
+    toList = ((lambda value : [value]) if multiple else (lambda value : value))
+    parser.add_argument('--turns', type=intType, required=True, help="number of turns")
+    parser.add_argument('--diam', type=valueType, required=True, help="(outer) diameter [mm]")
+    parser.add_argument('--clearance', type=valueType, required=True, help="space between traces [mm]")
+    parser.add_argument('--traceWidth', type=valueType, required=True, help="trace width [mm]")
+    parser.add_argument('--layers', type=intType, default=toList(coilArgumentDefaults['layers']), help="number of layers (default: %(default)s)")
+    parser.add_argument('--PCBthickness', type=valueType, default=toList(coilArgumentDefaults['PCBthickness']), help="[mm] (only used for multiple layers, default: %(default)s)")
+    parser.add_argument('--copperThickness', type=valueType, default=toList(coilArgumentDefaults['copperThickness']), help="[mm] (default: 1oz = %(default)s)")
+    parser.add_argument('--shape', default=coilArgumentDefaults['shape'], help="square, hexagon, octagon or circle"+(" (comma-separated for multiple)" if multiple else "")+" (default: %(default)s)")
+    parser.add_argument('--formula', default=coilArgumentDefaults['formula'], help="wheeler, monomial, cur_sheet or greenhouse (not every shape has every formula)"+(" (comma-separated for multiple)" if multiple else "")+" (default: %(default)s)")
+    if(not multiple):  parser.add_argument('--CCW', action='store_true', help="the coil runs counter-clockwise (on the top layer)")
+    parser.add_argument('--coefficients', default=None, help="a coefficient set (.json) to load first, see calibration.py")
+
+def _loadCoefficients(args: argparse.Namespace) -> bool:
+    import PCBcoilV2
+    return((args.coefficients is None) or PCBcoilV2.loadCoefficientSet(args.coefficients))
+
+def _openCache(args: argparse.Namespace) -> 'resultCacheClass':
+    """ the resultCacheClass of the --cache argument (or None) """
+    if(args.cache is None):  return(None)
+    import resultCache # (only imported when needed)
+    return(resultCache.resultCacheClass(None if (args.cache is True) else args.cache))
+
+def _makeCoil(args: argparse.Namespace) -> 'coilClass':
+    """ a coilClass from the (single-value) arguments, or None if the shape is unknown """
+    import PCBcoilV2
+    if(args.shape not in PCBcoilV2.shapes):  print("unknown shape:", args.shape, " options are:", list(PCBcoilV2.shapes.keys()), file=sys.stderr);  return(None)
+    return(PCBcoilV2.coilClass(args.turns, args.diam, args.clearance, args.traceWidth, args.layers, args.PCBthickness, args.copperThickness, PCBcoilV2.shapes[args.shape], args.formula, args.CCW))
+
+def isPossibleCoil(coil: 'coilClass') -> bool:
+    """ whether the coil fits (a positive inner diameter) and has a (finite) inductance and resistance """
+    return((coil.calcTrueInnerDiam() > 0) and math.isfinite(coil.calcInductance()) and math.isfinite(coil.calcTotalResistance()))
+
+def evaluateCoil(coil: 'coilClass') -> dict[str, float|str]:
+    """ the evalResultNames of a coil (SI units, except for distances, which are in mm), or just an 'error' for impossible coils (see isPossibleCoil()), the same as coilStream.py """
+    if(not isPossibleCoil(coil)):
+        import coilStream # (only imported when needed)
+        return({'error' : coilStream.impossibleCoilError(coil.calcTrueInnerDiam())})
+    return({'inductance' : coil.calcInductance(),
+            'inductanceSingleLayer' : coil.calcInductanceSingleLayer(),
+            'resistance' : coil.calcTotalResistance(),
+            'simpleInnerDiam' : coil.calcSimpleInnerDiam(),
+            'trueInnerDiam' : coil.calcTrueInnerDiam(),
+            'trueDiam' : coil.calcTrueDiam(),
+            'traceLength' : coil.calcCoilTraceLength(),
+            'capacitance' : coil.calcParasiticCapacitance(),
+            'SRF' : coil.calcSelfResonantFrequency(),
+            'filename' : coil.generateCoilFilename()})
+
+def commandEval(args: argparse.Namespace) -> int:
+    if(not _loadCoefficients(args)):  return(1)
+    coil = _makeCoil(args)
+    if(coil is None):  return(1)
+    cache = _openCache(args)
+    if(cache is not None):  cache.fillCoilCache(coil);  cache.close() # (the filename is calculated from the (cached) results too)
+    results = evaluateCoil(coil)
+    if('error' in results):  print(results['error'], file=sys.stderr)
+    if(args.json):
+        print(json.dumps(results))
+    elif('error' in results):
+        return(1)
+    else: # (same as the PCBcoilV2 __main__ without visualization)
+        print("coil details:", results['filename'])
+        print("resistance [mOhm]: "+str(round(results['resistance'] * 1000, 3)))
+        print("inductance [uH]: "+str(round(results['inductance'] * 1000000, 3)))
+        print("induct/resist [uH/Ohm]: "+str(round(results['inductance'] * 1000000 / results['resistance'], 3)))
+        print("inner diameter (true) [mm]: "+str(round(results['trueInnerDiam'], 3)))
+        print("trace length [mm]: "+str(round(results['traceLength'], 3)))
+        print("capacitance [pF]: "+str(round(results['capacitance'] * 1e12, 3)))
+        print("SRF [MHz]: "+str(round(results['SRF'] / 1e6, 3)))
+    return(1 if ('error' in results) else 0)
+
+def commandSweep(args: argparse.Namespace) -> int:
+    if(not _loadCoefficients(args)):  return(1)
+    import time
+    import sweepEngine # (only imported when needed)
+    sweepStartTime = time.time()
+    filters = [sweepEngine.filterPositiveInnerDiam, sweepEngine.filterValidInductance]
+    if((args.minInductance is not None) or (args.maxInductance is not None)):  filters.append(sweepEngine.filterInductanceRange(args.minInductance or 0.0, args.maxInductance or float('inf')))
+    if(args.maxResistance is not None):  filters.append(sweepEngine.filterMaxResistance(args.maxResistance))
+    sweepParams = dict(turns=args.turns, diam=args.diam, clearance=args.clearance, traceWidth=args.traceWidth, layers=args.layers, PCBthickness=args.PCBthickness, copperThickness=args.copperThickness,
+                       shape=args.shape.split(','), formula=args.formula.split(','), filters=filters)
+    unknownShapes = [shapeName for shapeName in sweepParams['shape'] if (shapeName not in sweepEngine.shapes)]
+    if(len(unknownShapes) > 0):  print("unknown shape(s):", unknownShapes, " options are:", list(sweepEngine.shapes.keys()), file=sys.stderr);  return(1)
+    cache = _openCache(args)
+    if(cache is not None):
+        if(args.parallel):  print("the cache is not used with --parallel", file=sys.stderr);  cache = None
+        else:  sweepParams['cache'] = cache
+    if(args.output is not None):
+        with sweepEngine.csvSink(args.output) as sink:
+            designCount = (sweepEngine.parallelSweep(**sweepParams, sink=sink) if args.parallel else sweepEngine.sweep(**sweepParams, sink=sink))
+    else: # print the best few (closest to the middle of the inductance range, or the highest L/R)
+        if((args.minInductance is not None) and (args.maxInductance is not None)):
+            targetInductance = (args.minInductance + args.maxInductance) / 2
+            scoreFunc = (lambda chunk : abs(chunk['inductance'] - targetInductance))
+        else:
+            scoreFunc = (lambda chunk : -(chunk['inductance'] / chunk['resistance']))
+        sink = sweepEngine.bestSink(scoreFunc, args.top)
+        designCount = (sweepEngine.parallelSweep(**sweepParams, sink=sink) if args.parallel else sweepEngine.sweep(**sweepParams, sink=sink))
+        for coil in sink.toCoilList():
+            if(cache is not None):  cache.fillCoilCache(coil) # (they're in the cache already, so 'greenhouse' coils don't have to be calculated again)
+            print(coil.generateCoilFilename(), "  L [uH]:", round(coil.calcInductance()*1e6, 4), "  R [mOhm]:", round(coil.calcTotalResistance()*1000, 2))
+    print(designCount, "designs passed the filters, took", round(time.time()-sweepStartTime, 3), "seconds", file=sys.stderr)
+    if(cache is not None):  print("cache:", cache.hits, "designs were cached,", cache.misses, "were calculated", file=sys.stderr);  cache.close()
+    return(0)
+
+def commandExport(args: argparse.Namespace) -> int:
+    if(not _loadCoefficients(args)):  return(1)
+    coil = _makeCoil(args)
+    if(coil is None):  return(1)
+    if(not (args.dxf or args.excel or (args.png is not None) or (args.tif is not None))):  print("nothing to export, use --dxf, --excel, --png or --tif", file=sys.stderr);  return(1)
+    ## the exporters (and their libraries) are only imported when they're used (through the coilClass macros)
+    if(args.dxf):  print("saved DXF files:", coil.saveDXF(args.chordTolerance, args.arcs))
+    if(args.excel):  coil.to_excel();  print("saved excel file:", coil.generateCoilFilename())
+    for (imageFormat, pixelsPerMM) in (('.png', args.png), ('.tif', args.tif)):
+        if(pixelsPerMM is not None):
+            import cv2exporter
+            cv2exporter.imwrite(coil, pixelsPerMM, imageFormat);  print("saved", imageFormat, "image(s):", coil.generateCoilFilename())
+    return(0)
+
+def commandStream(args: argparse.Namespace) -> int:
+    if(not _loadCoefficients(args)):  return(1)
+    import coilStream # (only imported when needed)
+    lineCount = coilStream.serve(window=args.batchWindow, maxBatch=args.maxBatch)
+    print(lineCount, "lines evaluated", file=sys.stderr)
+    return(0)
+
+def makeParser() -> argparse.ArgumentParser:
+    parser = argparse.ArgumentParser(prog='coilCLI', description="PCB coil calculator (headless)")
+    subparsers = parser.add_subparsers(dest='command', required=True)
+    evalParser = subparsers.add_parser('eval', help="calculate the inductance, resistance, etc. of one coil")
+    _addCoilArguments(evalParser)
+    evalParser.add_argument('--json', action='store_true', help="print the results as (one line of) JSON")
+    evalParser.add_argument('--cache', nargs='?', const=True, default=None, metavar='FILE', help="use (and update) a persistent result cache (default file: coilResultCache.sqlite, see resultCache.py)")
+    evalParser.set_defaults(func=commandEval)
+    sweepParser = subparsers.add_parser('sweep', help="evaluate every combination of the given parameter values")
+    _addCoilArguments(sweepParser, multiple=True)
+    sweepParser.add_argument('-o', '--output', default=None, help="save all (filtered) designs to this .csv file (instead of printing the best few)")
+    sweepParser.add_argument('--minInductance', type=float, default=None, help="[H]")
+    sweepParser.add_argument('--maxInductance', type=float, default=None, help="[H]")
+    sweepParser.add_argument('--maxResistance', type=float, default=None, help="[Ohm]")
+    sweepParser.add_argument('--top', type=int, default=10, help="how many designs to print (without --output)")
+    sweepParser.add_argument('--parallel', action='store_true', help="use all CPU cores (see sweepEngine.parallelSweep())")
+    sweepParser.add_argument('--cache', nargs='?', const=True, default=None, metavar='FILE', help="only calculate the designs that are not in the persistent result cache (default file: coilResultCache.sqlite, see resultCache.py)")
+    sweepParser.set_defaults(func=commandSweep)
+    exportParser = subparsers.add_parser('export', help="save one coil as DXF, excel and/or image files (in the current folder)")
+    _addCoilArguments(exportParser)
+    exportParser.add_argument('--dxf', action='store_true', help="save DXF files (needs dxfwrite)")
+    exportParser.add_argument('--chordTolerance', type=float, default=0.01, help="[mm] max deviation of the DXF lines from circular coils (default: %(default)s)")
+    exportParser.add_argument('--arcs', action='store_true', help="save circular coils as arcs in the DXF, instead of lines")
+    exportParser.add_argument('--excel', action='store_true', help="save an excel file (needs pandas and openpyxl)")
+    exportParser.add_argument('--png', type=float, default=None, metavar='PIXELSPERMM', help="save .png images at this resolution (needs cv2)")
+    exportParser.add_argument('--tif', type=float, default=None, metavar='PIXELSPERMM', help="save a (multi-layer) .tif image at this resolution (needs cv2)")
+    exportParser.set_defaults(func=commandExport)
+    streamParser = subparsers.add_parser('stream', help="evaluate coil specs from stdin (NDJSON, one JSON object per line) until it closes, results to stdout (see coilStream.py)")
+    streamParser.add_argument('--batchWindow', type=float, default=0.001, help="[s] how long to wait for more lines before evaluating a batch (default: %(default)s)")
+    streamParser.add_argument('--maxBatch', type=int, default=4096, help="at most this many lines per batch (default: %(default)s)")
+    streamParser.add_argument('--coefficients', default=None, help="a coefficient set (.json) to load first, see calibration.py")
+    streamParser.set_defaults(func=commandStream)
+    return(parser)
+
+def main(argv: list[str] = None) -> int:
+    args = makeParser().parse_args(argv)
+    return(args.func(args))
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,104 @@
+"""
+this file is the auto-optimizer from the TODO list in PCBcoilV_:
+given a few limits (diameter, clearance, trace width, layers, PCB thickness) and targets (inductance, max resistance),
+ find the best coil designs, according to some objective (lowest resistance, highest L/R, smallest area, etc.)
+
+it works in 2 steps:
+- a coarse (vectorized) grid search over the whole feasible space, using the sweepEngine. The best few designs near the target are used as seeds for:
+- a local refinement around every seed, where a small grid around the current best design shrinks every iteration
+turns and layers are integers, so turns are only stepped by 1, and layers are (like the PCB thickness) just a list of allowed options that are all tried in the coarse grid.
+
+NOTE: the optimizer is only as good as the formulas in PCBcoilV_, so please verify the result (in the pygame UI, or with a test sample)
+"""
+
+import numpy as np
+from typing import Callable # just for type-hints to provide some nice syntax colering
+
+from PCBcoilV2 import calcCoilBatch, coilClass, shapes, ozCopperToMM, _shapeBaseClass
+import sweepEngine
+
+## objectives (lower is better). An objective is any function that takes a (sweep) chunk and returns a score for every design
+objectives: dict[str, Callable[[dict[str,np.ndarray]], np.ndarray]] = {
+    'resistance' : lambda chunk : chunk['resistance'],
+    'LoverR' : lambda chunk : -(chunk['inductance'] / chunk['resistance']), # negative, because a higher L/R is better
+    'area' : lambda chunk : chunk['diam']**2, # (diam^2 ranks exactly the same as the actual area)
+    'traceLength' : lambda chunk : chunk['traceLength']}
+
+coarseToleranceMult: float = 5.0 # the coarse grid is (by definition) too coarse to hit the target exactly, so the seeds are allowed to be a little further from the target
+
+def optimize(targetInductance: float, inductanceTolerance: float = 0.02, maxResistance: float = np.inf,
+             minDiam: float = 5.0, maxDiam: float = 50.0, minClearance: float = 0.1, maxClearance: float = 1.0, minTraceWidth: float = 0.1, maxTraceWidth: float = 3.0, maxTurns: int = 40,
+             layers: list[int] = (1,2), PCBthickness: list[float] = (1.6,), copperThickness: list[float] = (ozCopperToMM(1.0),),
+             shape: list[_shapeBaseClass] = tuple(shapes.values()), formula: list[str] = ('cur_sheet',), objective: str|Callable = 'resistance',
+             topK: int = 5, gridPoints: int = 16, refineIterations: int = 8, refinePoints: int = 5, useSurrogate: bool = False) -> list[coilClass]:
+    """ find the (topK) best coil designs with an inductance within (inductanceTolerance) of targetInductance (in Henry)
+        objective is either a key of the 'objectives' dict, or a custom function (lower is better)
+        if useSurrogate, the (single-layer) inductance is interpolated from lookup tables (see surrogateModel.py) during the search, which is a lot faster for slow formulas (like 'greenhouse')
+         (the returned coilClass objects still calculate everything exactly)
+        returns a list of coilClass objects, best first (it may be shorter than topK, or empty, if the target is not feasible within the limits) """
+    objectiveFunc: Callable = (objectives[objective] if isinstance(objective, str) else objective)
+    if(useSurrogate):  import surrogateModel # (only imported when needed)
+    def isFeasible(chunk: dict[str,np.ndarray], tolerance: float) -> np.ndarray:
+        return((chunk['trueInnerDiam'] > 0.0) & (np.abs((chunk['inductance'] / targetInductance) - 1.0) <= tolerance) & (chunk['resistance'] <= maxResistance))
+
+    ## coarse grid search:
+    gridRanges = np.array([[minDiam, maxDiam], [minClearance, maxClearance], [minTraceWidth, maxTraceWidth]]) # diam, clearance, traceWidth (the continuous parameters)
+    gridSteps = (gridRanges[:,1] - gridRanges[:,0]) / (gridPoints-1)
+    seeds = sweepEngine.bestSink(objectiveFunc, topK*4) # a few more seeds than needed, because not all of them will end up feasible
+    sweepEngine.sweep(turns=np.arange(1, maxTurns+1), diam=np.linspace(minDiam, maxDiam, gridPoints), clearance=np.linspace(minClearance, maxClearance, gridPoints), traceWidth=np.linspace(minTraceWidth, maxTraceWidth, gridPoints),
+                      layers=layers, PCBthickness=PCBthickness, copperThickness=copperThickness, shape=shape, formula=formula,
+                      filters=(lambda chunk : isFeasible(chunk, inductanceTolerance*coarseToleranceMult),), sink=seeds, useSurrogate=useSurrogate)
+    seeds = seeds.result()
+    if(len(seeds) == 0):  print("optimize() could not find any designs near", targetInductance, "H within the limits");  return([])
+
+    ## local refinement around each seed:
+    offsets = np.linspace(-1.0, 1.0, refinePoints) # the local grid, relative to the current step size
+    refined: list[tuple[float, dict]] = [] # (score, design) pairs
+    for i in range(len(seeds['turns'])):
+        design = {key : seeds[key][i] for key in seeds}
+        surrogate = (surrogateModel.getSurrogate(design['shape'], design['formula']) if useSurrogate else None)
+        center = np.array([design['diam'], design['clearance'], design['traceWidth']], dtype=float);  turns = int(design['turns'])
+        steps = gridSteps.copy()
+        bestScore = np.inf
+        for iteration in range(refineIterations):
+            localGrid = [np.arange(max(turns-1, 1), min(turns+1, maxTurns)+1)] + [np.clip(center[j] + (offsets*steps[j]), gridRanges[j,0], gridRanges[j,1]) for j in range(3)]
+            T, D, C, W = [values.ravel() for values in np.meshgrid(*localGrid, indexing='ij')]
+            local = calcCoilBatch(T, D, C, W, design['layers'], design['PCBthickness'], design['copperThickness'], design['shape'], design['formula'], surrogate=surrogate)
+            local.update({'turns' : T, 'diam' : D, 'clearance' : C, 'traceWidth' : W, 'layers' : np.full(T.shape, design['layers'])})
+            feasible = isFeasible(local, inductanceTolerance)
+            if(np.any(feasible)): # optimize the objective
+                with np.errstate(invalid='ignore'):
+                    scores = np.where(feasible, objectiveFunc(local), np.inf)
+                best = np.argmin(scores);  bestScore = scores[best]
+            else: # not there yet, move towards the target inductance first
+                with np.errstate(divide='ignore', invalid='ignore'):
+                    targetDistance = np.where(local['trueInnerDiam'] > 0.0, np.abs(np.log(local['inductance'] / targetInductance)), np.inf)
+                if(not np.any(np.isfinite(targetDistance))):  break # (should not happen, as the seed itself was valid)
+                best = np.nanargmin(targetDistance)
+            center = np.array([D[best], C[best], W[best]]);  turns = int(T[best])
+            steps *= 2.0 / (refinePoints-1) # the next grid spans (at most) one step of the current grid on either side
+        if(np.isfinite(bestScore)):
+            design.update({'turns' : turns, 'diam' : center[0], 'clearance' : center[1], 'traceWidth' : center[2]})
+            refined.append((bestScore, design))
+
+    ## rank the refined designs (seeds may have converged to the same design, so those are removed)
+    refined.sort(key=lambda entry : entry[0])
+    results: list[coilClass] = [];  alreadyFound: set[tuple] = set()
+    for (score, design) in refined:
+        identity = (design['shape'].__class__.__name__, design['formula'], design['turns'], design['layers'], round(design['diam'], 3), round(design['clearance'], 3),
+                    round(design['traceWidth'], 3), round(design['PCBthickness'], 3), round(design['copperThickness'], 4))
+        if(identity in alreadyFound):  continue
+        alreadyFound.add(identity)
+        results.append(coilClass(turns=int(design['turns']), diam=float(design['diam']), clearance=float(design['clearance']), traceWidth=float(design['traceWidth']), layers=int(design['layers']),
+                                 PCBthickness=float(design['PCBthickness']), copperThickness=float(design['copperThickness']), shape=design['shape'], formula=design['formula']))
+        if(len(results) >= topK):  break
+    return(results)
+
+
+if __name__ == "__main__": # an example of how this file may be used
+    import time
+    optimizeStartTime = time.time()
+    bestCoils = optimize(10e-6, maxDiam=40, minClearance=0.15, minTraceWidth=0.2, layers=(2,4), PCBthickness=(0.8,), objective='resistance')
+    print("optimize() took", round(time.time()-optimizeStartTime, 2), "seconds")
+    for coil in bestCoils:
+        print(coil.generateCoilFilename(), "  L/R [uH/Ohm]:", round(coil.calcInductance() * 1000000 / coil.calcTotalResistance(), 2))
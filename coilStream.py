@@ -0,0 +1,165 @@
+"""
+this file is a streaming evaluation service: a long-lived process that reads coil specs from stdin and writes the results to stdout,
+ one JSON object per line (NDJSON), sothat other tools (e.g. a BOM service or a KiCad plugin) don't have to start python (and import numpy) for every coil.
+    python coilStream.py            (or: python coilCLI.py stream)
+    in:  {"id": 1, "turns": 9, "diam": 40, "clearance": 0.15, "traceWidth": 0.9, "layers": 2, "PCBthickness": 0.6}
+    out: {"id": 1, "inductance": 1.169e-05, "resistance": 0.92, "simpleInnerDiam": 19.3, "trueInnerDiam": 19.8, "traceLength": 1676.7, ..., "filename": "ci_di40_tu9_..."}
+
+the input fields are the coilClass constructor parameters (shape is the name, like "circle", the defaults are the same as the constructor), plus an optional "id" that is copied to the output.
+every input line gets exactly one output line, in the same order. Invalid lines and impossible coils (that don't fit in their diameter) get {"id": ..., "error": "..."}
+lines that arrive together (within batchWindow) are evaluated together, with one calcCoilBatch() call per shape+formula, which is a lot faster than one coilClass per line.
+"""
+
+import sys
+import json
+import math
+import time
+import queue
+import threading
+import numpy as np
+
+import PCBcoilV2 as PCBcoil
+
+maxBatchSize: int = 4096 # (lines) at most this many lines are evaluated at once
+batchWindow: float = 0.001 # (seconds) after the first line of a batch, wait (at most) this long for more lines. Lines that are already waiting are always included (up to maxBatchSize)
+streamResultNames: tuple[str] = ('inductance', 'inductanceSingleLayer', 'resistance', 'simpleInnerDiam', 'trueInnerDiam', 'trueDiam', 'traceLength', 'capacitance', 'SRF') # (calcCoilBatch() results), the 'filename' is added too
+
+specNumericalNames: tuple[str] = ('turns', 'diam', 'clearance', 'traceWidth', 'layers', 'PCBthickness', 'copperThickness') # (same order as the calcCoilBatch() arguments)
+specRequiredNames: tuple[str] = ('turns', 'diam', 'clearance', 'traceWidth')
+specPositiveNames: tuple[str] = ('turns', 'diam', 'traceWidth', 'copperThickness') # (zero would give an infinite resistance (or no coil at all). The clearance, layers and PCBthickness may be 0)
+
+def _specDefaults() -> dict:
+    """ the coilClass constructor defaults of the (optional) spec fields (looked up once per batch, because inspect.signature() is slow) """
+    return({name : PCBcoil._coilClassDefault(name) for name in ('formula', 'multilayerFormula') + specNumericalNames if (name not in specRequiredNames)})
+
+def _parseSpec(spec: dict, defaults: dict) -> tuple[tuple, tuple]|str:
+    """ ((shape, formula, multilayerFormula), numerical values) of a coil spec, or an error message (str) """
+    if(not isinstance(spec, dict)):  return("a coil spec should be a JSON object, not: "+type(spec).__name__)
+    missing = [name for name in specRequiredNames if (name not in spec)]
+    if(len(missing) > 0):  return("missing fields: "+', '.join(missing))
+    if(spec.get('layerStack') is not None):  return("layerStack is not supported in the stream (yet)")
+    textFields = [name for name in ('shape', 'formula', 'multilayerFormula') if ((name in spec) and (not isinstance(spec[name], str)))]
+    if(len(textFields) > 0):  return(', '.join(textFields)+" should be a string (a name)")
+    shapeName = spec.get('shape', 'circle')
+    if(shapeName not in PCBcoil.shapes):  return("unknown shape: "+str(shapeName)+", options are: "+', '.join(PCBcoil.shapes.keys()))
+    shape = PCBcoil.shapes[shapeName]
+    formula = spec.get('formula', defaults['formula'])
+    if(formula not in shape.formulaCoefficients):  return("formula "+str(formula)+" is not available for shape "+shapeName+", options are: "+', '.join(shape.formulaCoefficients.keys()))
+    multilayerFormula = spec.get('multilayerFormula', defaults['multilayerFormula'])
+    if(multilayerFormula not in PCBcoil.multilayerFormulas):  return("unknown multilayerFormula: "+str(multilayerFormula))
+    notNumbers = [name for name in specNumericalNames if ((name in spec) and (isinstance(spec[name], bool) or (not isinstance(spec[name], (int, float)))))] # (bool is a subclass of int, but true is not 1 turn)
+    if(len(notNumbers) > 0):  return(', '.join(notNumbers)+" should be a number")
+    try:
+        if(not all([math.isfinite(spec[name]) for name in specNumericalNames if (name in spec)])):  return("all numbers should be finite")
+    except OverflowError: # (a huge JSON integer, e.g. 1 followed by 400 zeros)
+        return("all numbers should be finite")
+    notWhole = [name for name in ('turns', 'layers') if ((name in spec) and (spec[name] != int(spec[name])))]
+    if(len(notWhole) > 0):  return(', '.join(notWhole)+" should be a whole number") # (instead of silently evaluating a different coil)
+    values = tuple([((int(spec[name]) if (name in ('turns', 'layers')) else float(spec[name])) if (name in spec) else defaults[name]) for name in specNumericalNames])
+    nonPositive = [name for (name, value) in zip(specNumericalNames, values) if ((name in specPositiveNames) and (value <= 0))]
+    if(len(nonPositive) > 0):  return(', '.join(nonPositive)+" should be positive")
+    if(any([(value < 0) for value in values])):  return("all numbers should be non-negative")
+    return((shape, formula, multilayerFormula), values)
+
+def _jsonValue(value: float) -> float|None:
+    """ NaN and inf are not valid JSON, write them as null """
+    return(value if math.isfinite(value) else None)
+
+def evaluateSpecs(specs: list[dict]) -> list[dict]:
+    """ evaluate a list of coil specs (dicts with the coilClass constructor fields), with one calcCoilBatch() call per shape+formula(+multilayerFormula)
+        returns one result dict per spec (in the same order), with an 'error' instead of results for invalid specs """
+    outputs: list[dict] = [None] * len(specs)
+    groups: dict[tuple, list[tuple[int, tuple]]] = {} # (shape, formula, multilayerFormula) : [(index, values), ...]
+    defaults = _specDefaults()
+    for (index, spec) in enumerate(specs):
+        parsed = _parseSpec(spec, defaults)
+        output = ({'id' : spec['id']} if (isinstance(spec, dict) and ('id' in spec)) else {})
+        if(isinstance(parsed, str)):  output['error'] = parsed
+        else:  groups.setdefault(parsed[0], []).append((index, parsed[1]))
+        outputs[index] = output
+    for ((shape, formula, multilayerFormula), members) in groups.items():
+        paramArrays = [np.array(column) for column in zip(*[values for (_, values) in members])] # one array per numerical parameter
+        results = PCBcoil.calcCoilBatch(*paramArrays, shape=shape, formula=formula, multilayerFormula=multilayerFormula)
+        results['layers'] = np.maximum(paramArrays[4], 1) # (same as the coilClass constructor)
+        resultLists = {name : results[name].tolist() for name in streamResultNames} # (converting whole arrays at once is faster than per element)
+        trueInnerDiams = results['trueInnerDiam'].tolist()
+        for (rowIndex, (index, values)) in enumerate(members):
+            output = outputs[index]
+            if(not ((trueInnerDiams[rowIndex] > 0) and math.isfinite(resultLists['inductance'][rowIndex]) and math.isfinite(resultLists['resistance'][rowIndex]))):
+                output['error'] = impossibleCoilError(trueInnerDiams[rowIndex]);  continue # (the other results (negative lengths etc.) are meaningless too)
+            for name in streamResultNames:  output[name] = _jsonValue(resultLists[name][rowIndex])
+            turns, diam, clearance, traceWidth, _, PCBthickness, copperThickness = values
+            output['filename'] = PCBcoil.formatCoilFilename(shape, diam, turns, traceWidth, clearance, copperThickness, int(results['layers'][rowIndex]), PCBthickness, resultLists['resistance'][rowIndex], resultLists['inductance'][rowIndex])
+    return(outputs)
+
+def impossibleCoilError(trueInnerDiam: float) -> str:
+    """ the error message of an impossible coil (also used by 'coilCLI.py eval') """
+    return("impossible coil, the traces don't fit in the diameter (true inner diameter: "+str(round(trueInnerDiam, 3))+" mm), or the inductance/resistance can't be calculated")
+
+def evaluateSpecsSafe(specs: list[dict]) -> list[dict]:
+    """ evaluateSpecs(), but if the batch raises an exception (one bad spec shouldn't take down the rest of the batch), every spec is evaluated by itself """
+    try:
+        return(evaluateSpecs(specs))
+    except Exception as excep:
+        if(len(specs) == 1):
+            return([dict(({'id' : specs[0]['id']} if (isinstance(specs[0], dict) and ('id' in specs[0])) else {}), error="internal error: "+repr(excep))])
+    outputs: list[dict] = []
+    for spec in specs:
+        outputs += evaluateSpecsSafe([spec])
+    return(outputs)
+
+def coilFromSpec(spec: dict) -> PCBcoil.coilClass|str:
+    """ a coilClass from a coil spec (the same fields as the stream input, plus (optionally) 'CCW'), or an error message (str) """
+    parsed = _parseSpec(spec, _specDefaults())
+    if(isinstance(parsed, str)):  return(parsed)
+    (shape, formula, multilayerFormula), (turns, diam, clearance, traceWidth, layers, PCBthickness, copperThickness) = parsed
+    trueInnerDiam = PCBcoil.calcTrueInnerDiam(turns, diam, clearance, traceWidth, shape)
+    if(not (trueInnerDiam > 0)):  return(impossibleCoilError(trueInnerDiam))
+    return(PCBcoil.coilClass(turns, diam, clearance, traceWidth, layers, PCBthickness, copperThickness, shape, formula, bool(spec.get('CCW', False)), multilayerFormula=multilayerFormula))
+
+def evaluateLines(lines: list[str]) -> list[str]:
+    """ evaluateSpecs() for (NDJSON) lines, returns the output lines (without newlines) """
+    specs: list = []
+    for line in lines:
+        try:
+            specs.append(json.loads(line))
+        except ValueError:
+            specs.append(None) # (gets an error below)
+    outputs = evaluateSpecsSafe([(spec if (spec is not None) else {}) for spec in specs])
+    for (index, spec) in enumerate(specs):
+        if(spec is None):  outputs[index] = {'error' : "invalid JSON"}
+    return([json.dumps(output) for output in outputs])
+
+def _readLines(inputStream, lineQueue: queue.Queue):
+    """ (thread) put every (non-empty) line in the queue, and None at the end """
+    for line in inputStream:
+        if(line.strip()):  lineQueue.put(line)
+    lineQueue.put(None)
+
+def serve(inputStream = None, outputStream = None, window: float = batchWindow, maxBatch: int = maxBatchSize) -> int:
+    """ read coil specs from inputStream (stdin) until it ends, write the results to outputStream (stdout), micro-batched. Returns the number of lines handled """
+    inputStream = (sys.stdin if (inputStream is None) else inputStream)
+    outputStream = (sys.stdout if (outputStream is None) else outputStream)
+    lineQueue: queue.Queue = queue.Queue()
+    threading.Thread(target=_readLines, args=(inputStream, lineQueue), daemon=True).start() # (a thread, sothat waiting for a line doesn't block evaluating the ones that already arrived)
+    lineCount = 0;  ended = False
+    while(not ended):
+        line = lineQueue.get() # wait for the first line of the next batch
+        if(line is None):  break
+        batch = [line]
+        batchDeadline = time.perf_counter() + window
+        while(len(batch) < maxBatch):
+            try: # (take what's already waiting, then wait (a little) for more)
+                line = lineQueue.get_nowait() if (time.perf_counter() >= batchDeadline) else lineQueue.get(timeout=max(batchDeadline - time.perf_counter(), 0.0))
+            except queue.Empty:
+                break
+            if(line is None):  ended = True;  break
+            batch.append(line)
+        outputStream.write('\n'.join(evaluateLines(batch)) + '\n')
+        outputStream.flush()
+        lineCount += len(batch)
+    return(lineCount)
+
+
+if __name__ == "__main__":
+    serve()
@@ -0,0 +1,186 @@
+"""
+this file holds a compact (columnar) way of storing LOTS of coil designs: coilTableClass
+a coilClass object is a full python object (with a __dict__ and a shape object reference), which is ~hundreds of bytes per design,
+ so for catalogues of millions of designs, the parameters are stored as one numpy array per parameter (struct-of-arrays) instead, at ~50 bytes per design.
+the shape and formula are stored as small integer codes (an index in shapeNames/formulaNames)
+
+the calcCoilBatch() results (inductance, resistance, etc.) are available as (computed) columns, they're calculated (vectorized) the first time they're needed.
+single rows can be accessed as coilRowViewClass objects, which act just like a coilClass, but read/write their parameters directly from/to the table (no copying)
+slices of a table (table[10:20]) share the memory of the original table, so a change through a row view of either one clears the computed columns (and cached row results) of both (see _shared)
+"""
+
+import numpy as np
+
+from PCBcoilV2 import calcCoilBatch, coilClass, shapes, _shapeBaseClass, coilParameterNames
+
+shapeNames: list[str] = list(shapes.keys()) # shapeCode is the index in this list
+formulaNames: list[str] = list(dict.fromkeys([formula for shapeObj in shapes.values() for formula in shapeObj.formulaCoefficients])) # all formulas (in order of appearance), formulaCode is the index in this list
+
+## the (stored) columns of the table and their dtypes (chosen to be as small as reasonable)
+tableColumnDtypes: dict[str, np.dtype] = {'turns' : np.int32, 'diam' : np.float64, 'clearance' : np.float64, 'traceWidth' : np.float64, 'layers' : np.int16,
+                                          'PCBthickness' : np.float64, 'copperThickness' : np.float64, 'shapeCode' : np.uint8, 'formulaCode' : np.uint8, 'CCW' : np.bool_}
+
+def shapeToCode(shape: _shapeBaseClass|str) -> int:
+    """ the shapeCode of a shape (object or key from the 'shapes' dict) """
+    if(isinstance(shape, str)):  return(shapeNames.index(shape))
+    return([shapeObj.__class__ for shapeObj in shapes.values()].index(shape.__class__)) # (compare by class, as the shapes are static classes)
+
+class coilTableClass:
+    """ a table of coil designs, stored as one numpy array per parameter (see tableColumnDtypes)
+        table['diam'] returns a column (also works for the calcCoilBatch() results, like table['inductance'])
+        table[i] returns a coilRowViewClass of row i, table[slice/mask/indices] returns a new (smaller) table """
+    def __init__(self, columns: dict[str,np.ndarray]):
+        self.columns: dict[str,np.ndarray] = {key : np.asarray(columns[key], dtype=tableColumnDtypes[key]) for key in tableColumnDtypes}
+        self._computed: dict[str,np.ndarray] = {} # calcCoilBatch() results (only valid if _computedGeneration is the current generation, see _validComputed())
+        self._shared: dict[str,int] = {'generation' : 0} # shared by all tables that share the same column memory (slices), the generation is incremented whenever a row is changed
+        self._computedGeneration: int = 0
+
+    @classmethod
+    def empty(cls, length: int = 0):
+        return(cls({key : np.zeros(length, dtype=tableColumnDtypes[key]) for key in tableColumnDtypes}))
+    @classmethod
+    def fromCoils(cls, coilList: list[coilClass]):
+        """ make a table from a list of coilClass objects (this copies all the parameters) """
+        columns = {key : [getattr(coil, key) for coil in coilList] for key in tableColumnDtypes if (key not in ('shapeCode', 'formulaCode'))}
+        columns['shapeCode'] = [shapeToCode(coil.shape) for coil in coilList]
+        columns['formulaCode'] = [formulaNames.index(coil.formula) for coil in coilList]
+        return(cls(columns))
+    @classmethod
+    def fromChunk(cls, chunk: dict[str,np.ndarray]):
+        """ make a table from a sweep chunk (see sweepEngine), the already-calculated results are kept as computed columns
+            (chunks of a layerStack sweep are not supported, as the table can't store the stack-ups, so its rows would give different results) """
+        if('layerStackIndex' in chunk):  raise(Exception("coilTableClass can't store layerStack designs (yet), sweep without a layerStack (or use another sink)"))
+        length = len(chunk['turns'])
+        columns = {key : chunk[key] for key in tableColumnDtypes if (key in chunk)}
+        columns['shapeCode'] = np.full(length, shapeToCode(chunk['shape']));  columns['formulaCode'] = np.full(length, formulaNames.index(chunk['formula']))
+        columns['CCW'] = np.zeros(length, dtype=bool)
+        table = cls(columns)
+        table._computed = {key : chunk[key] for key in chunk if (isinstance(chunk[key], np.ndarray) and (key not in tableColumnDtypes))}
+        return(table)
+    @classmethod
+    def concatenate(cls, tables: list['coilTableClass']):
+        """ combine several tables into one (computed columns are only kept if all tables have them) """
+        if(len(tables) == 0):  return(cls.empty())
+        table = cls({key : np.concatenate([entry.columns[key] for entry in tables]) for key in tableColumnDtypes})
+        computedList = [entry._validComputed() for entry in tables]
+        table._computed = {key : np.concatenate([computed[key] for computed in computedList]) for key in computedList[0] if all([(key in computed) for computed in computedList])}
+        return(table)
+
+    def __len__(self) -> int:
+        return(len(self.columns['turns']))
+    @property
+    def nbytes(self) -> int:
+        """ the memory used by the stored columns (not including computed columns) """
+        return(sum([self.columns[key].nbytes for key in self.columns]))
+
+    def _validComputed(self) -> dict[str,np.ndarray]:
+        """ the computed columns, or {} if a row (of this table or one that shares its memory) was changed since they were computed """
+        if(self._computedGeneration != self._shared['generation']):
+            self._computed = {};  self._computedGeneration = self._shared['generation'] # (new arrays are made when they're computed again, sothat other tables' views of the old ones are not affected)
+        return(self._computed)
+    def _rowsChanged(self):
+        """ (called by coilRowViewClass) invalidate the computed columns and cached row results of this table, and all tables that share its memory """
+        self._shared['generation'] += 1
+
+    def compute(self) -> dict[str,np.ndarray]:
+        """ calculate all calcCoilBatch() results (for every shape/formula group in one vectorized call) """
+        if(len(self._validComputed()) > 0):  return(self._computed)
+        groupCodes = (self.columns['shapeCode'].astype(np.int32) * len(formulaNames)) + self.columns['formulaCode']
+        for groupCode in np.unique(groupCodes):
+            shapeObj = shapes[shapeNames[groupCode // len(formulaNames)]];  formulaStr = formulaNames[groupCode % len(formulaNames)]
+            inGroup = (groupCodes == groupCode)
+            results = calcCoilBatch(*[self.columns[key][inGroup] for key in ('turns', 'diam', 'clearance', 'traceWidth', 'layers', 'PCBthickness', 'copperThickness')], shape=shapeObj, formula=formulaStr)
+            for key in results:
+                if(key not in self._computed):  self._computed[key] = np.empty(len(self), dtype=np.float64)
+                self._computed[key][inGroup] = results[key]
+        return(self._computed)
+
+    def __getitem__(self, key: str|int|slice|np.ndarray):
+        if(isinstance(key, str)):
+            if(key in self.columns):  return(self.columns[key])
+            if(key == 'shape'):  return(np.array([shapes[name] for name in shapeNames], dtype=object)[self.columns['shapeCode']])
+            if(key == 'formula'):  return(np.array(formulaNames, dtype=object)[self.columns['formulaCode']])
+            return(self.compute()[key])
+        if(isinstance(key, (int, np.integer))):
+            return(coilRowViewClass(self, (int(key) if (key >= 0) else (len(self) + int(key)))))
+        table = coilTableClass({column : self.columns[column][key] for column in self.columns}) # (slices give views of the same memory, masks/index arrays give copies)
+        table._computed = {column : computed[key] for (column, computed) in self._validComputed().items()}
+        if(isinstance(key, slice)):  table._shared = self._shared;  table._computedGeneration = self._computedGeneration # (shared memory, so changes in one should invalidate both)
+        return(table)
+    def filter(self, mask: np.ndarray) -> 'coilTableClass':
+        """ (macro) return only the rows where mask is True """
+        return(self[np.asarray(mask, dtype=bool)])
+    def __iter__(self):
+        for i in range(len(self)):
+            yield(coilRowViewClass(self, i))
+    def toCoilList(self) -> list[coilClass]:
+        """ make a (normal) coilClass object for every row. Only do this for small tables! """
+        return([coilClass(turns=int(self.columns['turns'][i]), diam=float(self.columns['diam'][i]), clearance=float(self.columns['clearance'][i]), traceWidth=float(self.columns['traceWidth'][i]),
+                          layers=int(self.columns['layers'][i]), PCBthickness=float(self.columns['PCBthickness'][i]), copperThickness=float(self.columns['copperThickness'][i]),
+                          shape=shapes[shapeNames[self.columns['shapeCode'][i]]], formula=formulaNames[self.columns['formulaCode'][i]], CCW=bool(self.columns['CCW'][i])) for i in range(len(self))])
+
+
+def _tableColumnProperty(column: str, toValue: type = float, fromValue: type = None) -> property:
+    """ a property that reads/writes one row of a table column (for coilRowViewClass) """
+    def getter(self):
+        return(toValue(self._table.columns[column][self._index]))
+    def setter(self, value):
+        self._table.columns[column][self._index] = (value if (fromValue is None) else fromValue(value))
+        self._table._rowsChanged() # (clears the computed columns of the table (and its slices), and the cached results of every row view)
+    return(property(getter, setter))
+
+class coilRowViewClass(coilClass):
+    """ a coilClass that does not store its own parameters, but reads/writes them from/to one row of a coilTableClass (zero-copy)
+        it can be used anywhere a coilClass can (rendering, exporters, UI), and changes made to it are written to the table """
+    def __init__(self, table: coilTableClass, index: int):
+        self._table = table
+        self._index = index
+        self._rowCache: dict[str,float] = {}
+        self._rowCacheGeneration: int = table._shared['generation']
+    @property
+    def _cache(self) -> dict[str,float]:
+        """ the cached calc results (see PCBcoilV2._cachedCoilMethod), cleared if the table was changed (through any row view) since they were calculated """
+        if(self._rowCacheGeneration != self._table._shared['generation']):
+            self._rowCache = {};  self._rowCacheGeneration = self._table._shared['generation']
+        return(self._rowCache)
+    turns = _tableColumnProperty('turns', int)
+    diam = _tableColumnProperty('diam')
+    clearance = _tableColumnProperty('clearance')
+    traceWidth = _tableColumnProperty('traceWidth')
+    layers = _tableColumnProperty('layers', int, lambda value : max(value, 1))
+    PCBthickness = _tableColumnProperty('PCBthickness')
+    copperThickness = _tableColumnProperty('copperThickness')
+    shape = _tableColumnProperty('shapeCode', lambda code : shapes[shapeNames[code]], shapeToCode)
+    formula = _tableColumnProperty('formulaCode', lambda code : formulaNames[code], formulaNames.index)
+    CCW = _tableColumnProperty('CCW', bool)
+    def toCoil(self) -> coilClass:
+        """ make an independent (copied) coilClass of this row """
+        return(coilClass(self.turns, self.diam, self.clearance, self.traceWidth, self.layers, self.PCBthickness, self.copperThickness, self.shape, self.formula, self.CCW))
+    def __repr__(self):
+        return("coilRowView("+str(self._index)+": "+', '.join([(name+'='+str(getattr(self, name))) for name in coilParameterNames])+")")
+
+
+class tableSink:
+    """ a sweep() sink (see sweepEngine) that collects the (filtered) results into a coilTableClass, including the calculated results """
+    def __init__(self):
+        self.tables: list[coilTableClass] = []
+    def __call__(self, chunk: dict[str,np.ndarray]):
+        self.tables.append(coilTableClass.fromChunk(chunk))
+    def __len__(self) -> int:
+        return(sum([len(table) for table in self.tables]))
+    def result(self) -> coilTableClass:
+        return(coilTableClass.concatenate(self.tables))
+
+
+if __name__ == "__main__": # an example of how this file may be used
+    import time
+    import sweepEngine
+    sweepStartTime = time.time()
+    sink = tableSink()
+    sweepEngine.sweep(turns=range(1, 31), diam=np.arange(10, 51, 1.0), clearance=np.arange(0.1, 0.51, 0.05), traceWidth=np.arange(0.2, 2.01, 0.1), layers=(1,2,4,6), PCBthickness=(0.8, 1.6),
+                      shape=list(shapes.values()), formula=('cur_sheet',), filters=(sweepEngine.filterPositiveInnerDiam,), sink=sink)
+    table = sink.result()
+    print("table of", len(table), "designs made in", round(time.time()-sweepStartTime, 2), "seconds, using", round(table.nbytes / 1e6, 1), "MB (+", round(sum([column.nbytes for column in table._computed.values()]) / 1e6, 1), "MB of computed columns)")
+    tenMicroHenry = table.filter(np.abs(table['inductance'] - 10e-6) < 0.1e-6)
+    best = tenMicroHenry[int(np.argmin(tenMicroHenry['resistance']))]
+    print(len(tenMicroHenry), "designs are 10uH (+-1%), the one with the lowest resistance is:", best, best.generateCoilFilename())
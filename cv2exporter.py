@@ -4,7 +4,6 @@ this is an exporter (/renderer) to images (bitmaps),
   specifically, for printing coils using inkjet equipment (special silver-ink printers, or just regular ones (useful for negative-exposure etching))
 
 TODO:
-- manual polygon math (instead of letting CV2 draw the lines)
 - automatic isolation-layer rendering (slightly complex)
 - direct export to multi-layer image programs like paint.NET (.pdn file), or photoshop or whatever. NOTE: .tiff doesn't work in paint.NET
 """
@@ -20,6 +19,7 @@ CV2outputFormats: dict[str,str] = {'.png' : '.png',
                                    '.tiff' : '.tiff'} # NOTE: .tiff multiple layers don't work in paint.NET (which was the whole reason i added it...)
 
 preferredLineType = cv2.LINE_AA # there's not much difference between the line types, especially at high resolutions
+subpixelBits: int = 4 # the polygons are drawn with (1/2^subpixelBits) pixel precision (see the 'shift' parameter of cv2.fillPoly())
 
 ## some default colors. NOTE: should be overwritten with colorFunc
 backgroundColor = [0  ,0  ,0  ,0  ] # (BGRA) fully transparent
@@ -33,30 +33,29 @@ def imwrite(coil: 'coilClass', pixelsPerMM:float, format:str='.png', colorFunc:C
         can output as several '.png' files, or as 1 '.tiff'/'.tif' file (with mutiple layers).
         colorFunc (optional) must be a function which provides a BGRA color for a given layer index, or the background color if given -1.
         if the binary parameter is set to True, pixels will have only either 0 or 255 as their value.
-            binaryThresh determines the lower-cutoff threshold for values to become 255 """
+            binaryThresh determines the lower-cutoff threshold for values to become 255
+        the copper outline (see coilClass.renderAsPolygon()) is filled, so the traces are exactly traceWidth wide.
+        circular coils are rendered with (just) enough points to stay within half a pixel of the true curve """
     # if(imageRes is None):  imageRes = (1,1) # automatically calculate imageRes when it's not specified
     if(colorFunc is None):  colorFunc = defaultColorFunc
     if(format not in CV2outputFormats):
         print("imwrite invalid format!");   return([])
-    renderedCoils: list[list[tuple[float,float]]] = [coil.renderAsCoordinateList(False), coil.renderAsCoordinateList(True)]
-    maxVal: float = max([max(abs(point[0]), abs(point[1])) for point in renderedCoils[0]]) # gives the maximum coordinate in any direction
-    maxVal += (coil.traceWidth/2) # the maximum coordinate is the center of a trace point, so add half the trace width to get the bounding box radius
+    ## one outline per layer (+ the return trace). Any finer than half a pixel would not be visible. cv2 fills the pixels on the edges of a polygon as well, which makes it 1 pixel too wide, so the outline is made 1 pixel narrower
+    polygons: list[np.ndarray] = coil.render(chordTolerance=0.5/pixelsPerMM).asPolygons(max(coil.traceWidth - (1/pixelsPerMM), 0.0), coil.layers)
+    maxVal: float = max([np.max(np.abs(polygon)) for polygon in polygons]) + (0.5/pixelsPerMM) # gives the maximum coordinate in any direction (the outline already includes (most of) the trace width)
     ## the coils are rendered around the (0,0) coordinate, so maxVal is half the minimum resolution (and let's just make it square, to make centering extra easy)
     # imageRes = (max(int(imageRes[0]), int(round(2*maxVal*pixelsPerMM))), max(int(imageRes[1]), int(round(2*maxVal*pixelsPerMM)))) # enforces minimum image size calculated
     imageRes = (int(round(2*maxVal*pixelsPerMM)), int(round(2*maxVal*pixelsPerMM)))
     blankImage = np.empty((imageRes[0],imageRes[1],4), dtype=np.uint8) # 4 channel (BGRA) image
     allImages: list[np.ndarray] = [] # a list of image arrays
-    lineWidthPixels = int(coil.traceWidth * pixelsPerMM) - 1 # cv2 interprets line width a little strangely. 4=>5, 5=>7, 6=>7, 7=>9, always odd numbers, always at least 1 too big
-    realToPixelPos: Callable[[tuple[float,float]], tuple[int,int]] = lambda realPos : (int((imageRes[1]/2)+(realPos[0]*pixelsPerMM)),
-                                                                                        int(((imageRes[0]/2)-(realPos[1]*pixelsPerMM)) if invertY else ((imageRes[0]/2)+(realPos[1]*pixelsPerMM))))
+    realToPixelArray: Callable[[np.ndarray], np.ndarray] = lambda realPosArray : np.round(np.stack(((imageRes[1]/2)+(realPosArray[:,0]*pixelsPerMM),
+                                                                                        ((imageRes[0]/2)-(realPosArray[:,1]*pixelsPerMM)) if invertY else ((imageRes[0]/2)+(realPosArray[:,1]*pixelsPerMM))), axis=1) * (2**subpixelBits)).astype(np.int32) # (fixed-point, see subpixelBits)
     ## NOTE: cv2 image arrays are stored as [y][x], but most (not all) functions want coordinates in (x,y).
-    pixelLineArrays = np.array([[realToPixelPos(point) for point in renderedCoil] for renderedCoil in renderedCoils], int)
-    for currentLayer in range(coil.layers):
-        lineArr = pixelLineArrays[currentLayer % 2]
-        allImages.append(cv2.polylines(blankImage.copy(), [lineArr.reshape((-1, 1, 2))], False, colorFunc(currentLayer), lineWidthPixels, preferredLineType)) # cv2 has a function for drawing nice lines
-        ## NOTE: cv2 renders lines with smooth transitions. This is nice for human eyes, but not great for metal-etching/printing. I recommend using some kind of binary 'flattening'/rounding.
-    if((coil.layers%2)!=0): # only in case of an un-even number of layers
-        allImages.append(cv2.line(blankImage.copy(), realToPixelPos((renderedCoils[0][-1][0], renderedCoils[0][0][1])), realToPixelPos(renderedCoils[0][-1]), colorFunc(coil.layers), lineWidthPixels, preferredLineType))
+    pixelPolygons: dict[int,np.ndarray] = {} # the layers share only 2 different outlines (CW and CCW), so only convert those once
+    for currentLayer in range(len(polygons)): # every layer, and the return trace (only in case of an un-even number of layers)
+        if(id(polygons[currentLayer]) not in pixelPolygons):  pixelPolygons[id(polygons[currentLayer])] = realToPixelArray(polygons[currentLayer]).reshape((-1, 1, 2))
+        allImages.append(cv2.fillPoly(blankImage.copy(), [pixelPolygons[id(polygons[currentLayer])]], colorFunc(currentLayer), preferredLineType, subpixelBits))
+        ## NOTE: cv2 renders (anti-aliased) edges with smooth transitions. This is nice for human eyes, but not great for metal-etching/printing. I recommend using some kind of binary 'flattening'/rounding.
     
     if(binary):
         ## NOTE: the binary conversion is not ideal. It currently handles every channel seperately.
@@ -1,3 +1,4 @@
+import math
 import pandas as pd # used to make nice-looking excel files (alternatively, just use .CSV)
 ## TODO: if pandas fails to import, fall back to .csv
 ## NOTE: installing pandas ('pip install pandas') may also require installing openpyxl ('pip install openpyxl') to get full the .to_excel() function to work
@@ -6,23 +7,50 @@ import pandas as pd # used to make nice-looking excel files (alternatively, just
 fileExtension = ".xlsx" # for pandas DataFrame output
 
 def exportCoils(coilList: list['coilClass'], filename: str) -> bool: # i wanted to avoid importing any one version of PCBcoilV_, so this type hint is mostly useless
-    """ save some (list of) coil parameters and predictions to an excel file """
-    dataFrameToSave = pd.DataFrame({'Shape' : [coil.shape.__class__.__name__ for coil in coilList], # not ideal, but searching through the 'shapes' list's keys is some terrible code, let's just not.
-                                    'Layers' : [coil.layers for coil in coilList],
-                                    'Turns' : [coil.turns for coil in coilList],
-                                    'Trace width [mm]' : [coil.traceWidth for coil in coilList],
-                                    'Clearance [mm]' : [coil.clearance for coil in coilList],
-                                    'Diam [mm]' : [coil.diam for coil in coilList],
-                                    'Calculated trace length [mm]' : [coil.calcCoilTraceLength() for coil in coilList],
-                                    'PCBthickness [mm]' : [coil.PCBthickness for coil in coilList],
-                                    'Layer spacing [mm]' : [coil.calcLayerSpacing() for coil in coilList],
-                                    'Copper thickness [um]' : [(coil.copperThickness*1000) for coil in coilList],
-                                    'Calculated trace length [mm]' : [coil.calcCoilTraceLength() for coil in coilList],
-                                    'Predicted Resistance [mOhm]' : [(coil.calcTotalResistance()*1000) for coil in coilList],
-                                    'Predicted Inductance [uH]' : [(coil.calcInductance()*1000000) for coil in coilList],
-                                    'Predicted Inductance single-layer [uH]' : [(coil.calcInductanceSingleLayer()*1000000) for coil in coilList],
-                                    'formula used' : [coil.formula for coil in coilList],
-                                    'general filename' : [coil.generateCoilFilename() for coil in coilList]})
+    """ save some (list of) coil parameters and predictions to an excel file
+        coilList may also be a coilTableClass (see coilTable.py), in which case the (vectorized) columns are used directly """
+    if(hasattr(coilList, 'compute')): # a coilTableClass (checked like this to avoid importing coilTable)
+        table = coilList
+        from PCBcoilV2 import formatCoilFilename # (only imported when needed) (coilTable already imported it anyway)
+        filenames = [(formatCoilFilename(shapeObj, diam, turns, traceWidth, clearance, copperThickness, layers, PCBthickness, resistance, inductance) if (math.isfinite(resistance) and math.isfinite(inductance)) else None)
+                     for (shapeObj, diam, turns, traceWidth, clearance, copperThickness, layers, PCBthickness, resistance, inductance) in
+                     zip(table['shape'], *[table[key].tolist() for key in ('diam', 'turns', 'traceWidth', 'clearance', 'copperThickness', 'layers', 'PCBthickness', 'resistance', 'inductance')])] # (from the columns, instead of a coilClass per row)
+        dataFrameToSave = pd.DataFrame({'Shape' : [shapeObj.__class__.__name__ for shapeObj in table['shape']],
+                                        'Layers' : table['layers'],
+                                        'Turns' : table['turns'],
+                                        'Trace width [mm]' : table['traceWidth'],
+                                        'Clearance [mm]' : table['clearance'],
+                                        'Diam [mm]' : table['diam'],
+                                        'Calculated trace length [mm]' : table['traceLength'],
+                                        'PCBthickness [mm]' : table['PCBthickness'],
+                                        'Layer spacing [mm]' : table['layerSpacing'],
+                                        'Copper thickness [um]' : table['copperThickness']*1000,
+                                        'Predicted Resistance [mOhm]' : table['resistance']*1000,
+                                        'Predicted Inductance [uH]' : table['inductance']*1000000,
+                                        'Predicted Inductance single-layer [uH]' : table['inductanceSingleLayer']*1000000,
+                                        'Predicted capacitance [pF]' : table['capacitance']*1e12,
+                                        'Predicted SRF [MHz]' : table['SRF']/1e6,
+                                        'formula used' : table['formula'],
+                                        'general filename' : filenames})
+    else:
+        dataFrameToSave = pd.DataFrame({'Shape' : [coil.shape.__class__.__name__ for coil in coilList], # not ideal, but searching through the 'shapes' list's keys is some terrible code, let's just not.
+                                        'Layers' : [coil.layers for coil in coilList],
+                                        'Turns' : [coil.turns for coil in coilList],
+                                        'Trace width [mm]' : [coil.traceWidth for coil in coilList],
+                                        'Clearance [mm]' : [coil.clearance for coil in coilList],
+                                        'Diam [mm]' : [coil.diam for coil in coilList],
+                                        'Calculated trace length [mm]' : [coil.calcCoilTraceLength() for coil in coilList],
+                                        'PCBthickness [mm]' : [coil.PCBthickness for coil in coilList],
+                                        'Layer spacing [mm]' : [coil.calcLayerSpacing() for coil in coilList],
+                                        'Copper thickness [um]' : [(coil.copperThickness*1000) for coil in coilList],
+                                        'Calculated trace length [mm]' : [coil.calcCoilTraceLength() for coil in coilList],
+                                        'Predicted Resistance [mOhm]' : [(coil.calcTotalResistance()*1000) for coil in coilList],
+                                        'Predicted Inductance [uH]' : [(coil.calcInductance()*1000000) for coil in coilList],
+                                        'Predicted Inductance single-layer [uH]' : [(coil.calcInductanceSingleLayer()*1000000) for coil in coilList],
+                                        'Predicted capacitance [pF]' : [(coil.calcParasiticCapacitance()*1e12) for coil in coilList],
+                                        'Predicted SRF [MHz]' : [(coil.calcSelfResonantFrequency()/1e6) for coil in coilList],
+                                        'formula used' : [coil.formula for coil in coilList],
+                                        'general filename' : [coil.generateCoilFilename() for coil in coilList]})
     try:
         if(not filename.endswith(fileExtension)):
             filename += fileExtension
@@ -100,7 +128,14 @@ if __name__ == "__main__": # normal usage
     coilList.append(coilClass(turns=8, diam=24, clearance=0.10, traceWidth=1.0, layers=6, PCBthickness=1.2, copperThickness=0.015, shape=shapes['circle'], formula='cur_sheet')) # 6L test sample (uneven spacing!)
     
 
-    ## forloop example:
+    ## sweep example: (the sweep engine evaluates all combinations in vectorized chunks, see sweepEngine.py)
+    # import sweepEngine
+    # sweepResults = sweepEngine.collectSink()
+    # sweepEngine.sweep(turns=(6,9), diam=(30,40), clearance=(0.15,0.3), traceWidth=(0.9,1.2), layers=(1,2,3,4), PCBthickness=(0.6,0.8), copperThickness=(0.03,0.0348),
+    #                   shape=(shapes['square'], shapes['circle']), formula=('cur_sheet',), filters=(sweepEngine.filterPositiveInnerDiam,), sink=sweepResults)
+    # coilList += sweepResults.toCoilList()
+
+    ## (old) forloop example:
     # shapeList = (shapes['square'], shapes['circle']) # to fetch all shapes, use: [shapes[key] for key in shapes]
     # layerList = (1,2,3,4)
     # turnsList = (6,9)
@@ -0,0 +1,201 @@
+"""
+this file is an (opt-in) profiler for the hot paths: the PCBcoilV2 calc functions, the rendering, and the exporters (DXF, excel, cv2)
+it records the number of calls, the cumulative (and self) time, and (optionally) the peak memory (with tracemalloc) of every instrumented function,
+ and which function called which (as 'collapsed stacks', the input format of flamegraph.pl, speedscope, etc.)
+
+enable it with an environment variable (checked when PCBcoilV2 is imported), a report is printed when python exits:
+    PCBCOIL_INSTRUMENT=1 python PCBcoilV2.py              (timing only)
+    PCBCOIL_INSTRUMENT=memory python PCBcoilV2.py         (also peak memory, which is a lot slower)
+    PCBCOIL_INSTRUMENT_OUTPUT=stacks.txt                  (also save the collapsed stacks to this file on exit)
+or with the API:
+    import instrumentation
+    instrumentation.enable(memory=False)
+    (do stuff)
+    instrumentation.printReport();  instrumentation.saveCollapsedStacks('stacks.txt')
+    instrumentation.disable()
+
+the functions are only wrapped when it is enabled (and unwrapped again by disable()), sothat there is no overhead at all when it's not used.
+NOTE: the wrapping is done by replacing the module/class attributes, so references made before enable() (e.g. 'from PCBcoilV2 import calcCoilBatch') are not instrumented
+"""
+
+import os
+import time
+import functools
+import threading
+import tracemalloc
+import atexit
+from typing import Callable # just for type-hints to provide some nice syntax colering
+
+environmentVariable: str = 'PCBCOIL_INSTRUMENT' # '1' (or anything else) for timing, 'memory' for timing and peak memory
+environmentOutputVariable: str = 'PCBCOIL_INSTRUMENT_OUTPUT' # (optional) filename for the collapsed stacks (saved on exit)
+
+## what gets instrumented: (module name, attribute names), where attribute names ending with '*' are prefixes (e.g. all 'calc' functions of the module)
+instrumentTargets: tuple[tuple[str, tuple[str]]] = (('PCBcoilV2', ('calc*', 'coilClass.calc*', 'coilClass.render*', 'coilClass.saveDXF', 'coilClass.to_excel', 'coilClass.imwrite')),
+                                                    ('segmentInductance', ('calcPolylineInductance',)),
+                                                    ('DXFexporter', ('saveDXF',)),
+                                                    ('excelExporter', ('exportCoils',)),
+                                                    ('cv2exporter', ('imwrite',)))
+
+class _functionStatsClass:
+    """ the recorded stats of one instrumented function """
+    __slots__ = ('calls', 'totalTime', 'selfTime', 'peakMemory')
+    def __init__(self):
+        self.calls: int = 0
+        self.totalTime: float = 0.0 # (seconds) including the instrumented functions it calls (recursive calls are not counted twice)
+        self.selfTime: float = 0.0 # (seconds) excluding the instrumented functions it calls
+        self.peakMemory: int = 0 # (bytes) the most memory (allocated by python/numpy) that was in use during any one call, on top of what was in use before the call
+
+class _frameClass:
+    """ an active (instrumented) call """
+    __slots__ = ('name', 'startTime', 'childTime', 'startMemory', 'childPeak')
+    def __init__(self, name: str, startTime: float, startMemory: int):
+        self.name = name;  self.startTime = startTime;  self.childTime = 0.0
+        self.startMemory = startMemory;  self.childPeak = 0 # (absolute) the highest peak seen before/in calls to other instrumented functions
+
+enabled: bool = False
+memoryTracking: bool = False
+_stats: dict[str, _functionStatsClass] = {}
+_collapsedStacks: dict[str, float] = {} # 'outer;inner;innermost' : self time (seconds)
+_statsLock = threading.Lock()
+_threadLocal = threading.local() # every thread has its own call stack
+_originals: list[tuple[object, str, object]] = [] # (owner, attribute name, original), to undo the wrapping
+_startedTracemalloc: bool = False # (only stop tracemalloc if this file started it)
+
+def _callStack() -> list[_frameClass]:
+    if(not hasattr(_threadLocal, 'stack')):  _threadLocal.stack = []
+    return(_threadLocal.stack)
+
+def _wrap(func: Callable, name: str) -> Callable:
+    """ returns a wrapped version of func, which records its stats under name """
+    @functools.wraps(func)
+    def instrumentedFunc(*args, **kwargs):
+        stack = _callStack()
+        startMemory = 0
+        if(memoryTracking):
+            startMemory, peak = tracemalloc.get_traced_memory()
+            if(len(stack) > 0):  stack[-1].childPeak = max(stack[-1].childPeak, peak) # (the peak is reset below, so save it for the caller first)
+            tracemalloc.reset_peak()
+        frame = _frameClass(name, time.perf_counter(), startMemory)
+        stack.append(frame)
+        try:
+            return(func(*args, **kwargs))
+        finally:
+            elapsed = time.perf_counter() - frame.startTime
+            stack.pop()
+            peak = 0
+            if(memoryTracking):
+                peak = max(tracemalloc.get_traced_memory()[1], frame.childPeak)
+                if(len(stack) > 0):  stack[-1].childPeak = max(stack[-1].childPeak, peak)
+            if(len(stack) > 0):  stack[-1].childTime += elapsed
+            stackKey = ';'.join([outerFrame.name for outerFrame in stack] + [name])
+            with _statsLock:
+                stats = _stats.get(name)
+                if(stats is None):  stats = _stats[name] = _functionStatsClass()
+                stats.calls += 1
+                if(not any([(outerFrame.name == name) for outerFrame in stack])):  stats.totalTime += elapsed # (recursion would count the same time twice)
+                stats.selfTime += elapsed - frame.childTime
+                stats.peakMemory = max(stats.peakMemory, peak - frame.startMemory)
+                _collapsedStacks[stackKey] = _collapsedStacks.get(stackKey, 0.0) + (elapsed - frame.childTime)
+    instrumentedFunc._instrumentedOriginal = func
+    return(instrumentedFunc)
+
+def _findTargets(module, attributeNames: tuple[str]) -> list[tuple[object, str, str]]:
+    """ (owner, attribute name, report name) of every function that matches attributeNames """
+    targets: list[tuple[object, str, str]] = []
+    for attributeName in attributeNames:
+        ownerName, _, pattern = attributeName.rpartition('.')
+        owner = (getattr(module, ownerName, None) if ownerName else module)
+        if(owner is None):  continue
+        names = ([name for name in vars(owner) if name.startswith(pattern[:-1])] if pattern.endswith('*') else ([pattern] if (pattern in vars(owner)) else []))
+        for name in names:
+            if(callable(vars(owner)[name]) and (not isinstance(vars(owner)[name], (type, staticmethod, classmethod)))): # (plain functions and methods, no classes)
+                targets.append((owner, name, module.__name__.split('.')[-1]+'.'+((ownerName+'.') if ownerName else '')+name))
+    return(targets)
+
+def enable(memory: bool = False, coilModule = None):
+    """ start instrumenting (wrap all the instrumentTargets functions). memory=True also records the peak memory (with tracemalloc, which slows everything down a lot)
+        coilModule is the (already imported) PCBcoilV2 module, in case it's not imported under that name (e.g. when it's run as __main__) """
+    global enabled, memoryTracking, _startedTracemalloc
+    if(enabled):  disable()
+    memoryTracking = memory
+    if(memory and (not tracemalloc.is_tracing())):  tracemalloc.start();  _startedTracemalloc = True
+    for (moduleName, attributeNames) in instrumentTargets:
+        module = (coilModule if ((moduleName == 'PCBcoilV2') and (coilModule is not None)) else None)
+        if(module is None):
+            try:
+                module = __import__(moduleName) # (the exporters import optional libraries, those are skipped if they're not installed)
+            except Exception as excep:
+                print("instrumentation skipping", moduleName, "because it failed to import:", excep);  continue
+        for (owner, attributeName, reportName) in _findTargets(module, attributeNames):
+            original = vars(owner)[attributeName]
+            _originals.append((owner, attributeName, original))
+            setattr(owner, attributeName, _wrap(original, reportName))
+    enabled = True
+
+def disable():
+    """ stop instrumenting (put the original functions back). The recorded stats are kept until reset() """
+    global enabled, memoryTracking, _startedTracemalloc
+    for (owner, attributeName, original) in reversed(_originals):
+        setattr(owner, attributeName, original)
+    _originals.clear()
+    if(_startedTracemalloc):  tracemalloc.stop();  _startedTracemalloc = False
+    enabled = False;  memoryTracking = False
+
+def reset():
+    """ clear the recorded stats """
+    with _statsLock:
+        _stats.clear();  _collapsedStacks.clear()
+
+def getReport() -> dict[str, dict[str, float]]:
+    """ the recorded stats, as a (json-serializable) dict per function: calls, totalTime and selfTime (seconds), meanTime (seconds per call) and peakMemory (bytes, only with memory tracking) """
+    with _statsLock:
+        return({name : {'calls' : stats.calls, 'totalTime' : stats.totalTime, 'selfTime' : stats.selfTime, 'meanTime' : (stats.totalTime / stats.calls),
+                        'peakMemory' : (stats.peakMemory if memoryTracking else None)} for (name, stats) in _stats.items()})
+
+def printReport(sortBy: str = 'totalTime', top: int = 30):
+    """ print a table of the recorded stats (sortBy is one of the getReport() keys) """
+    report = getReport()
+    print("instrumentation report ("+str(len(report))+" functions, sorted by "+sortBy+"):")
+    print('function'.ljust(50), 'calls'.rjust(9), 'total [ms]'.rjust(12), 'self [ms]'.rjust(12), 'mean [us]'.rjust(12), 'peak [MB]'.rjust(10))
+    for name in sorted(report, key=(lambda name : report[name][sortBy] or 0), reverse=True)[:top]:
+        entry = report[name]
+        print(name.ljust(50), str(entry['calls']).rjust(9), str(round(entry['totalTime']*1000, 2)).rjust(12), str(round(entry['selfTime']*1000, 2)).rjust(12), str(round(entry['meanTime']*1e6, 1)).rjust(12),
+              (str(round(entry['peakMemory']/1e6, 2)) if (entry['peakMemory'] is not None) else '-').rjust(10))
+
+def getCollapsedStacks() -> list[str]:
+    """ the self time of every call path, in the 'collapsed stacks' format ('outer;inner;innermost microseconds'), for flamegraph.pl, speedscope, etc. """
+    with _statsLock:
+        return([(stackKey+' '+str(int(round(selfTime*1e6)))) for (stackKey, selfTime) in _collapsedStacks.items()])
+
+def saveCollapsedStacks(filename: str):
+    with open(filename, 'w') as stacksFile:
+        stacksFile.write('\n'.join(getCollapsedStacks()) + '\n')
+
+def _reportAtExit(outputFilename: str = None):
+    printReport()
+    if(outputFilename):  saveCollapsedStacks(outputFilename);  print("saved collapsed stacks to", outputFilename)
+
+def enableFromEnvironment(coilModule = None) -> bool:
+    """ enable() if the environment variable is set (and print a report on exit), returns whether it was enabled """
+    setting = os.environ.get(environmentVariable, '').strip().lower()
+    if(setting in ('', '0', 'false', 'no')):  return(False)
+    if(not enabled):
+        enable(memory=(setting == 'memory'), coilModule=coilModule)
+        atexit.register(_reportAtExit, os.environ.get(environmentOutputVariable))
+    return(True)
+
+
+if __name__ == "__main__": # an example of how this file may be used
+    enable(memory=True)
+    from PCBcoilV2 import coilClass, shapes
+    coil = coilClass(turns=9, diam=40, clearance=0.15, traceWidth=0.9, layers=2, PCBthickness=0.6, copperThickness=0.030, shape=shapes['circle'], formula='cur_sheet')
+    coil.calcInductance();  coil.calcTotalResistance();  coil.renderAsCoordinateList();  coil.renderAsPolygon()
+    import tempfile
+    originalDir = os.getcwd()
+    with tempfile.TemporaryDirectory() as tempDir:
+        os.chdir(tempDir) # (the exporters save their files in the current folder)
+        coil.saveDXF();  coil.to_excel();  coil.imwrite(20.0)
+        os.chdir(originalDir)
+    printReport()
+    print('\n'.join(getCollapsedStacks()[:10]))
+    disable()
@@ -0,0 +1,108 @@
+"""
+this file solves the inverse problem: instead of calculating the inductance of a coil, calculate what (one) coil parameter is needed to hit a target inductance
+e.g. "what diameter gives 10uH with 0.2mm clearance, 0.5mm traceWidth and 9 turns?"
+all the other parameters are fixed, and everything (targets and fixed parameters) can be (broadcastable) numpy arrays, to solve thousands of questions at once.
+
+it works in 2 steps (both vectorized over all the questions at once):
+- scan the bracket (range of allowed values) at a few points to find where the inductance crosses the target (the first crossing is used)
+- bracketed root-finding (the Illinois variant of regula falsi) within that crossing, on log(L/target), using the same closed-form formulas as PCBcoilV_ (through calcCoilBatch())
+turns are solved as a fractional number first, and then rounded to whichever neighbouring integer gets closest to the target (and still fits inside the diameter)
+"""
+
+import numpy as np
+
+from PCBcoilV2 import calcCoilBatch, shapes, ozCopperToMM, _shapeBaseClass
+
+defaultBrackets: dict[str, tuple[float,float]] = {'diam' : (1.0, 500.0), # (mm)
+                                                  'traceWidth' : (0.01, 10.0), # (mm)
+                                                  'clearance' : (0.01, 10.0), # (mm)
+                                                  'turns' : (1.0, 200.0)} # (fractional turns)
+
+defaultChunkSize: int = 2**14 # number of questions solved at once (the scan step uses (chunkSize * scanPoints) evaluations at once)
+
+def _calcLogRatio(paramValues: dict[str,np.ndarray], targetInductance: np.ndarray, shape: _shapeBaseClass, formula: str, surrogate: 'surrogateClass' = None) -> np.ndarray:
+    """ log(L/target), which is 0 at the target. NaN for impossible coils (negative inner diameter, etc.) """
+    results = calcCoilBatch(**paramValues, shape=shape, formula=formula, surrogate=surrogate)
+    with np.errstate(divide='ignore', invalid='ignore'):
+        return(np.where((results['trueInnerDiam'] > 0.0) & (results['inductance'] > 0.0), np.log(results['inductance'] / targetInductance), np.nan))
+
+def solveInverse(targetInductance: float|np.ndarray, solveFor: str = 'diam', turns: int|np.ndarray = None, diam: float|np.ndarray = None, clearance: float|np.ndarray = None, traceWidth: float|np.ndarray = None,
+                 layers: int|np.ndarray = 1, PCBthickness: float|np.ndarray = 1.6, copperThickness: float|np.ndarray = ozCopperToMM(1.0), shape: _shapeBaseClass = shapes['circle'], formula: str = 'cur_sheet',
+                 bracket: tuple[float,float] = None, scanPoints: int = 64, tolerance: float = 1e-9, maxIterations: int = 60, chunkSize: int = defaultChunkSize,
+                 useSurrogate: bool = False) -> dict[str, np.ndarray]:
+    """ solve for one parameter (solveFor: 'diam', 'traceWidth', 'clearance' or 'turns') to hit targetInductance (in Henry), with all other parameters fixed.
+        (the parameter that is solved for should be left as None)
+        if useSurrogate, the scan and root-finding use the (interpolated) lookup table from surrogateModel.py, and the final 'inductance' is calculated exactly
+         (useful for slow formulas like 'greenhouse', the solution is then only as accurate as the table)
+        returns a dict of arrays (with the broadcasted shape of all inputs):
+            solveFor: the solved parameter (NaN where no solution was found within the bracket, turns are rounded to integers (-1 where unsolved))
+            'inductance': the inductance that the solved parameter actually gives (especially relevant for the rounded turns)
+            'solved': boolean array, whether a solution was found """
+    if(solveFor not in defaultBrackets):  print("solveInverse() can't solve for:", solveFor, " options are:", list(defaultBrackets.keys()));  return({})
+    params: dict[str,np.ndarray] = {'turns' : turns, 'diam' : diam, 'clearance' : clearance, 'traceWidth' : traceWidth, 'layers' : layers, 'PCBthickness' : PCBthickness, 'copperThickness' : copperThickness}
+    if(params[solveFor] is not None):  print("solveInverse() ignoring the provided value for", solveFor, "(that's the one being solved for)")
+    params[solveFor] = 0.0 # placeholder (just for the broadcasting below)
+    if(any([(params[key] is None) for key in params])):  print("solveInverse() needs a value for all parameters except", solveFor, ", got:", params);  return({})
+    bracket = (defaultBrackets[solveFor] if (bracket is None) else bracket)
+    surrogate = None
+    if(useSurrogate):
+        import surrogateModel # (only imported when needed)
+        surrogate = surrogateModel.getSurrogate(shape, formula)
+    broadcasted = np.broadcast_arrays(np.asarray(targetInductance, dtype=float), *[np.asarray(params[key]) for key in params])
+    outputShape = broadcasted[0].shape
+    targets = broadcasted[0].ravel()
+    params = {key : values.ravel() for (key, values) in zip(params, broadcasted[1:])}
+    solution = np.full(len(targets), np.nan)
+    for chunkStart in range(0, len(targets), chunkSize):
+        chunkSlice = slice(chunkStart, min(chunkStart+chunkSize, len(targets)))
+        chunkParams = {key : params[key][chunkSlice] for key in params}
+        chunkTargets = targets[chunkSlice]
+        ## scan the bracket (geometrically spaced, as the parameters are all positive and span a few orders of magnitude)
+        scanValues = np.geomspace(bracket[0], bracket[1], scanPoints)
+        scanParams = {key : chunkParams[key][:,None] for key in chunkParams} # (questions, scanPoints) through broadcasting
+        scanParams[solveFor] = scanValues[None,:]
+        scanRatios = _calcLogRatio(scanParams, chunkTargets[:,None], shape, formula, surrogate)
+        with np.errstate(invalid='ignore'):
+            crossings = (np.sign(scanRatios[:,:-1]) * np.sign(scanRatios[:,1:])) <= 0.0 # (NaN compares as False)
+        hasCrossing = np.any(crossings, axis=1)
+        firstCrossing = np.argmax(crossings, axis=1)
+        rows = np.arange(len(chunkTargets))
+        lower = scanValues[firstCrossing];  upper = scanValues[firstCrossing+1]
+        lowerRatio = scanRatios[rows, firstCrossing];  upperRatio = scanRatios[rows, firstCrossing+1]
+        ## Illinois (modified regula falsi) iterations, for all questions at once:
+        current = lower.copy()
+        for iteration in range(maxIterations):
+            with np.errstate(divide='ignore', invalid='ignore'):
+                current = np.where(upperRatio != lowerRatio, upper - (upperRatio * (upper - lower) / (upperRatio - lowerRatio)), lower)
+            chunkParams[solveFor] = current
+            currentRatio = _calcLogRatio(chunkParams, chunkTargets, shape, formula, surrogate)
+            sameSide = (np.sign(currentRatio) == np.sign(upperRatio))
+            lower = np.where(sameSide, lower, upper);  lowerRatio = np.where(sameSide, lowerRatio*0.5, upperRatio) # the halving of lowerRatio is the 'Illinois' part, it prevents one side from getting stuck
+            upper = current;  upperRatio = currentRatio
+            if(np.all((np.abs(currentRatio) < tolerance) | (~hasCrossing) | np.isnan(currentRatio))):  break
+        solution[chunkSlice] = np.where(hasCrossing & (np.abs(currentRatio) < np.sqrt(tolerance)), current, np.nan)
+    ## rounding turns to (feasible) integers:
+    if(solveFor == 'turns'):
+        candidates = np.stack((np.floor(solution), np.ceil(solution)), axis=-1) # (NaN stays NaN)
+        candidates = np.where(candidates < 1, 1, candidates)
+        candidateParams = {key : params[key][:,None] for key in params};  candidateParams['turns'] = np.nan_to_num(candidates, nan=1).astype(int)
+        candidateRatios = np.abs(_calcLogRatio(candidateParams, targets[:,None], shape, formula, surrogate))
+        bestCandidate = np.argmin(np.where(np.isnan(candidateRatios), np.inf, candidateRatios), axis=1)
+        solution = np.where(np.isnan(solution) | np.all(np.isnan(candidateRatios), axis=1), np.nan, candidates[np.arange(len(targets)), bestCandidate])
+    params[solveFor] = np.nan_to_num(solution, nan=(-1 if (solveFor == 'turns') else 0.0))
+    if(solveFor == 'turns'):  params['turns'] = params['turns'].astype(int)
+    achievedInductance = calcCoilBatch(**params, shape=shape, formula=formula)['inductance']
+    solved = ~np.isnan(solution)
+    return({solveFor : (params[solveFor] if (solveFor == 'turns') else solution).reshape(outputShape),
+            'inductance' : np.where(solved, achievedInductance, np.nan).reshape(outputShape),
+            'solved' : solved.reshape(outputShape)})
+
+
+if __name__ == "__main__": # an example of how this file may be used
+    import time
+    solveStartTime = time.time()
+    targets = np.linspace(1e-6, 20e-6, 10000) # 1~20uH
+    result = solveInverse(targets, 'diam', turns=9, clearance=0.2, traceWidth=0.5, layers=2, PCBthickness=0.8)
+    print("solving", len(targets), "diameters took", round(time.time()-solveStartTime, 3), "seconds, solved:", np.count_nonzero(result['solved']))
+    print("diam for 10uH [mm]:", solveInverse(10e-6, 'diam', turns=9, clearance=0.2, traceWidth=0.5, layers=2, PCBthickness=0.8)['diam'])
+    print("turns for 10uH in a 30mm (2-layer) coil:", solveInverse(10e-6, 'turns', diam=30, clearance=0.2, traceWidth=0.5, layers=2, PCBthickness=0.8))
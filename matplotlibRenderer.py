@@ -14,14 +14,16 @@ import numpy as np
 import matplotlib.pyplot as plt
 
 def plot4d(coil: 'coilClass'): # stolen from the World Wide Web (whatever that is)
-    renderedCoils: list[list[tuple[float,float]]] = [coil.renderAsCoordinateList(False), coil.renderAsCoordinateList(True)]
-    renderedCoils[1].reverse() # reverse the second list to make it all 1 continuous & repeating line
+    renderedCoil = coil.render()
+    renderedCoils: list[np.ndarray] = [renderedCoil[0], renderedCoil[1][::-1]] # reverse the second list to make it all 1 continuous & repeating line
     layerspacing = coil.calcLayerSpacing()
     list4D = np.zeros((len(renderedCoils[0])*coil.layers, 4))
     for layer in range(coil.layers):
         renderedCoil = renderedCoils[layer % 2]
-        for i in range(len(renderedCoil)):
-            list4D[i + len(renderedCoil)*layer] = [renderedCoil[i][0],renderedCoil[i][1],layer*layerspacing,(layer+1)/coil.layers]
+        layerSlice = slice(len(renderedCoil)*layer, len(renderedCoil)*(layer+1)) # the whole layer is filled in at once
+        list4D[layerSlice, 0:2] = renderedCoil
+        list4D[layerSlice, 2] = layer*layerspacing
+        list4D[layerSlice, 3] = (layer+1)/coil.layers
     x = list4D[:, 0];  y = list4D[:, 1];  z = list4D[:, 2];  c = list4D[:, 3] # this format is plottable with a 3D scatter plot
 
     fig = plt.figure(figsize=(5, 5))
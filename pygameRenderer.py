@@ -29,17 +29,24 @@ def distAnglePosToPos(funcRadius, funcAngle, funcPos): #returns a new pos given
 
 ASA = lambda scalar, inputArray : [scalar + entry for entry in inputArray]
 
-### some fancy key-binding visuals:
+### some fancy key-binding visuals: (only loaded when the help screen is first shown, as it loads an image)
 fancyKeyBindImageLoaded = False # if the keyboard fails to load, the rest of the code should just run anyway
-try: # the fancy keyboard stuff
-    import fancy.keyboard_fancy as KB_fcy
-    fancyKeyBindImageLoaded = True
-except Exception as excep:
-    print("failed to load fancy keyboard stuff. Exception:", excep)
+_fancyKeyBindImageTried = False
+def loadFancyKeyboard() -> bool:
+    """ import the fancy keyboard stuff (only tries once), returns fancyKeyBindImageLoaded """
+    global KB_fcy, fancyKeyBindImageLoaded, _fancyKeyBindImageTried
+    if(not _fancyKeyBindImageTried):
+        _fancyKeyBindImageTried = True
+        try: # the fancy keyboard stuff
+            import fancy.keyboard_fancy as KB_fcy
+            fancyKeyBindImageLoaded = True
+        except Exception as excep:
+            print("failed to load fancy keyboard stuff. Exception:", excep)
+    return(fancyKeyBindImageLoaded)
 
 def generateFancyKeyBindingImage(maxRes: tuple[int,int], silent:bool=False) -> pygame.Surface:
-    """ produce a legend of all the key bindings. Only call if(fancyKeyBindImageLoaded == True) """
-    if(not fancyKeyBindImageLoaded):  print("can't generateFancyKeyBindingImage(), because fancyKeyBindImageLoaded == False");  return(None)
+    """ produce a legend of all the key bindings. Only call if(loadFancyKeyboard() == True) """
+    if(not loadFancyKeyboard()):  print("can't generateFancyKeyBindingImage(), because fancyKeyBindImageLoaded == False");  return(None)
     ## some sub-functions:
     def drawRectAlpha(surfaceToDrawOn:pygame.Surface, colorWithAlpha:pygame.Color|tuple[int,int,int,int], rect:pygame.Rect):
         rect_surf = pygame.Surface(rect.size, pygame.SRCALPHA) # drawing with alpha requires a little more effort
@@ -177,6 +184,7 @@ class pygameDrawer():
         self.maxSizeScale = 2000.0 # a reasonable limit to how much you can zoom in
         # self.maxSizeScaleWithCar = 500.0 # zooming in too much makes drawing (the car) really slow (because it has to render the car image at such a high resolution)
         self.centerZooming = False # whether zooming (using the scroll wheel) uses the center of the screen (or the mouse position)
+        self.fillCoilPolygons = False # draw the coils as filled outlines (see coilClass.renderAsPolygon()) instead of thick lines. More accurate corners, but pygame's polygon filling is (2~10x) slower than drawing the lines
 
         # [255,255,0] #yellow
         # [0,50,255] #dark blue
@@ -229,8 +237,7 @@ class pygameDrawer():
             print("couldn't set viewOffset and sizeScale to show the thing:", theExcept)
 
         self.showHelpScreen = False # display the keyboard bindings in a fun and visual way
-        if(fancyKeyBindImageLoaded): # only if the keyboard stuff actually loaded correctly
-            self.keyBindImageRendered = generateFancyKeyBindingImage(self.drawSize)
+        self.keyBindImageRendered: pygame.Surface = None # (made when the help screen is first shown, see drawKeyBindLegend())
 
         self.localVar = None # a terrible hack to get python pointers
         self.localVarUpdated = False # a flag for UI interactions to set
@@ -269,6 +276,8 @@ class pygameDrawer():
                                                                                     "resistance [mOhm]: "+str(round(coil.calcTotalResistance() * 1000, 2)),
                                                                                     "inductance [uH]: "+str(round(coil.calcInductance() * 1000000, 3)),
                                                                                     (("inductance 1-layer [uH]: "+str(round(coil.calcInductanceSingleLayer() * 1000000, 3))) if (coil.layers>1) else ""),
+                                                                                    "capacitance [pF]: "+str(round(coil.calcParasiticCapacitance() * 1e12, 2)),
+                                                                                    "SRF [MHz]: "+str(round(coil.calcSelfResonantFrequency() / 1e6, 1)),
                                                                                     "induct/resist [uH/Ohm]: "+str(round(coil.calcInductance() * 1000000 / coil.calcTotalResistance(), 2)),
                                                                                     "induct/radius [uH/mm]: "+str(round(coil.calcInductance() * 1000000 / (coil.diam/2), 2)),
                                                                                     "induct/turns [uH/mm]: "+str(round(coil.calcInductance() * 1000000 / coil.turns, 2)) ] }
@@ -356,6 +365,14 @@ class pygameDrawer():
         else:
             return(np.array([((realPos[0]+self.viewOffset[0])*self.sizeScale)+self.drawOffset[0], ((realPos[1]+self.viewOffset[1])*self.sizeScale)+self.drawOffset[1]]))
     
+    def realToPixelArray(self, realPosArray: np.ndarray):
+        """same as realToPixelPos(), but for a whole (N,2) array of (real) positions at once"""
+        pixelPosArray = (np.asarray(realPosArray, dtype=np.float64) + self.viewOffset) * self.sizeScale
+        if(self.invertYaxis):
+            pixelPosArray[:,1] = self.drawSize[1] - pixelPosArray[:,1] #invert Y-axis for normal (0,0) at bottomleft display
+        pixelPosArray += self.drawOffset
+        return(pixelPosArray)
+    
     #check if things need to be drawn at all    
     def isInsideWindowReal(self, realPos: np.ndarray):
         """whether or not a (real) position is inside the window (note: not computationally efficient)"""
@@ -436,6 +453,9 @@ class pygameDrawer():
             pygame.draw.line(self.windowHandler.window, lineColor, dashStartPos, dashEndPos, int(lineWidth))
     
     def drawKeyBindLegend(self):
+        if(self.showHelpScreen and (self.keyBindImageRendered is None) and loadFancyKeyboard()): # (the first time)
+            self.keyBindImageRendered = generateFancyKeyBindingImage(self.drawSize)
+            if(self.keyBindImageRendered is None):  self.showHelpScreen = False # (it failed, there is nothing to show)
         if((self.keyBindImageRendered is not None) if (fancyKeyBindImageLoaded and self.showHelpScreen) else False): # only if the keyboard stuff actually loaded correctly
             offset_temp = [self.drawSize[0]/2 - self.keyBindImageRendered.get_width()/2, self.drawSize[1]/2 - self.keyBindImageRendered.get_height()/2]
             self.windowHandler.window.blit(self.keyBindImageRendered, offset_temp)
@@ -459,7 +479,7 @@ class pygameDrawer():
         """draw a series of lines (used for rendering coils)"""
         from __main__ import coilClass # bad code!
         coilToDraw: 'coilClass' = self.localVar # if it crashes here, then it's probably time to fix this whole mess (rewrite the rendering class interaction with __main__)
-        if(len(np.array(lineLists).shape) < 3):  lineLists = [lineLists, coilToDraw.renderAsCoordinateList(True)] # NOTE: backwards-compatibility hack for V0 & V1. Terrible, i hate it, it should probably work
+        if((not hasattr(lineLists, 'forward')) and (len(np.array(lineLists).shape) < 3)):  lineLists = [lineLists, coilToDraw.renderAsCoordinateList(True)] # NOTE: backwards-compatibility hack for V0 & V1. Terrible, i hate it, it should probably work (V2 passes a renderedCoilClass, which has .forward)
         if((len(lineLists) < 1) or (len(lineLists) < min(coilToDraw.layers, 2))):   print("can't drawLineList(), not enough lineLists provided");   return
         if(len(lineLists[0]) < 2):   print("can't drawLineList(), lineLists[0] too short!");   return
         
@@ -468,23 +488,31 @@ class pygameDrawer():
         # for i in range(N):
         #     # pygame.draw.line(self.windowHandler.window, [127,127,127], self.realToPixelPos(np.zeros(2)), self.realToPixelPos(distAnglePosToPos(20.0, i*2*np.pi/N, np.zeros(2))), 2)
         #     self._dashedLine([127,127,127], self.realToPixelPos(np.zeros(2)), self.realToPixelPos(distAnglePosToPos(L, i*2*np.pi/N, np.zeros(2))), 2, L*self.sizeScale/20, 0.5) # dashed line (looks bad, adds nothing here)
-        isCircular = (True if isinstance(coilToDraw.shape.stepsPerTurn, float) else False) # only smooth corners for squares
-        lineWidthPixels = int(coilToDraw.traceWidth * self.sizeScale)
-        layerAdjust: Callable[[tuple[float,float],int], tuple[float,float]] = lambda pos, currentLayer : (pos[0] + coilToDraw.diam*currentLayer, pos[1]) # offset the positions of the different layers to make them visible
-        if((coilToDraw.layers%2)!=0): # only in case of an un-even number of layers
-            pygame.draw.line(self.windowHandler.window, self.layerColors[coilToDraw.layers % len(self.layerColors)], self.realToPixelPos((lineLists[0][-1][0], lineLists[0][0][1])), self.realToPixelPos(lineLists[0][-1]), lineWidthPixels) # draw return trace first
-        for layerItt in range(coilToDraw.layers):
-            currentLayer = coilToDraw.layers-1-layerItt;  currentLayerColor = self.layerColors[currentLayer % len(self.layerColors)] # draw layers back to front
-            lineList = lineLists[currentLayer % 2] # one list is CW and the other is CCW. (NOTE: this replaces the mirroring of layerAdjust in previous versions)
-            for i in range(len(lineList)-1):
-                # if(i > int((pygame.mouse.get_pos()[0] / self.drawSize[0]) * len(lineList))):  break   # drawing debug
-                # if(isCircular): # the arc drawing code works, but doesn't look that much better (pygame kinda sucks). ALSO, it runs slow as hell
-                #     self._shortArc(currentLayerColor, layerAdjust(lineList[i], currentLayer), layerAdjust(lineList[i+1], currentLayer), np.zeros(2), coilToDraw.traceWidth)
-                # else: # squares and other (regular) polygons
-                startPos = self.realToPixelPos(layerAdjust(lineList[i], currentLayer));   endPos = self.realToPixelPos(layerAdjust(lineList[i+1], currentLayer))
-                pygame.draw.line(self.windowHandler.window, currentLayerColor, startPos, endPos, lineWidthPixels)
-                if(not isCircular):
-                    pygame.draw.ellipse(self.windowHandler.window, currentLayerColor, [ASA(-((lineWidthPixels-2)/2), endPos), [lineWidthPixels, lineWidthPixels]]) # draw a little circle in the corners for a smoother look
+        if(self.fillCoilPolygons and hasattr(lineLists, 'asPolygons')): # (V2 onwards) fill the copper outline of every layer, instead of drawing (thousands of) thick lines
+            polygons = lineLists.asPolygons(coilToDraw.traceWidth, coilToDraw.layers)
+            if((coilToDraw.layers%2)!=0): # only in case of an un-even number of layers
+                pygame.draw.polygon(self.windowHandler.window, self.layerColors[coilToDraw.layers % len(self.layerColors)], self.realToPixelArray(polygons[-1]).tolist()) # draw return trace first
+            for layerItt in range(coilToDraw.layers):
+                currentLayer = coilToDraw.layers-1-layerItt # draw layers back to front
+                pygame.draw.polygon(self.windowHandler.window, self.layerColors[currentLayer % len(self.layerColors)], self.realToPixelArray(polygons[currentLayer] + (coilToDraw.diam*currentLayer, 0.0)).tolist()) # (offset the layers to make them visible)
+        else: # draw every line separately (also the only option for V0 & V1)
+            isCircular = (True if isinstance(coilToDraw.shape.stepsPerTurn, float) else False) # only smooth corners for squares
+            lineWidthPixels = int(coilToDraw.traceWidth * self.sizeScale)
+            if((coilToDraw.layers%2)!=0): # only in case of an un-even number of layers
+                pygame.draw.line(self.windowHandler.window, self.layerColors[coilToDraw.layers % len(self.layerColors)], self.realToPixelPos((lineLists[0][-1][0], lineLists[0][0][1])), self.realToPixelPos(lineLists[0][-1]), lineWidthPixels) # draw return trace first
+            for layerItt in range(coilToDraw.layers):
+                currentLayer = coilToDraw.layers-1-layerItt;  currentLayerColor = self.layerColors[currentLayer % len(self.layerColors)] # draw layers back to front
+                lineList = lineLists[currentLayer % 2] # one list is CW and the other is CCW
+                pixelLineArray = self.realToPixelArray(np.asarray(lineList) + (coilToDraw.diam*currentLayer, 0.0)) # offset the positions of the different layers to make them visible (for the whole layer at once)
+                for i in range(len(lineList)-1):
+                    # if(i > int((pygame.mouse.get_pos()[0] / self.drawSize[0]) * len(lineList))):  break   # drawing debug
+                    # if(isCircular): # the arc drawing code works, but doesn't look that much better (pygame kinda sucks). ALSO, it runs slow as hell
+                    #     self._shortArc(currentLayerColor, (lineList[i][0] + coilToDraw.diam*currentLayer, lineList[i][1]), (lineList[i+1][0] + coilToDraw.diam*currentLayer, lineList[i+1][1]), np.zeros(2), coilToDraw.traceWidth)
+                    # else: # squares and other (regular) polygons
+                    startPos = pixelLineArray[i];   endPos = pixelLineArray[i+1]
+                    pygame.draw.line(self.windowHandler.window, currentLayerColor, startPos, endPos, lineWidthPixels)
+                    if(not isCircular):
+                        pygame.draw.ellipse(self.windowHandler.window, currentLayerColor, [ASA(-((lineWidthPixels-2)/2), endPos), [lineWidthPixels, lineWidthPixels]]) # draw a little circle in the corners for a smoother look
         
         ## deleteme also:
         diamDebugColor = [127,127,127]
@@ -530,7 +558,7 @@ class pygameDrawer():
             self.sizeScale = min(drawSize[0]/self.drawSize[0], drawSize[1]/self.drawSize[1]) * self.sizeScale #auto update sizeScale to match previous size
         self.drawSize = (int(drawSize[0]), int(drawSize[1]))
         self.drawOffset = (int(drawOffset[0]), int(drawOffset[1]))
-        if(fancyKeyBindImageLoaded): # only if the keyboard stuff actually loaded correctly
+        if(self.keyBindImageRendered is not None): # only if it was already made (otherwise it's made when the help screen is first shown)
             self.keyBindImageRendered = generateFancyKeyBindingImage(self.drawSize, True) # update keyboard layout (silently)
         print("updateWindowSize:", self.drawSize, self.drawOffset, self.sizeScale, autoMatchSizeScale)
 
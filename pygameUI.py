@@ -51,6 +51,8 @@ flagCurs16Data = ((16,16),(0,15)) + pygame.cursors.compile(flagCurs16, 'X', '.',
 flagCursorSet = False
 deleteCursorSet = False
 
+UIskippedFormulas: tuple[str] = ('greenhouse',) # formulas that the formula key doesn't cycle through ('greenhouse' takes seconds per coil, which would freeze the UI on every keypress)
+
 ## key bindings array
 keyBindings: dict[str, int|tuple[int]] = { \
     "showKeyBind_toggle" : pygame.K_h,
@@ -223,15 +225,15 @@ def handleKeyPress(pygameDrawerInput: rend.pygameDrawer, keyDown: bool, key: int
                     pygameDrawerInput.localVar.shape = shapes[list(shapes.keys())[nextKeyIndex]] # awful
                     ## not all shapes have all formulas enabled (e.g. circularSpiral doesn't have 'monomial' formula):
                     if(pygameDrawerInput.localVar.formula not in pygameDrawerInput.localVar.shape.formulaCoefficients): # if the formula (str) is not available (not a key in coeff. dict)
-                        pygameDrawerInput.localVar.formula = list(pygameDrawerInput.localVar.shape.formulaCoefficients.keys())[0] # set it to the first formula (key str) that is available
+                        pygameDrawerInput.localVar.formula = [formula for formula in pygameDrawerInput.localVar.shape.formulaCoefficients.keys() if (formula not in UIskippedFormulas)][0] # set it to the first formula (key str) that is available
                 except Exception as excep:
                     print("fialed to increment shape from pygameUI:", excep)
             
             ## changing the formula used to calculate the inductance of the coil
             elif(key in keyBindings["paramFormula_change"]): # o or p
                 try:
-                    temp = list(pygameDrawerInput.localVar.shape.formulaCoefficients.keys()) # get a list of possible formulas (key str) for the current shape
-                    nextKeyIndex = temp.index(pygameDrawerInput.localVar.formula) # worse
+                    temp = [formula for formula in pygameDrawerInput.localVar.shape.formulaCoefficients.keys() if (formula not in UIskippedFormulas)] # get a list of possible formulas (key str) for the current shape
+                    nextKeyIndex = (temp.index(pygameDrawerInput.localVar.formula) if (pygameDrawerInput.localVar.formula in temp) else -1) # worse (-1 if the current formula is a skipped one, so it goes to the first one)
                     nextKeyIndex += (1 if (key==keyBindings["paramFormula_change"][1]) else -1) # increment/decrement
                     if(nextKeyIndex >= len(temp)):  nextKeyIndex = 0 # positive rollover
                     elif(nextKeyIndex < 0):           nextKeyIndex = len(temp)-1 # negative rollover
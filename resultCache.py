@@ -0,0 +1,255 @@
+"""
+this file is a persistent (on-disk, SQLite) cache of the calculated results of coils, sothat the same designs don't have to be calculated again in every session:
+    cache = resultCacheClass('coilResults.sqlite')         (or openFromEnvironment(), which uses PCBCOIL_CACHE=1 (the default file) or PCBCOIL_CACHE=filename)
+    results = cache.calcCoilBatch(turns, diam, ...)        (a drop-in replacement for PCBcoilV2.calcCoilBatch(), only the designs that are not in the cache are calculated)
+    sweepEngine.sweep(..., cache=cache)                    (the same, for every chunk of a sweep)
+    cache.fillCoilCache(coil)                              (fill the (in-memory) results of a coilClass from the cache, used by the UI and 'coilCLI.py eval --cache')
+    cache.getGeometry(coil, 'polygons', chordTolerance)    (the rendered geometry ('centerline', 'polygons' or 'arcs'), stored as blobs)
+
+the key of a design is a hash of its parameters (rounded to 1e-9 mm, sothat 0.1+0.2 and 0.3 are the same design), the shape, formula and multilayerFormula,
+ and the coefficients that are in use (the coefficientSetVersion and the actual values, see PCBcoilV2.loadCoefficientSet()), sothat a different coefficient set never gets old results.
+ (the hash is 64 bits, calculated with numpy for a whole batch at once. The parameters are stored too, sothat a hash collision is just a cache miss)
+(generateCoilFilename() can't be used as the key, it's rounded to whole micrometers and includes the results)
+the file is limited to maxSize bytes, the least-recently-used results/geometry are removed when it gets bigger than that.
+the database is in WAL mode, sothat multiple processes (e.g. the UI and a sweep) can read while one of them writes.
+
+NOTE: looking up a design takes ~3us (and storing one ~5us), which is slower than calculating one with the closed-form formulas (~0.4us, in a batch),
+ so the cache only really helps for 'greenhouse' (numerical, ~0.1s per design), the surrogate model, single coils (see fillCoilCache()) and geometry
+"""
+
+import os
+import io
+import json
+import time
+import math
+import sqlite3
+import hashlib
+import threading
+import numpy as np
+
+import PCBcoilV2
+
+defaultCacheFile: str = os.path.join(os.path.dirname(os.path.abspath(__file__)), 'coilResultCache.sqlite')
+defaultMaxSize: int = 256 * 1024**2 # (bytes) ~1.5 million designs
+environmentVariable: str = 'PCBCOIL_CACHE' # '1' for the default file, or a filename
+cacheFormatVersion: int = 1 # (part of every key, increment this when the stored data changes)
+lruResolution: float = 60.0 # (seconds) the last-used time of a result is only updated if it's older than this (sothat repeated lookups don't need to write)
+evictionTarget: float = 0.9 # when the file is too big, remove the oldest entries until it's this fraction of maxSize
+
+cachedParameterNames: tuple[str] = ('turns', 'diam', 'clearance', 'traceWidth', 'layers', 'PCBthickness', 'copperThickness') # (the calcCoilBatch() arguments)
+cachedResultNames: tuple[str] = ('simpleInnerDiam', 'trueInnerDiam', 'trueDiam', 'layerSpacing', 'traceLength', 'resistance', 'inductanceSingleLayer', 'inductance', 'capacitance', 'SRF') # (the calcCoilBatch() results)
+coilMethodNames: dict[str, str] = {'simpleInnerDiam' : 'calcSimpleInnerDiam', 'trueInnerDiam' : 'calcTrueInnerDiam', 'trueDiam' : 'calcTrueDiam', 'layerSpacing' : 'calcLayerSpacing',
+                                   'traceLength' : 'calcCoilTraceLength', 'resistance' : 'calcTotalResistance', 'inductanceSingleLayer' : 'calcInductanceSingleLayer', 'inductance' : 'calcInductance',
+                                   'capacitance' : 'calcParasiticCapacitance', 'SRF' : 'calcSelfResonantFrequency'} # the coilClass method of every result (see fillCoilCache())
+geometryKinds: tuple[str] = ('centerline', 'polygons', 'arcs') # (see getGeometry())
+
+def _mix64(x: np.ndarray) -> np.ndarray:
+    """ the splitmix64 finalizer (a good 64-bit integer hash) on a uint64 array (the multiplications are supposed to overflow) """
+    x = (x ^ (x >> np.uint64(30))) * np.uint64(0xbf58476d1ce4e5b9)
+    x = (x ^ (x >> np.uint64(27))) * np.uint64(0x94d049bb133111eb)
+    return(x ^ (x >> np.uint64(31)))
+
+def canonicalParameters(*paramValues) -> np.ndarray:
+    """ the (broadcast) parameters as one (N, len(paramValues)) float64 array, rounded to 1e-9 (sothat tiny float differences don't make a different design) """
+    columns = np.broadcast_arrays(*[np.asarray(value, dtype=np.float64) for value in paramValues])
+    return(np.round(np.stack([column.ravel() for column in columns], axis=1), 9) + 0.0) # (+0.0 turns -0.0 into 0.0)
+
+def calcDesignKeys(groupKey: int, canonicalParams: np.ndarray) -> np.ndarray:
+    """ the (signed, for SQLite) 64-bit key of every row of canonicalParameters() """
+    keys = np.full(len(canonicalParams), np.int64(groupKey).view(np.uint64), dtype=np.uint64)
+    bits = np.ascontiguousarray(canonicalParams).view(np.uint64)
+    for column in range(bits.shape[1]):
+        keys = _mix64(keys ^ bits[:, column])
+    return(keys.view(np.int64))
+
+class resultCacheClass:
+    """ a (SQLite) cache of calcCoilBatch() results and rendered geometry, see the top of this file """
+    def __init__(self, filename: str = None, maxSize: int = defaultMaxSize, coilModule = None):
+        """ coilModule is the (already imported) PCBcoilV2 module, in case it's not imported under that name (e.g. when it's run as __main__), its coefficients and functions are used """
+        self.filename = (defaultCacheFile if (filename is None) else filename)
+        self.maxSize = maxSize
+        self.coilModule = (PCBcoilV2 if (coilModule is None) else coilModule)
+        self.hits: int = 0 # (designs found in the cache)
+        self.misses: int = 0 # (designs that had to be calculated)
+        self._lock = threading.Lock() # (one connection, so one thing at a time)
+        self._connection = sqlite3.connect(self.filename, timeout=30.0, check_same_thread=False) # (the timeout is how long to wait for another process that's writing)
+        self._connection.execute("PRAGMA journal_mode=WAL") # readers don't block the writer, and the writer doesn't block the readers
+        self._connection.execute("PRAGMA synchronous=NORMAL") # (safe with WAL, worst case the last few results are lost in a power outage)
+        self._connection.execute("PRAGMA cache_size=-65536") # (64MB, instead of 2MB, makes storing big batches a lot faster)
+        with self._connection:
+            self._connection.execute("CREATE TABLE IF NOT EXISTS results (key INTEGER PRIMARY KEY, groupKey INTEGER NOT NULL, data BLOB NOT NULL, lastUsed REAL NOT NULL)") # data: the parameters and results (float64)
+            self._connection.execute("CREATE INDEX IF NOT EXISTS resultsLastUsed ON results (lastUsed)")
+            self._connection.execute("CREATE TABLE IF NOT EXISTS geometry (key TEXT PRIMARY KEY, data BLOB NOT NULL, lastUsed REAL NOT NULL)") # data: (np.savez) arrays
+            self._connection.execute("CREATE INDEX IF NOT EXISTS geometryLastUsed ON geometry (lastUsed)")
+
+    def close(self):
+        with self._lock:
+            self._connection.close()
+    def __enter__(self):
+        return(self)
+    def __exit__(self, *args):
+        self.close()
+
+    def calcGroupKey(self, shape: 'PCBcoilV2._shapeBaseClass', formula: str, multilayerFormula: str = 'linear_coupling', surrogate: 'surrogateModel.surrogateClass' = None) -> int:
+        """ a (signed) 64-bit hash of everything (other than the parameters) that the results depend on """
+        description = repr((cacheFormatVersion, shape.__class__.__name__, formula, multilayerFormula, tuple(shape.formulaCoefficients.get(formula, ())), self.coilModule.coefficientSetVersion,
+                            tuple(self.coilModule.couplingConstant_D), self.coilModule.RhoCopper, self.coilModule.PCBrelativePermittivity, (repr(surrogate) if (surrogate is not None) else None)))
+        return(int.from_bytes(hashlib.sha1(description.encode()).digest()[0:8], 'little', signed=True))
+
+    ## results:
+    def _lookup(self, groupKey: int, canonicalParams: np.ndarray) -> tuple[np.ndarray, np.ndarray]:
+        """ (found (bool array), results (N, len(cachedResultNames)) array (NaN where not found)) """
+        keys = calcDesignKeys(groupKey, canonicalParams)
+        results = np.full((len(keys), len(cachedResultNames)), np.nan)
+        found = np.zeros(len(keys), dtype=bool)
+        with self._lock:
+            rows = self._connection.execute("SELECT key, data, lastUsed FROM results WHERE groupKey = ? AND key IN (SELECT value FROM json_each(?)) ORDER BY key", (groupKey, json.dumps(keys.tolist()))).fetchall()
+            if(len(rows) == 0):  return(found, results)
+            storedKeys = np.array([row[0] for row in rows], dtype=np.int64) # (sorted)
+            lastUsed = np.array([row[2] for row in rows])
+            now = time.time()
+            if(np.any(lastUsed < (now - lruResolution))): # mark them as used, for the LRU eviction (only the ones that were not used recently, sothat a warm lookup doesn't have to write much)
+                with self._connection:
+                    self._connection.execute("UPDATE results SET lastUsed = ? WHERE key IN (SELECT value FROM json_each(?))", (now, json.dumps(storedKeys[lastUsed < (now - lruResolution)].tolist())))
+        storedData = np.frombuffer(b''.join([row[1] for row in rows]), dtype=np.float64).reshape((len(rows), -1))
+        rowIndices = np.minimum(np.searchsorted(storedKeys, keys), len(storedKeys)-1)
+        found = (storedKeys[rowIndices] == keys) & np.all(storedData[rowIndices, 0:canonicalParams.shape[1]] == canonicalParams, axis=1) # (a hash collision has different parameters)
+        results[found] = storedData[rowIndices[found], canonicalParams.shape[1]:]
+        return(found, results)
+
+    def _store(self, groupKey: int, canonicalParams: np.ndarray, results: np.ndarray):
+        if(len(canonicalParams) == 0):  return
+        keys = calcDesignKeys(groupKey, canonicalParams)
+        order = np.argsort(keys) # (inserting in key order is a lot faster than random order)
+        keys = keys[order].tolist()
+        data = np.ascontiguousarray(np.concatenate((canonicalParams, results), axis=1)[order])
+        now = time.time()
+        with self._lock:
+            with self._connection:
+                self._connection.executemany("INSERT OR REPLACE INTO results VALUES (?, ?, ?, ?)", [(keys[i], groupKey, data[i].tobytes(), now) for i in range(len(keys))])
+            self._evictIfNeeded()
+
+    def calcCoilBatch(self, turns: int|np.ndarray, diam: float|np.ndarray, clearance: float|np.ndarray, traceWidth: float|np.ndarray, layers: int|np.ndarray = 1, PCBthickness: float|np.ndarray = 1.6,
+                      copperThickness: float|np.ndarray = PCBcoilV2.ozCopperToMM(1.0), shape: 'PCBcoilV2._shapeBaseClass' = PCBcoilV2.shapes['circle'], formula: str = 'cur_sheet',
+                      layerStack: 'PCBcoilV2.layerStackClass' = None, multilayerFormula: str = 'linear_coupling', relativePermittivity: float = PCBcoilV2.PCBrelativePermittivity,
+                      frequencies: float|np.ndarray = None, surrogate: 'surrogateModel.surrogateClass' = None) -> dict[str, np.ndarray]:
+        """ the same as PCBcoilV2.calcCoilBatch(), but the designs that are in the cache are not calculated again (and the new ones are stored)
+            (layer stacks, frequencies and a non-default relativePermittivity are not cached, those are just passed on to calcCoilBatch()) """
+        if((layerStack is not None) or (frequencies is not None) or (relativePermittivity != self.coilModule.PCBrelativePermittivity)):
+            return(self.coilModule.calcCoilBatch(turns, diam, clearance, traceWidth, layers, PCBthickness, copperThickness, shape, formula, layerStack, multilayerFormula, relativePermittivity, frequencies, surrogate))
+        batchShape = np.broadcast_shapes(*[np.shape(value) for value in (turns, diam, clearance, traceWidth, layers, PCBthickness, copperThickness)])
+        canonicalParams = canonicalParameters(turns, diam, clearance, traceWidth, layers, PCBthickness, copperThickness)
+        groupKey = self.calcGroupKey(shape, formula, multilayerFormula, surrogate)
+        found, results = self._lookup(groupKey, canonicalParams)
+        missing = np.flatnonzero(~found)
+        self.hits += len(found) - len(missing);  self.misses += len(missing)
+        if(len(missing) > 0):
+            paramColumns = [np.broadcast_to(value, batchShape).ravel()[missing] for value in (turns, diam, clearance, traceWidth, layers, PCBthickness, copperThickness)] # (the original values, not the rounded ones)
+            calculated = self.coilModule.calcCoilBatch(*paramColumns, shape=shape, formula=formula, multilayerFormula=multilayerFormula, surrogate=surrogate)
+            results[missing] = np.stack([np.broadcast_to(calculated[name], len(missing)) for name in cachedResultNames], axis=1)
+            self._store(groupKey, canonicalParams[missing], results[missing])
+        return({name : results[:, i].reshape(batchShape) for (i, name) in enumerate(cachedResultNames)})
+
+    def fillCoilCache(self, coil: 'PCBcoilV2.coilClass') -> bool:
+        """ put the cached results of a coil in its (in-memory) results, sothat coil.calcInductance() etc. don't have to calculate them (they're calculated and stored if they're not in the cache)
+            returns True if the results were in the cache (coils with a layerStack are not cached, this just returns False for those) """
+        if(coil.layerStack is not None):  return(False)
+        hitsBefore = self.hits
+        results = self.calcCoilBatch(*[np.array([getattr(coil, name)]) for name in cachedParameterNames], shape=coil.shape, formula=coil.formula, multilayerFormula=coil.multilayerFormula)
+        self.coilModule._validCoilCache(coil).update({coilMethodNames[name] : float(results[name][0]) for name in cachedResultNames}) # (the results belong to the current coefficient set)
+        return(self.hits > hitsBefore)
+
+    ## geometry:
+    def _geometryKey(self, coil: 'PCBcoilV2.coilClass', kind: str, chordTolerance: float) -> str:
+        """ the geometry only depends on the shape and size of the coil (not on the formulas) """
+        description = repr((cacheFormatVersion, kind, coil.shape.__class__.__name__, canonicalParameters(coil.turns, coil.diam, coil.clearance, coil.traceWidth).tolist(),
+                            (coil.layers if (kind == 'polygons') else None), bool(coil.CCW), chordTolerance))
+        return(hashlib.sha1(description.encode()).hexdigest())
+
+    def getGeometry(self, coil: 'PCBcoilV2.coilClass', kind: str = 'centerline', chordTolerance: float = None) -> np.ndarray|list[np.ndarray]:
+        """ the rendered coil, from the cache if possible (otherwise it's rendered and stored):
+            'centerline' is coil.renderAsArray(), 'polygons' is coil.renderAsPolygon() (a list) and 'arcs' is coil.renderAsArcs() (chordTolerance is passed on to those) """
+        if(kind not in geometryKinds):  print("getGeometry() unknown kind:", kind, " options are:", geometryKinds);  return(None)
+        key = self._geometryKey(coil, kind, chordTolerance)
+        with self._lock:
+            row = self._connection.execute("SELECT data, lastUsed FROM geometry WHERE key = ?", (key,)).fetchone()
+            if((row is not None) and (row[1] < (time.time() - lruResolution))):
+                with self._connection:
+                    self._connection.execute("UPDATE geometry SET lastUsed = ? WHERE key = ?", (time.time(), key))
+        if(row is not None):
+            self.hits += 1
+            with np.load(io.BytesIO(row[0]), allow_pickle=False) as arrays:
+                geometry = [arrays['arr_'+str(i)] for i in range(len(arrays.files))]
+            return(geometry if (kind == 'polygons') else geometry[0])
+        self.misses += 1
+        if(kind == 'centerline'):  geometry = coil.renderAsArray(False, None, chordTolerance)
+        elif(kind == 'polygons'):  geometry = coil.renderAsPolygon(None, chordTolerance)
+        else:                      geometry = coil.renderAsArcs(False, (chordTolerance if (chordTolerance is not None) else self.coilModule.chordToleranceDefault))
+        buffer = io.BytesIO()
+        np.savez(buffer, *(geometry if (kind == 'polygons') else [geometry]))
+        with self._lock:
+            with self._connection:
+                self._connection.execute("INSERT OR REPLACE INTO geometry VALUES (?, ?, ?)", (key, buffer.getvalue(), time.time()))
+            self._evictIfNeeded()
+        return(geometry)
+
+    def render(self, coil: 'PCBcoilV2.coilClass', chordTolerance: float = None) -> 'PCBcoilV2.renderedCoilClass':
+        """ (macro) the same as coil.render(), but the centerline comes from the cache (see getGeometry()) """
+        return(self.coilModule.renderedCoilClass(self.getGeometry(coil, 'centerline', chordTolerance), coil.shape.reverseDirectionMatrix()))
+
+    ## size management:
+    def size(self) -> int:
+        """ (bytes) the space used by the cache (not counting the free pages of the file, which are reused) """
+        with self._lock:
+            return(self._size())
+    def _size(self) -> int:
+        pageCount, freePages, pageSize = [self._connection.execute("PRAGMA "+name).fetchone()[0] for name in ('page_count', 'freelist_count', 'page_size')]
+        return((pageCount - freePages) * pageSize)
+
+    def _evictIfNeeded(self) -> int:
+        """ remove the least-recently-used results/geometry until the cache is smaller than maxSize (*evictionTarget), returns the number of removed entries """
+        removed = 0
+        usedSize = self._size()
+        if(usedSize <= self.maxSize):  return(removed)
+        while(usedSize > (self.maxSize * evictionTarget)): # (the pages don't empty out exactly as fast as the rows are removed, so this may take a few rounds)
+            removeFraction = max(1.0 - ((self.maxSize * evictionTarget) / usedSize), 0.05)
+            with self._connection:
+                for table in ('results', 'geometry'): # (the same fraction of both, the oldest ones)
+                    removeCount = math.ceil(self._connection.execute("SELECT COUNT(*) FROM "+table).fetchone()[0] * removeFraction)
+                    removed += self._connection.execute("DELETE FROM "+table+" WHERE rowid IN (SELECT rowid FROM "+table+" ORDER BY lastUsed LIMIT ?)", (removeCount,)).rowcount
+            newSize = self._size()
+            if(newSize >= usedSize):  break # (nothing left to remove)
+            usedSize = newSize
+        return(removed)
+
+    def __len__(self) -> int:
+        """ the number of cached designs (not counting the geometry) """
+        with self._lock:
+            return(self._connection.execute("SELECT COUNT(*) FROM results").fetchone()[0])
+
+    def clear(self):
+        with self._lock:
+            with self._connection:
+                self._connection.execute("DELETE FROM results");  self._connection.execute("DELETE FROM geometry")
+
+def openFromEnvironment(coilModule = None) -> resultCacheClass|None:
+    """ a resultCacheClass if the environment variable is set ('1' for the default file, or a filename), otherwise None """
+    setting = os.environ.get(environmentVariable, '').strip()
+    if(setting.lower() in ('', '0', 'false', 'no')):  return(None)
+    return(resultCacheClass((None if (setting.lower() in ('1', 'true', 'yes')) else setting), coilModule=coilModule))
+
+
+if __name__ == "__main__": # an example of how this file may be used
+    import tempfile
+    import sweepEngine
+    with tempfile.TemporaryDirectory() as tempDir:
+        with resultCacheClass(os.path.join(tempDir, 'example.sqlite')) as cache:
+            sweepParams = dict(turns=range(2, 8), diam=[20, 30], clearance=[0.15], traceWidth=[0.3, 0.5], layers=[1, 2], formula=['greenhouse'], filters=[sweepEngine.filterValidInductance])
+            for attempt in ('cold', 'warm'):
+                sink = sweepEngine.collectSink()
+                startTime = time.time()
+                sweepEngine.sweep(**sweepParams, sink=sink, cache=cache)
+                print(attempt, "'greenhouse' sweep of", len(sink), "designs took", round(time.time()-startTime, 3), "seconds, cache hits:", cache.hits, "misses:", cache.misses)
+            coil = PCBcoilV2.coilClass(turns=9, diam=40, clearance=0.15, traceWidth=0.9, layers=2, PCBthickness=0.6)
+            print("coil in the cache:", cache.fillCoilCache(coil), ", again:", cache.fillCoilCache(coil), ", inductance [uH]:", round(coil.calcInductance()*1e6, 3))
+            print("polygons:", [len(polygon) for polygon in cache.getGeometry(coil, 'polygons', 0.01)], "cache size [kB]:", round(cache.size()/1024, 1), "designs:", len(cache))
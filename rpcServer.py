@@ -0,0 +1,490 @@
+"""
+this file is a local JSON-RPC server (asyncio), sothat several scripts/people can share one (warm) process for their coil calculations:
+    python rpcServer.py                          (localhost TCP, port 8765)
+    python rpcServer.py --unix /tmp/coil.sock    (Unix socket, not on Windows)
+    python rpcServer.py --example                (starts a server on a free port and runs some example clients against it)
+    python rpcServer.py --selftest               (the same, but checks the results, error isolation and batching (exit code 1 if anything is wrong), see selfTest())
+the protocol is JSON-RPC 2.0, with one JSON object per line (in both directions), e.g.:
+    -> {"jsonrpc": "2.0", "id": 1, "method": "evaluate", "params": {"turns": 9, "diam": 40, "clearance": 0.15, "traceWidth": 0.9, "layers": 2, "PCBthickness": 0.6}}
+    <- {"jsonrpc": "2.0", "id": 1, "result": {"inductance": 1.169e-05, "resistance": 0.92, ..., "filename": "ci_di40_tu9_..."}}
+the methods (the coil params are the same as for coilStream.py: the coilClass constructor parameters, with the shape as a name):
+    evaluate(coil params)                                   -> inductance, resistance, etc. (see coilStream.evaluateSpecs())
+    render(coil params, chordTolerance, outline)            -> {"layers": one centerline ([[x,y], ...]) per layer, "polygons": the copper outlines (only if outline is true)}
+    sweep(turns, diam, ... (lists), minInductance, maxInductance, maxResistance, top) -> the best (top) designs, like 'coilCLI.py sweep'
+    export(coil params, dxf, excel, png, tif, outputDir, ...) -> the filenames that were saved (on the server, in outputDir, which is relative to the server's exportDir, see --exportDir)
+    stats()                                                 -> how many evaluate requests there were, and in how many batches
+evaluate requests that arrive close together (within batchWindow, from any client) are coalesced into one batch, which is evaluated with calcCoilBatch(),
+ render runs in a thread, and sweep/export (the heavy ones) run in a process pool, sothat the event loop is never blocked.
+a client may send many requests without waiting for the responses (they're answered in whatever order they finish, matched by id), rpcClientClass does this.
+(JSON-RPC batch arrays are not supported, just send multiple lines)
+"""
+
+import os
+import sys
+import json
+import math
+import time
+import asyncio
+import inspect
+import multiprocessing
+from concurrent.futures import ProcessPoolExecutor
+from concurrent.futures.process import BrokenProcessPool
+from typing import Callable # just for type-hints to provide some nice syntax colering
+
+import PCBcoilV2 as PCBcoil
+import coilStream
+
+defaultHost: str = '127.0.0.1' # (localhost only, the export method writes files on the server, so don't expose this to a network)
+defaultPort: int = 8765
+defaultBatchWindow: float = 0.002 # (seconds) evaluate requests that arrive within this time of the first one are evaluated together
+maxLineLength: int = 2**24 # (bytes) the longest request/response line (render results can be large)
+
+## the standard JSON-RPC error codes
+parseErrorCode: int = -32700
+invalidRequestCode: int = -32600
+methodNotFoundCode: int = -32601
+invalidParamsCode: int = -32602
+internalErrorCode: int = -32603
+
+class rpcErrorClass(Exception):
+    """ a JSON-RPC error (raised by the methods on the server, and by rpcClientClass.call() on the client) """
+    def __init__(self, code: int, message: str):
+        super().__init__(code, message) # (the args are what gets pickled, sothat this can be raised in the process pool too)
+        self.code = code;  self.message = message
+    def __str__(self) -> str:
+        return(self.message+" (code "+str(self.code)+")")
+
+def _coilFromSpec(spec: dict) -> PCBcoil.coilClass:
+    coil = coilStream.coilFromSpec(spec)
+    if(isinstance(coil, str)):  raise(rpcErrorClass(invalidParamsCode, coil))
+    return(coil)
+
+## the functions below run in a thread or in the process pool (sothat they don't block the event loop)
+def _workerInit(coefficients: str):
+    """ (process pool initializer) load the same coefficient set as the server """
+    if(coefficients is not None):  PCBcoil.loadCoefficientSet(coefficients)
+
+def _renderTask(coil: PCBcoil.coilClass, chordTolerance: float, outline: bool) -> dict:
+    rendered = coil.render(chordTolerance=chordTolerance)
+    result = {'layers' : [rendered[layer%2].tolist() for layer in range(coil.layers)]} # (the even layers run in one direction, the odd layers in the other)
+    if(outline):  result['polygons'] = [polygon.tolist() for polygon in rendered.asPolygons(coil.traceWidth, coil.layers)]
+    return(result)
+
+def _sweepTask(sweepParams: dict, minInductance: float, maxInductance: float, maxResistance: float, top: int) -> list[dict]:
+    import sweepEngine # (only imported when needed)
+    unknownShapes = [shapeName for shapeName in sweepParams['shape'] if (shapeName not in sweepEngine.shapes)]
+    if(len(unknownShapes) > 0):  raise(rpcErrorClass(invalidParamsCode, "unknown shape(s): "+', '.join(unknownShapes)+", options are: "+', '.join(sweepEngine.shapes.keys())))
+    sweepParams['shape'] = [sweepEngine.shapes[shapeName] for shapeName in sweepParams['shape']]
+    filters = [sweepEngine.filterPositiveInnerDiam, sweepEngine.filterValidInductance]
+    if((minInductance is not None) or (maxInductance is not None)):  filters.append(sweepEngine.filterInductanceRange(minInductance or 0.0, maxInductance or float('inf')))
+    if(maxResistance is not None):  filters.append(sweepEngine.filterMaxResistance(maxResistance))
+    if((minInductance is not None) and (maxInductance is not None)): # (the same scoring as 'coilCLI.py sweep')
+        targetInductance = (minInductance + maxInductance) / 2
+        scoreFunc = (lambda chunk : abs(chunk['inductance'] - targetInductance))
+    else:
+        scoreFunc = (lambda chunk : -(chunk['inductance'] / chunk['resistance']))
+    sink = sweepEngine.bestSink(scoreFunc, top)
+    sweepEngine.sweep(**sweepParams, filters=filters, sink=sink)
+    best = sink.result()
+    if(len(best) == 0):  return([])
+    shapeNames = {id(shapeObj) : shapeName for (shapeName, shapeObj) in sweepEngine.shapes.items()}
+    columns = [name for name in (sweepEngine.sweepParameterNames + tuple(coilStream.streamResultNames)) if (name in best)]
+    columnLists = {name : best[name].tolist() for name in columns}
+    return([dict({name : columnLists[name][i] for name in columns}, shape=shapeNames[id(best['shape'][i])], formula=str(best['formula'][i])) for i in range(len(best['turns']))])
+
+def _exportTask(spec: dict, dxf: bool, excel: bool, png: float, tif: float, outputDir: str, chordTolerance: float, arcs: bool, outline: bool) -> list[str]:
+    coil = _coilFromSpec(spec)
+    os.makedirs(outputDir, exist_ok=True)
+    originalDir = os.getcwd()
+    os.chdir(outputDir) # the exporters save their files in the current folder (this is a separate process, so it doesn't affect the server)
+    try:
+        filenames: list[str] = []
+        if(dxf):  filenames += coil.saveDXF(chordTolerance, arcs, outline)
+        if(excel):
+            import excelExporter # (only imported when needed)
+            filenames.append(coil.generateCoilFilename() + excelExporter.fileExtension);  coil.to_excel(filenames[-1])
+        for (imageFormat, pixelsPerMM) in (('.png', png), ('.tif', tif)):
+            if(pixelsPerMM is not None):
+                import cv2exporter # (only imported when needed)
+                images = cv2exporter.imwrite(coil, pixelsPerMM, imageFormat)
+                filenames += ([(coil.generateCoilFilename()+"_"+str(i)+'.png') for i in range(len(images))] if (imageFormat == '.png') else [coil.generateCoilFilename()+imageFormat]) # (the same names cv2exporter uses)
+        return([os.path.join(outputDir, filename) for filename in filenames])
+    finally:
+        os.chdir(originalDir)
+
+
+class rpcServerClass:
+    """ the server. Use start() (from within an asyncio event loop) and close(), or just serve() (see the __main__ at the bottom) """
+    def __init__(self, batchWindow: float = defaultBatchWindow, maxBatch: int = coilStream.maxBatchSize, workers: int = None, coefficients: str = None, exportDir: str = None):
+        """ exportDir is the folder that the export method may write in (clients can only choose a subfolder), default: a new temporary folder (made at the first export) """
+        self.batchWindow = batchWindow
+        self.maxBatch = maxBatch
+        self.workers = workers # (process pool size, default: all CPU cores)
+        self.coefficients = coefficients # a coefficient set file (see calibration.py), also loaded by the process pool workers
+        self.exportDir = (None if (exportDir is None) else os.path.realpath(exportDir))
+        self.methods: dict[str, Callable] = {'evaluate' : self.evaluate, 'render' : self.render, 'sweep' : self.sweep, 'export' : self.export, 'stats' : self.stats}
+        self._signatures: dict[str, inspect.Signature] = {name : inspect.signature(method) for (name, method) in self.methods.items()} # (to check the params, inspect.signature() is too slow to do for every request)
+        self._pendingSpecs: list[tuple[dict, asyncio.Future]] = [] # the evaluate requests that are waiting for the next batch
+        self._flushHandle: asyncio.TimerHandle = None
+        self._tasks: set[asyncio.Task] = set() # (asyncio only keeps weak references to tasks, so keep them here until they're done)
+        self._connectionTasks: set[asyncio.Task] = set() # (one per open connection, sothat close() can wait for them)
+        self._processPool: ProcessPoolExecutor = None # (only started when a sweep/export is requested)
+        self._server: asyncio.AbstractServer = None
+        self.evaluateRequestCount: int = 0
+        self.evaluateBatchCount: int = 0
+        self.largestBatch: int = 0
+
+    async def start(self, host: str = defaultHost, port: int = defaultPort, unixPath: str = None) -> asyncio.AbstractServer:
+        """ start listening on a (localhost) TCP port, or on a Unix socket (if unixPath is provided). Use port=0 to get a free port (see self.address) """
+        if(self.coefficients is not None):
+            if(not PCBcoil.loadCoefficientSet(self.coefficients)):  raise(ValueError("could not load coefficient set: "+str(self.coefficients)))
+        if(unixPath is not None):  self._server = await asyncio.start_unix_server(self._handleConnection, unixPath, limit=maxLineLength)
+        else:                      self._server = await asyncio.start_server(self._handleConnection, host, port, limit=maxLineLength)
+        return(self._server)
+
+    @property
+    def address(self) -> tuple|str:
+        """ the (host, port) (or Unix socket path) the server is listening on """
+        return(self._server.sockets[0].getsockname() if (self._server is not None) else None)
+
+    async def serve(self, host: str = defaultHost, port: int = defaultPort, unixPath: str = None):
+        """ start() and run until cancelled (e.g. Ctrl+C) """
+        await self.start(host, port, unixPath)
+        print("rpcServer listening on", self.address)
+        try:
+            await self._server.serve_forever()
+        finally:
+            await self.close()
+
+    async def close(self, timeout: float = 1.0):
+        """ stop listening, give the open connections (at most) timeout seconds to finish, and stop the process pool """
+        if(self._server is not None):  self._server.close();  self._server = None
+        if(len(self._connectionTasks) > 0):
+            _, unfinished = await asyncio.wait(self._connectionTasks, timeout=timeout)
+            for task in unfinished:  task.cancel()
+            await asyncio.gather(*unfinished, return_exceptions=True)
+        if(self._processPool is not None):  self._processPool.shutdown(wait=False, cancel_futures=True);  self._processPool = None
+
+    def _getProcessPool(self) -> ProcessPoolExecutor:
+        if(self._processPool is None): # ('spawn', because forked workers would inherit the open connections (sockets), which then don't close properly)
+            self._processPool = ProcessPoolExecutor(self.workers, multiprocessing.get_context('spawn'), initializer=_workerInit, initargs=(self.coefficients,))
+        return(self._processPool)
+
+    async def _runInProcessPool(self, func: Callable, *args):
+        try:
+            return(await asyncio.get_running_loop().run_in_executor(self._getProcessPool(), func, *args))
+        except BrokenProcessPool: # (a worker crashed (e.g. out of memory), start a new pool for the next request)
+            self._processPool = None
+            raise(rpcErrorClass(internalErrorCode, "a worker process crashed, please try again"))
+
+    ## connection handling
+    async def _handleConnection(self, reader: asyncio.StreamReader, writer: asyncio.StreamWriter):
+        connectionTasks: set[asyncio.Task] = set()
+        self._connectionTasks.add(asyncio.current_task())
+        try:
+            while(True):
+                line = await reader.readline()
+                if(not line):  break
+                if(not line.strip()):  continue
+                task = asyncio.create_task(self._answer(line, writer)) # (every request is handled concurrently, sothat one client can have many (batchable) requests pending)
+                connectionTasks.add(task);  task.add_done_callback(connectionTasks.discard)
+            if(len(connectionTasks) > 0):  await asyncio.gather(*connectionTasks) # answer everything before closing the connection
+        except (ConnectionError, ValueError) as excep: # (ValueError if a line is longer than maxLineLength)
+            print("rpcServer closing connection:", repr(excep))
+        finally:
+            self._connectionTasks.discard(asyncio.current_task())
+            writer.close()
+            try:
+                await writer.wait_closed()
+            except ConnectionError:
+                pass
+
+    async def _answer(self, line: bytes, writer: asyncio.StreamWriter):
+        response = await self.handleRequest(line)
+        if((response is not None) and (not writer.is_closing())):
+            writer.write((json.dumps(response) + '\n').encode())
+            try:
+                await writer.drain()
+            except ConnectionError:
+                pass
+
+    async def handleRequest(self, line: str|bytes) -> dict|None:
+        """ handle one JSON-RPC request (a line of JSON), returns the response (a dict), or None for notifications (requests without an id) """
+        try:
+            request = json.loads(line)
+        except ValueError:
+            return({'jsonrpc' : '2.0', 'id' : None, 'error' : {'code' : parseErrorCode, 'message' : "parse error"}})
+        requestID = (request.get('id') if isinstance(request, dict) else None)
+        try:
+            if((not isinstance(request, dict)) or (request.get('jsonrpc') != '2.0') or (not isinstance(request.get('method'), str))):
+                raise(rpcErrorClass(invalidRequestCode, "invalid request, it should be a JSON object with 'jsonrpc': '2.0' and a 'method'"))
+            if(request['method'] not in self.methods):  raise(rpcErrorClass(methodNotFoundCode, "method not found: "+request['method']+", options are: "+', '.join(self.methods.keys())))
+            params = request.get('params', {})
+            if(isinstance(params, dict)):    args, kwargs = (), params
+            elif(isinstance(params, list)):  args, kwargs = params, {}
+            else:  raise(rpcErrorClass(invalidParamsCode, "params should be an object or an array"))
+            try:
+                self._signatures[request['method']].bind(*args, **kwargs)
+            except TypeError as excep:
+                raise(rpcErrorClass(invalidParamsCode, str(excep)))
+            response = {'jsonrpc' : '2.0', 'id' : requestID, 'result' : await self.methods[request['method']](*args, **kwargs)}
+        except rpcErrorClass as excep:
+            response = {'jsonrpc' : '2.0', 'id' : requestID, 'error' : {'code' : excep.code, 'message' : excep.message}}
+        except Exception as excep:
+            print("rpcServer", request.get('method'), "failed:", repr(excep))
+            response = {'jsonrpc' : '2.0', 'id' : requestID, 'error' : {'code' : internalErrorCode, 'message' : repr(excep)}}
+        return(None if (isinstance(request, dict) and ('id' not in request)) else response) # (no response for notifications)
+
+    ## the methods
+    async def evaluate(self, **spec) -> dict:
+        """ the results of one coil (see coilStream.evaluateSpecs()). Requests that arrive within batchWindow of each other are evaluated as one batch """
+        future = asyncio.get_running_loop().create_future()
+        self._pendingSpecs.append((spec, future))
+        self.evaluateRequestCount += 1
+        if(len(self._pendingSpecs) >= self.maxBatch):  self._flushSpecs()
+        elif(self._flushHandle is None):  self._flushHandle = asyncio.get_running_loop().call_later(self.batchWindow, self._flushSpecs)
+        result = await future
+        if('error' in result):  raise(rpcErrorClass(invalidParamsCode, result['error']))
+        return(result)
+
+    def _flushSpecs(self):
+        """ start evaluating the pending evaluate requests (as one batch) """
+        if(self._flushHandle is not None):  self._flushHandle.cancel();  self._flushHandle = None
+        batch, self._pendingSpecs = self._pendingSpecs, []
+        if(len(batch) == 0):  return
+        self.evaluateBatchCount += 1;  self.largestBatch = max(self.largestBatch, len(batch))
+        task = asyncio.create_task(self._evaluateBatch(batch))
+        self._tasks.add(task);  task.add_done_callback(self._tasks.discard)
+
+    async def _evaluateBatch(self, batch: list[tuple[dict, asyncio.Future]]):
+        try:
+            outputs = await asyncio.get_running_loop().run_in_executor(None, coilStream.evaluateSpecs, [spec for (spec, _) in batch]) # (in a thread, sothat the next batch can be collected in the meantime)
+        except Exception as excep:
+            if(len(batch) == 1):
+                if(not batch[0][1].done()):  batch[0][1].set_exception(excep)
+                return
+            for (spec, future) in batch: # one bad spec shouldn't fail the other requests in the batch, so evaluate them one by one (only the ones that fail again get the exception)
+                await self._evaluateSingle(spec, future)
+            return
+        for ((_, future), output) in zip(batch, outputs):
+            if(not future.done()):  future.set_result(output) # (the future may have been cancelled, if the connection closed)
+
+    async def _evaluateSingle(self, spec: dict, future: asyncio.Future):
+        try:
+            output = (await asyncio.get_running_loop().run_in_executor(None, coilStream.evaluateSpecs, [spec]))[0]
+        except Exception as excep:
+            if(not future.done()):  future.set_exception(excep)
+            return
+        if(not future.done()):  future.set_result(output)
+
+    async def render(self, chordTolerance: float = None, outline: bool = False, **spec) -> dict:
+        """ the centerline of every layer (and the copper outline polygons, if outline is true), see coilClass.render() """
+        coil = _coilFromSpec(spec)
+        return(await asyncio.get_running_loop().run_in_executor(None, _renderTask, coil, chordTolerance, outline))
+
+    async def sweep(self, turns: list[int], diam: list[float], clearance: list[float], traceWidth: list[float], layers: list[int] = (1,), PCBthickness: list[float] = (1.6,),
+                    copperThickness: list[float] = (PCBcoil.ozCopperToMM(1.0),), shape: list[str] = ('circle',), formula: list[str] = ('cur_sheet',),
+                    minInductance: float = None, maxInductance: float = None, maxResistance: float = None, top: int = 10) -> list[dict]:
+        """ evaluate every combination of the given values (see sweepEngine.sweep()), and return the best (top) designs (like 'coilCLI.py sweep') """
+        toList = (lambda value : (list(value) if isinstance(value, (list, tuple)) else [value]))
+        sweepParams = dict(turns=toList(turns), diam=toList(diam), clearance=toList(clearance), traceWidth=toList(traceWidth), layers=toList(layers), PCBthickness=toList(PCBthickness),
+                           copperThickness=toList(copperThickness), shape=toList(shape), formula=toList(formula))
+        return(await self._runInProcessPool(_sweepTask, sweepParams, minInductance, maxInductance, maxResistance, int(top)))
+
+    async def export(self, dxf: bool = False, excel: bool = False, png: float = None, tif: float = None, outputDir: str = '.', chordTolerance: float = PCBcoil.chordToleranceDefault,
+                     arcs: bool = False, outline: bool = False, **spec) -> list[str]:
+        """ save the coil as DXF, excel and/or image (png/tif, at this many pixels per mm) files in outputDir (on the server), returns the filenames """
+        if(not (dxf or excel or (png is not None) or (tif is not None))):  raise(rpcErrorClass(invalidParamsCode, "nothing to export, use dxf, excel, png or tif"))
+        _coilFromSpec(spec) # (check the params here, instead of in the worker)
+        return(await self._runInProcessPool(_exportTask, spec, dxf, excel, png, tif, self._resolveOutputDir(outputDir), chordTolerance, arcs, outline))
+
+    def _resolveOutputDir(self, outputDir: str) -> str:
+        """ the (absolute) folder for an export, outputDir is relative to self.exportDir, and may not point outside of it (clients should not be able to write files anywhere else) """
+        if(not isinstance(outputDir, str)):  raise(rpcErrorClass(invalidParamsCode, "outputDir should be a string"))
+        if(self.exportDir is None):
+            import tempfile # (only imported when needed)
+            self.exportDir = os.path.realpath(tempfile.mkdtemp(prefix='coilExports_'))
+            print("rpcServer exporting to:", self.exportDir)
+        resolvedDir = os.path.realpath(os.path.join(self.exportDir, outputDir)) # (realpath also resolves '..' and symlinks)
+        if(os.path.commonpath([self.exportDir, resolvedDir]) != self.exportDir):  raise(rpcErrorClass(invalidParamsCode, "outputDir should be inside the server's exportDir, not: "+outputDir))
+        return(resolvedDir)
+
+    async def stats(self) -> dict:
+        return({'evaluateRequests' : self.evaluateRequestCount, 'evaluateBatches' : self.evaluateBatchCount, 'largestBatch' : self.largestBatch})
+
+
+class rpcClientClass:
+    """ a (minimal) asyncio client for rpcServerClass. Calls may be made concurrently (e.g. with asyncio.gather()), the responses are matched by id
+        usage:
+            async with rpcClientClass(port=8765) as client:
+                results = await client.call('evaluate', turns=9, diam=40, clearance=0.15, traceWidth=0.9) """
+    def __init__(self, host: str = defaultHost, port: int = defaultPort, unixPath: str = None):
+        self.host = host;  self.port = port;  self.unixPath = unixPath
+        self._reader: asyncio.StreamReader = None
+        self._writer: asyncio.StreamWriter = None
+        self._readTask: asyncio.Task = None
+        self._pending: dict[int, asyncio.Future] = {} # id : future
+        self._nextID: int = 0
+
+    async def connect(self):
+        if(self.unixPath is not None):  self._reader, self._writer = await asyncio.open_unix_connection(self.unixPath, limit=maxLineLength)
+        else:                           self._reader, self._writer = await asyncio.open_connection(self.host, self.port, limit=maxLineLength)
+        self._readTask = asyncio.create_task(self._readResponses())
+
+    async def close(self):
+        if(self._writer is not None):
+            self._writer.close()
+            try:
+                await self._writer.wait_closed()
+            except ConnectionError:
+                pass
+            self._writer = None
+        if(self._readTask is not None):  await self._readTask;  self._readTask = None
+
+    async def __aenter__(self):
+        await self.connect()
+        return(self)
+    async def __aexit__(self, *args):
+        await self.close()
+
+    async def call(self, method: str, *args, **kwargs):
+        """ call a method on the server (with either positional or named params), returns the result or raises an rpcErrorClass """
+        if((len(args) > 0) and (len(kwargs) > 0)):  raise(ValueError("JSON-RPC params are either positional or named, not both"))
+        self._nextID += 1
+        future = asyncio.get_running_loop().create_future()
+        self._pending[self._nextID] = future
+        self._writer.write((json.dumps({'jsonrpc' : '2.0', 'id' : self._nextID, 'method' : method, 'params' : (list(args) if (len(args) > 0) else kwargs)}) + '\n').encode())
+        await self._writer.drain()
+        return(await future)
+
+    async def _readResponses(self):
+        try:
+            while(True):
+                line = await self._reader.readline()
+                if(not line):  break
+                response = json.loads(line)
+                future = self._pending.pop(response.get('id'), None)
+                if((future is None) or future.done()):  continue
+                if('error' in response):  future.set_exception(rpcErrorClass(response['error'].get('code'), response['error'].get('message')))
+                else:  future.set_result(response.get('result'))
+        except ConnectionError:
+            pass
+        finally: # (whatever is still waiting won't get a response anymore)
+            for future in self._pending.values():
+                if(not future.done()):  future.set_exception(ConnectionError("the connection to the rpcServer closed"))
+            self._pending.clear()
+
+
+async def _example(clientCount: int = 4, requestsPerClient: int = 250):
+    """ start a server on a free port, and run some (concurrent) clients against it """
+    server = rpcServerClass() # (exports go to a temporary folder)
+    await server.start(port=0)
+    host, port = server.address[0:2]
+    print("rpcServer example, listening on", (host, port))
+    async def exampleClient(clientIndex: int) -> list[dict]:
+        async with rpcClientClass(host, port) as client:
+            return(await asyncio.gather(*[client.call('evaluate', turns=5+(i%10), diam=20.0+clientIndex, clearance=0.15, traceWidth=0.5, layers=2) for i in range(requestsPerClient)]))
+    startTime = time.time()
+    results = await asyncio.gather(*[exampleClient(clientIndex) for clientIndex in range(clientCount)])
+    print(clientCount*requestsPerClient, "evaluate requests from", clientCount, "clients took", round(time.time()-startTime, 3), "seconds, stats:", await server.stats())
+    print("first result:", results[0][0])
+    async with rpcClientClass(host, port) as client:
+        try:
+            await client.call('evaluate', turns=9, diam=40, clearance=0.15, traceWidth=0.9, shape='triangle')
+        except rpcErrorClass as excep:
+            print("invalid request gives an error:", excep)
+        rendered = await client.call('render', turns=9, diam=40, clearance=0.15, traceWidth=0.9, layers=2, chordTolerance=0.01, outline=True)
+        print("render:", len(rendered['layers']), "layers with", len(rendered['layers'][0]), "points each, and", len(rendered['polygons']), "outline polygons")
+        startTime = time.time()
+        best = await client.call('sweep', turns=list(range(2, 30)), diam=[20, 30, 40], clearance=[0.15, 0.2], traceWidth=[0.2, 0.3, 0.5, 0.9], layers=[1, 2, 4],
+                                 shape=['circle', 'square'], minInductance=9e-6, maxInductance=11e-6, top=3)
+        print("sweep took", round(time.time()-startTime, 3), "seconds (including starting the process pool), the best designs:")
+        for design in best:  print("   ", design['shape'], design['turns'], "turns", design['diam'], "mm", design['layers'], "layers, L [uH]:", round(design['inductance']*1e6, 3))
+        filenames = await client.call('export', turns=9, diam=40, clearance=0.15, traceWidth=0.9, layers=2, dxf=True, png=10.0, outputDir='example')
+        print("export saved:", filenames)
+        try:
+            await client.call('export', turns=9, diam=40, clearance=0.15, traceWidth=0.9, dxf=True, outputDir='../somewhereElse')
+        except rpcErrorClass as excep:
+            print("exporting outside of the exportDir gives an error:", excep)
+    await server.close()
+    import shutil # (only imported when needed)
+    shutil.rmtree(server.exportDir, ignore_errors=True) # (the temporary folder of the example exports)
+
+async def selfTest(clientCount: int = 3, requestsPerClient: int = 20) -> bool:
+    """ start a server on a free port (with a long batchWindow), and check the results, error isolation and batching with a few (concurrent) clients. Returns True if everything is correct """
+    server = rpcServerClass(batchWindow=0.25) # (long enough that all requests below end up in one batch)
+    await server.start(port=0)
+    host, port = server.address[0:2]
+    failures: list[str] = []
+    def check(condition: bool, description: str):
+        print(("  ok  " if condition else "FAILED"), description)
+        if(not condition):  failures.append(description)
+    specs = [[dict(turns=3+i, diam=40.0+5*clientIndex, clearance=0.15, traceWidth=0.5, layers=1+(i%3), PCBthickness=0.8) for i in range(requestsPerClient)] for clientIndex in range(clientCount)]
+    badSpecs = [dict(turns=9, diam=40, clearance=0.15, traceWidth=0.9, shape=['x']), dict(turns=9, diam=40, clearance=0.15, traceWidth=0), dict(turns=9, diam=40, clearance=0.15)]
+    async def callOrError(client: rpcClientClass, spec: dict) -> dict|rpcErrorClass:
+        try:
+            return(await client.call('evaluate', **spec))
+        except rpcErrorClass as excep:
+            return(excep)
+    async def testClient(clientIndex: int) -> list:
+        async with rpcClientClass(host, port) as client:
+            return(await asyncio.gather(*[callOrError(client, spec) for spec in (specs[clientIndex] + (badSpecs if (clientIndex == 0) else []))]))
+    try:
+        results = await asyncio.gather(*[testClient(clientIndex) for clientIndex in range(clientCount)])
+        expected = [coilStream.evaluateSpecs(clientSpecs) for clientSpecs in specs]
+        check(all([(results[clientIndex][0:requestsPerClient] == expected[clientIndex]) for clientIndex in range(clientCount)]), "evaluate results are the same as coilStream.evaluateSpecs()")
+        coil = PCBcoil.coilClass(**specs[1][4])
+        check(math.isclose(results[1][4]['inductance'], coil.calcInductance(), rel_tol=1e-9) and math.isclose(results[1][4]['resistance'], coil.calcTotalResistance(), rel_tol=1e-9), "evaluate results are the same as coilClass")
+        check(all([(isinstance(result, rpcErrorClass) and (result.code == invalidParamsCode)) for result in results[0][requestsPerClient:]]), "invalid specs get an invalid-params error (and don't affect the rest of the batch)")
+        serverStats = await server.stats()
+        totalRequests = clientCount * requestsPerClient + len(badSpecs)
+        check(serverStats['evaluateRequests'] == totalRequests, "evaluateRequests is "+str(serverStats['evaluateRequests'])+" (expected "+str(totalRequests)+")")
+        check((serverStats['evaluateBatches'] == 1) and (serverStats['largestBatch'] == totalRequests), "all concurrent requests were evaluated as one batch: "+str(serverStats))
+        async with rpcClientClass(host, port) as client:
+            check(isinstance(await callOrError(client, dict(turns=9, diam=40, clearance=0.15, traceWidth=0.9)), dict), "a single request (by itself) works")
+            check((await server.stats())['evaluateBatches'] == 2, "the single request was its own batch")
+            check(isinstance(await callOrError(client, {}), rpcErrorClass), "an empty spec gives an error")
+            try:
+                await client.call('doesNotExist');  check(False, "an unknown method gives an error")
+            except rpcErrorClass as excep:
+                check(excep.code == methodNotFoundCode, "an unknown method gives a method-not-found error")
+            for outputDir in ('../outside', '/tmp', 'sub/../../outside'):
+                try:
+                    await client.call('export', turns=9, diam=40, clearance=0.15, traceWidth=0.9, dxf=True, outputDir=outputDir);  check(False, "export to "+outputDir+" is refused")
+                except rpcErrorClass as excep:
+                    check(excep.code == invalidParamsCode, "export to "+outputDir+" (outside of the exportDir) is refused")
+    finally:
+        await server.close()
+        if(server.exportDir is not None):
+            import shutil # (only imported when needed)
+            shutil.rmtree(server.exportDir, ignore_errors=True) # (the temporary export folder, nothing should be in it)
+    print("rpcServer self-test:", ("passed" if (len(failures) == 0) else (str(len(failures))+" check(s) FAILED")))
+    return(len(failures) == 0)
+
+def main(argv: list[str] = None) -> int:
+    import argparse
+    parser = argparse.ArgumentParser(prog='rpcServer', description="local JSON-RPC server for PCB coil calculations")
+    parser.add_argument('--host', default=defaultHost, help="(default: %(default)s)")
+    parser.add_argument('--port', type=int, default=defaultPort, help="(default: %(default)s)")
+    parser.add_argument('--unix', default=None, metavar='PATH', help="listen on a Unix socket instead of TCP")
+    parser.add_argument('--batchWindow', type=float, default=defaultBatchWindow, help="[s] how long to collect evaluate requests before evaluating them as one batch (default: %(default)s)")
+    parser.add_argument('--workers', type=int, default=None, help="number of processes for sweep/export (default: all CPU cores)")
+    parser.add_argument('--coefficients', default=None, help="a coefficient set (.json) to load first, see calibration.py")
+    parser.add_argument('--exportDir', default=None, help="the folder the export method saves files in (clients can only choose a subfolder, default: a new temporary folder)")
+    parser.add_argument('--example', action='store_true', help="start a server on a free port and run some example clients against it")
+    parser.add_argument('--selftest', action='store_true', help="start a server on a free port and check its results, error handling and batching (exits with 1 if anything is wrong)")
+    args = parser.parse_args(argv)
+    if(args.selftest):
+        return(0 if asyncio.run(selfTest()) else 1)
+    if(args.example):
+        asyncio.run(_example())
+        return(0)
+    try:
+        asyncio.run(rpcServerClass(args.batchWindow, workers=args.workers, coefficients=args.coefficients, exportDir=args.exportDir).serve(args.host, args.port, args.unix))
+    except KeyboardInterrupt:
+        pass
+    return(0)
+
+
+if __name__ == "__main__":
+    sys.exit(main())
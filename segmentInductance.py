@@ -0,0 +1,87 @@
+"""
+this file is a numerical (segment-level) inductance calculator, as an alternative to the empirical formulas from paper[1]
+the MDPI paper (see PCBcoilV_ docstring) models every line segment individually, this does the same, using the 'Greenhouse' approach:
+ the total inductance is the sum of the (partial) self-inductance of every segment, plus the (partial) mutual inductance of every pair of segments (signed by their relative direction)
+
+the mutual inductances are calculated with the Neumann integral: M_ij = (mu0/4pi) * integral(integral( dl_i . dl_j / r )),
+ using Gauss-Legendre quadrature points along each segment. To account for the (flat, rectangular) cross-section of the trace, the distance r is replaced by sqrt(r^2 + GMD^2),
+ where GMD (geometric mean distance of a rectangle) ~= 0.2235*(width+thickness). The self-inductance of a segment is the exact integral of that same kernel,
+ which (for long segments) is the well-known Greenhouse formula: L = (mu0/2pi) * l * (ln(2l/(w+t)) + 0.5 + ...)
+ (using the same kernel for both is what makes the result (nearly) independent of how finely the coil is split into segments)
+
+the (segments x segments) pair matrix is evaluated in tiles, sothat memory use stays small (and cache-friendly) for coils with thousands of segments,
+ and only the upper triangle of tiles is calculated (the matrix is symmetric).
+everything is in millimeters (input) and Henry (output), like the rest of this project
+"""
+
+import numpy as np
+
+magneticConstant = 4*np.pi * 10**-7 # Mu_0 (same as in PCBcoilV_)
+distUnitMult = 1/1000 # all distance units are in mm, so to convert back to meters, multiply with this
+
+GMDfactor: float = 0.2235 # the geometric mean distance of a rectangular cross-section is ~0.2235*(width+thickness)
+defaultGaussPoints: int = 8 # quadrature points per segment
+defaultTilePoints: int = 512 # (max) quadrature points per tile side, a (512 x 512) tile of float64 is 2MB, which fits in most L2/L3 caches
+
+def _selfInductanceSum(segmentLengths: np.ndarray, GMD: float) -> np.ndarray:
+    """ the exact double integral of 1/sqrt((x-y)^2 + GMD^2) over a straight segment (in meters), per segment """
+    return(2 * ((segmentLengths * np.arcsinh(segmentLengths / GMD)) - np.sqrt((segmentLengths**2) + (GMD**2)) + GMD))
+
+def calcPolylineInductance(polylines: np.ndarray|list[np.ndarray], traceWidth: float, copperThickness: float, gaussPoints: int = defaultGaussPoints, tilePoints: int = defaultTilePoints) -> float:
+    """ the total inductance (in Henry) of one or more polylines (in mm) carrying the same current (in series), with a trace of (traceWidth x copperThickness) mm
+        polylines is one (N,2)/(N,3) array (or list of (x,y) tuples, e.g. from renderAsCoordinateList()), or a list of those (e.g. one per layer, with a z coordinate).
+        the direction of every polyline matters (it's the direction of the current), the polylines are not connected to each other (the vias are ignored) """
+    if(isinstance(polylines, np.ndarray) or ((len(polylines) > 0) and (np.ndim(polylines[0]) == 1))):  polylines = [polylines,] # (a single polyline)
+    starts: list[np.ndarray] = [];  ends: list[np.ndarray] = []
+    for polyline in polylines:
+        points = np.asarray(polyline, dtype=float) * distUnitMult
+        if(points.shape[1] == 2):  points = np.column_stack((points, np.zeros(len(points))))
+        starts.append(points[:-1]);  ends.append(points[1:])
+    segmentStarts = np.concatenate(starts);  segmentVectors = np.concatenate(ends) - segmentStarts
+    segmentLengths = np.linalg.norm(segmentVectors, axis=1)
+    keep = (segmentLengths > 0.0) # (duplicate points would produce empty segments)
+    segmentStarts = segmentStarts[keep];  segmentVectors = segmentVectors[keep];  segmentLengths = segmentLengths[keep]
+    GMD = GMDfactor * (traceWidth + copperThickness) * distUnitMult
+
+    ## quadrature points along every segment (nodes mapped from [-1,1] to [0,1]):
+    nodes, weights = np.polynomial.legendre.leggauss(gaussPoints)
+    nodes = (nodes + 1) / 2;  weights = weights / 2
+    quadPoints = segmentStarts[:,None,:] + (nodes[None,:,None] * segmentVectors[:,None,:]) # (segments, gaussPoints, 3)
+
+    ## the pair matrix, in tiles (only the upper triangle, the off-diagonal tiles count twice):
+    tileSegments = max(tilePoints // gaussPoints, 1)
+    segmentCount = len(segmentLengths)
+    total = 0.0
+    for i0 in range(0, segmentCount, tileSegments):
+        i1 = min(i0+tileSegments, segmentCount)
+        pointsI = quadPoints[i0:i1].reshape(-1, 3)
+        for j0 in range(i0, segmentCount, tileSegments):
+            j1 = min(j0+tileSegments, segmentCount)
+            pointsJ = quadPoints[j0:j1].reshape(-1, 3)
+            kernel = (pointsI @ (-2*pointsJ.T)) # |a-b|^2 = |a|^2 + |b|^2 - 2a.b  (as a matrix product, to avoid a (tile x tile x 3) temporary array)
+            kernel += np.sum(pointsI**2, axis=1)[:,None];  kernel += (np.sum(pointsJ**2, axis=1) + GMD**2)[None,:]
+            np.maximum(kernel, GMD**2, out=kernel) # (rounding errors could make it slightly smaller for (nearly) overlapping points)
+            np.sqrt(kernel, out=kernel);  np.reciprocal(kernel, out=kernel) # 1/r (in place, sothat the tile is the only big array)
+            pairIntegrals = ((kernel.reshape(-1, gaussPoints) @ weights).reshape(i1-i0, gaussPoints, j1-j0).transpose(0,2,1) @ weights) # the (normalized) double integral for every segment pair in the tile
+            pairIntegrals *= (segmentVectors[i0:i1] @ segmentVectors[j0:j1].T) # (dl_i . dl_j), which also scales the normalized integral by both lengths
+            if(i0 == j0): # diagonal tile, replace the self-terms with the exact integral
+                diagonal = np.arange(i1-i0)
+                pairIntegrals[diagonal, diagonal] = _selfInductanceSum(segmentLengths[i0:i1], GMD)
+                total += np.sum(pairIntegrals)
+            else:
+                total += 2 * np.sum(pairIntegrals)
+    return((magneticConstant / (4*np.pi)) * total)
+
+
+if __name__ == "__main__": # an example of how this file may be used
+    import time
+    from PCBcoilV2 import coilClass, shapes
+    ## a straight trace split into more and more segments should give (nearly) the same result every time:
+    for segments in (1, 2, 10, 100):
+        print("50mm straight trace in", segments, "segments: ", calcPolylineInductance(np.column_stack((np.linspace(0, 50, segments+1), np.zeros(segments+1))), 0.9, 0.035), "H")
+    ## comparison with the empirical formula:
+    for shapeName in shapes:
+        coil = coilClass(turns=9, diam=40, clearance=0.15, traceWidth=0.9, layers=1, copperThickness=0.035, shape=shapes[shapeName], formula='cur_sheet')
+        calcStartTime = time.time()
+        numericalInductance = calcPolylineInductance(coil.renderAsCoordinateList(), coil.traceWidth, coil.copperThickness)
+        print(shapeName, " cur_sheet:", round(coil.calcInductance()*1e6, 3), "uH   numerical:", round(numericalInductance*1e6, 3), "uH   (took", round(time.time()-calcStartTime, 3), "s)")
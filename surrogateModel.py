@@ -0,0 +1,175 @@
+"""
+this file holds a surrogate (lookup table) model of the single-layer inductance: surrogateClass
+the optimizer and inverse-solver call the inductance formulas millions of times, and formula='greenhouse' (numerical) takes ~0.1s per coil,
+ so instead, the formula is evaluated once on a dense grid, and queries are answered by (vectorized) multilinear interpolation in that grid.
+
+all the formulas scale with the size of the coil (L(s*diam, s*clearance, s*traceWidth) = (s^p)*L, with p=1, except for 'monomial', where p is the sum of its length exponents),
+ so the table only needs dimensionless (normalized) coordinates:
+  turns,  fill = 2*turns*spacing/diam (how much of the radius is filled with turns),  copperFraction = traceWidth/spacing,  thicknessRatio = copperThickness/traceWidth (only used by 'greenhouse')
+ and the stored value is L/(turns^2) of a coil with diam = referenceDiam, which is a smooth function of those coordinates (the continuous ones are interpolated on a log scale)
+every cell of the table stores the (relative) interpolation error halfway along each axis (measured against the exact value when the table is made),
+ the reported error bound of a query assumes the table is (locally) quadratic: 4*s*(1-s) times that error (at a fraction s along the axis), summed over all axes (so it's 0 at the nodes, e.g. for whole turns),
+ with a little margin (errorBoundMargin). It's an estimate, not a guarantee, but it's a lot more useful than a single global number
+queries outside the table (or in cells with impossible coils) are evaluated exactly instead (with an error of 0)
+
+the tables are cached to disk (.npz), as making a 'greenhouse' table can take a while (the cache file name includes a hash of the formula coefficients and grid, so changing those makes a new table)
+"""
+
+import numpy as np
+import os
+import time
+import hashlib
+import itertools
+
+from PCBcoilV2 import calcCoilBatch, calcInductanceSingleLayer, shapes, ozCopperToMM, _shapeBaseClass
+
+defaultCacheFolder: str = os.path.join(os.path.dirname(os.path.abspath(__file__)), 'surrogateCache')
+referenceDiam: float = 10.0 # (mm) the diameter of the tabulated coils (any value works, as the formulas scale)
+errorBoundMargin: float = 1.5 # the quadratic error model is a slight underestimate (99.9% of the actual errors are within 1.3x of it, in my tests), so the reported bound gets some margin
+
+axisNames: tuple[str] = ('turns', 'fill', 'copperFraction', 'thicknessRatio')
+defaultGrids: dict[str, dict[str, np.ndarray]] = { # the nodes of the table (per axis), 'greenhouse' gets a coarser grid, as every node is a numerical calculation
+    'default' : {'turns' : np.arange(1, 41), 'fill' : np.geomspace(0.01, 1.0, 32), 'copperFraction' : np.geomspace(0.05, 0.98, 24), 'thicknessRatio' : np.array([0.0])},
+    'greenhouse' : {'turns' : np.arange(1, 21), 'fill' : np.geomspace(0.02, 1.0, 10), 'copperFraction' : np.geomspace(0.1, 0.95, 6), 'thicknessRatio' : np.geomspace(0.01, 1.0, 2)}} # (~6000 numerical evaluations, ~15 minutes for a circle)
+
+def calcScaleExponent(shape: _shapeBaseClass, formula: str) -> float:
+    """ the power p in L(s*diam, s*clearance, s*traceWidth) = (s^p)*L """
+    if(formula == 'monomial'): # a product of powers: trueDiam^c1 * traceWidth^c2 * averageDiam^c3 * turns^c4 * clearance^c5
+        coeff = shape.formulaCoefficients[formula]
+        return(coeff[1] + coeff[2] + coeff[3] + coeff[5])
+    return(1.0)
+
+def _normalizedCoordinates(turns, diam, clearance, traceWidth, copperThickness) -> list[np.ndarray]:
+    """ the (dimensionless) table coordinates of coils """
+    spacing = clearance + traceWidth
+    return([np.asarray(turns, dtype=float), (2 * turns * spacing) / diam, traceWidth / spacing, copperThickness / traceWidth])
+
+def _flatStrides(shape: tuple[int]) -> np.ndarray:
+    """ the (element) strides of a C-ordered array, sothat (sum(index*stride)) is the index in the flattened array """
+    return(np.concatenate((np.cumprod(shape[:0:-1])[::-1], [1])).astype(np.int64))
+
+class surrogateClass:
+    """ a lookup table of the single-layer inductance of one shape+formula, see the explanation at the top of this file
+        the table is loaded from the cache folder if possible (made and saved otherwise) """
+    def __init__(self, shape: _shapeBaseClass = shapes['circle'], formula: str = 'cur_sheet', grid: dict[str, np.ndarray] = None, cacheFolder: str|None = defaultCacheFolder, silent: bool = False):
+        self.shape = shape;  self.formula = formula
+        if(formula not in shape.formulaCoefficients):  raise(Exception("surrogateClass can't make a table for shape="+str(shape)+" and formula="+formula+" (formula not in formulaCoefficients)"))
+        grid = (defaultGrids.get(formula, defaultGrids['default']) if (grid is None) else grid)
+        if(formula != 'greenhouse'):  grid = dict(grid, thicknessRatio=np.array([0.0])) # (the closed-form formulas don't use the copper thickness)
+        self.nodes: list[np.ndarray] = [np.asarray(grid[name], dtype=float) for name in axisNames]
+        self.logAxes: tuple[bool] = (False, True, True, (len(self.nodes[3]) > 1)) # the continuous axes are interpolated on a log scale (the formulas have log(fill) terms)
+        self.axes: list[np.ndarray] = [(np.log(nodes) if isLog else nodes) for (nodes, isLog) in zip(self.nodes, self.logAxes)] # the interpolation coordinates
+        self.axisSteps: list[float|None] = [(float(axis[1]-axis[0]) if ((len(axis) > 1) and np.allclose(np.diff(axis), axis[1]-axis[0], rtol=1e-9, atol=0)) else None) for axis in self.axes] # (evenly spaced axes don't need a search)
+        self.scaleExponent = calcScaleExponent(shape, formula)
+        self.cacheFilename = None
+        if(cacheFolder is not None):
+            tableKey = repr((shape.__class__.__name__, formula, shape.formulaCoefficients[formula], referenceDiam, [nodes.tolist() for nodes in self.nodes])) # anything that changes the table content
+            self.cacheFilename = os.path.join(cacheFolder, shape.__class__.__name__+'_'+formula+'_'+hashlib.sha1(tableKey.encode()).hexdigest()[:12]+'.npz')
+            if(os.path.isfile(self.cacheFilename)):
+                with np.load(self.cacheFilename) as cacheFile:
+                    self.values = cacheFile['values'];  self.axisErrors = cacheFile['axisErrors']
+                return
+        buildStartTime = time.time()
+        usedAxes = [k for k in range(len(axisNames)) if (len(self.nodes[k]) > 1)]
+        cellShape = tuple([max(len(nodes)-1, 1) for nodes in self.nodes])
+        if(not silent):  print("making surrogate table for", shape.__class__.__name__, formula, "(", int(np.prod([len(nodes) for nodes in self.nodes])) + len(usedAxes)*int(np.prod(cellShape)), "exact evaluations )")
+        self.values = self._calcExact(*np.meshgrid(*self.nodes, indexing='ij'))
+        ## the error of every cell, along every axis: the error of linear interpolation halfway between the 2 nodes (on the lower edge of the cell)
+        self.axisErrors = np.zeros(cellShape + (len(axisNames),))
+        for k in usedAxes:
+            points = [(axis[:-1] if (len(axis) > 1) else axis) for axis in self.axes];  points[k] = (self.axes[k][:-1] + self.axes[k][1:]) / 2 # (in interpolation coordinates)
+            lowerEdge = tuple([(slice(0, len(axis)-1) if (len(axis) > 1) else slice(None)) for axis in self.axes])
+            upperEdge = tuple([(slice(1, None) if (j == k) else lowerEdge[j]) for j in range(len(axisNames))])
+            with np.errstate(divide='ignore', invalid='ignore'):
+                exact = self._calcExact(*np.meshgrid(*[(np.exp(point) if isLog else point) for (point, isLog) in zip(points, self.logAxes)], indexing='ij'))
+                self.axisErrors[...,k] = np.abs((((self.values[lowerEdge] + self.values[upperEdge]) / 2) / exact) - 1.0) # (NaN for cells with impossible coils)
+        if(not silent):  print("surrogate table done in", round(time.time()-buildStartTime, 2), "seconds")
+        if(self.cacheFilename is not None):
+            os.makedirs(cacheFolder, exist_ok=True)
+            np.savez_compressed(self.cacheFilename, values=self.values, axisErrors=self.axisErrors)
+
+    def _calcExact(self, turns: np.ndarray, fill: np.ndarray, copperFraction: np.ndarray, thicknessRatio: np.ndarray) -> np.ndarray:
+        """ the exact table value (L/(turns^2) at referenceDiam) at normalized coordinates, NaN for impossible coils """
+        spacing = (fill * referenceDiam) / (2 * turns)
+        traceWidth = copperFraction * spacing
+        copperThickness = (thicknessRatio * traceWidth) if (self.formula == 'greenhouse') else ozCopperToMM(1.0)
+        results = calcCoilBatch(turns, referenceDiam, spacing - traceWidth, traceWidth, 1, 1.6, copperThickness, self.shape, self.formula)
+        return(np.where(results['trueInnerDiam'] > 0.0, results['inductanceSingleLayer'] / (turns**2), np.nan))
+
+    def _interpolate(self, coordinates: list[np.ndarray]) -> tuple[np.ndarray, np.ndarray, np.ndarray]:
+        """ multilinear interpolation at (normalized) coordinates, returns (values, errorBound, inside) (values are NaN in cells with impossible coils)
+            the error bound assumes the table is (locally) quadratic: the error at a fraction s along an axis is 4*s*(1-s) times the halfway error, summed over all axes """
+        coordinates = np.broadcast_arrays(*[(np.log(coordinate) if isLog else coordinate) for (coordinate, isLog) in zip(coordinates, self.logAxes)])
+        inside = np.ones(coordinates[0].shape, dtype=bool)
+        valueStrides = _flatStrides(self.values.shape);  cellStrides = _flatStrides(self.axisErrors.shape[:-1])
+        valueIndex = np.zeros(inside.shape, dtype=np.int64);  cellIndex = np.zeros(inside.shape, dtype=np.int64) # (flat indices, which is a lot faster than indexing with a tuple of arrays)
+        usedAxes: list[int] = [];  fractions: list[np.ndarray] = []
+        for (k, (axis, coordinate)) in enumerate(zip(self.axes, coordinates)):
+            if(len(axis) == 1):  continue # (an axis that's not used)
+            inside &= (coordinate >= axis[0]) & (coordinate <= axis[-1]) # (NaN compares as False)
+            if(self.axisSteps[k] is not None):
+                position = (coordinate - axis[0]) / self.axisSteps[k]
+                axisIndex = np.clip(np.nan_to_num(np.floor(position), nan=0.0), 0, len(axis)-2).astype(np.int64)
+                fraction = position - axisIndex
+            else:
+                axisIndex = np.clip(np.searchsorted(axis, coordinate, side='right') - 1, 0, len(axis)-2)
+                fraction = (coordinate - axis[axisIndex]) / (axis[axisIndex+1] - axis[axisIndex])
+            valueIndex += axisIndex * valueStrides[k];  cellIndex += axisIndex * cellStrides[k]
+            usedAxes.append(k);  fractions.append(fraction)
+        flatValues = self.values.reshape(-1)
+        values = np.zeros(inside.shape)
+        for corner in itertools.product((0,1), repeat=len(usedAxes)): # the 2^(used axes) corners of the cell
+            weight = np.ones(inside.shape)
+            for (fraction, side) in zip(fractions, corner):
+                weight *= (fraction if side else (1.0 - fraction))
+            values += weight * flatValues[valueIndex + sum([(side * valueStrides[k]) for (k, side) in zip(usedAxes, corner)])]
+        flatErrors = self.axisErrors.reshape(-1, len(axisNames))
+        errorBound = sum([(flatErrors[cellIndex, k] * 4 * fraction * (1.0 - fraction)) for (k, fraction) in zip(usedAxes, fractions)], np.zeros(inside.shape))
+        return(values, errorBound * errorBoundMargin, inside)
+
+    def calcInductanceSingleLayer(self, turns: int|np.ndarray, diam: float|np.ndarray, clearance: float|np.ndarray, traceWidth: float|np.ndarray, copperThickness: float|np.ndarray = ozCopperToMM(1.0),
+                                  returnErrorBound: bool = False) -> np.ndarray|tuple[np.ndarray, np.ndarray]:
+        """ the single-layer inductance (in Henry) of (broadcastable arrays of) coils, interpolated from the table (or exact, where the table doesn't cover it)
+            if returnErrorBound, also returns the (relative) error estimate of every result (0.0 for exact results) """
+        turns, diam, clearance, traceWidth, copperThickness = np.broadcast_arrays(*[np.asarray(param, dtype=float) for param in (turns, diam, clearance, traceWidth, copperThickness)])
+        with np.errstate(divide='ignore', invalid='ignore'):
+            normalized, errorBound, inside = self._interpolate(_normalizedCoordinates(turns, diam, clearance, traceWidth, copperThickness))
+            inductance = normalized * (turns**2) * ((diam / referenceDiam)**self.scaleExponent)
+        useExact = ~(inside & np.isfinite(inductance) & np.isfinite(errorBound)) # outside the table, or in a cell with impossible coils
+        if(np.any(useExact)):
+            inductance = np.array(inductance);  errorBound = np.array(errorBound) # (writable copies, also for 0-dimensional input)
+            if(self.formula == 'greenhouse'): # (the batch function handles the numerical loop and the copper thickness)
+                inductance[useExact] = calcCoilBatch(turns[useExact], diam[useExact], clearance[useExact], traceWidth[useExact], 1, 1.6, copperThickness[useExact], self.shape, self.formula)['inductanceSingleLayer']
+            else:
+                inductance[useExact] = calcInductanceSingleLayer(turns[useExact], diam[useExact], clearance[useExact], traceWidth[useExact], self.shape, self.formula)
+            errorBound[useExact] = 0.0
+        return((inductance, errorBound) if returnErrorBound else inductance)
+
+    def __repr__(self):
+        return("surrogate("+self.shape.__class__.__name__+", "+self.formula+", grid="+str(tuple([len(nodes) for nodes in self.nodes]))+")")
+
+_loadedSurrogates: dict[tuple, surrogateClass] = {}
+def getSurrogate(shape: _shapeBaseClass|str, formula: str, silent: bool = False) -> surrogateClass:
+    """ (macro) the surrogateClass (with the default grid) of a shape+formula, only loaded/made once per session """
+    shape = (shapes[shape] if isinstance(shape, str) else shape)
+    key = (shape.__class__.__name__, formula, tuple(shape.formulaCoefficients.get(formula, ()))) # (a new table is needed when the coefficients change, see PCBcoilV2.loadCoefficientSet())
+    if(key not in _loadedSurrogates):  _loadedSurrogates[key] = surrogateClass(shape, formula, silent=silent)
+    return(_loadedSurrogates[key])
+
+
+if __name__ == "__main__": # an example of how this file may be used
+    from PCBcoilV2 import calcInductanceSingleLayer
+    for shapeName in shapes:
+        surrogate = getSurrogate(shapeName, 'cur_sheet')
+        rng = np.random.default_rng(0)
+        turns = rng.integers(1, 40, 1000000);  diam = rng.uniform(5, 100, len(turns));  clearance = rng.uniform(0.1, 0.5, len(turns));  traceWidth = rng.uniform(0.1, 2.0, len(turns))
+        diam = np.maximum(diam, 2.2*turns*(clearance+traceWidth)) # (mostly possible coils, the impossible ones are calculated exactly anyway)
+        queryStartTime = time.time()
+        inductance, errorBound = surrogate.calcInductanceSingleLayer(turns, diam, clearance, traceWidth, returnErrorBound=True)
+        queryTime = time.time()-queryStartTime
+        exactStartTime = time.time()
+        exact = calcInductanceSingleLayer(turns, diam, clearance, traceWidth, shapes[shapeName], 'cur_sheet')
+        exactTime = time.time()-exactStartTime
+        valid = (exact > 0) & np.isfinite(exact)
+        actualError = np.abs(inductance[valid]/exact[valid] - 1)
+        print(shapeName, "surrogate:", round(queryTime, 3), "s, exact:", round(exactTime, 3), "s, max. actual error:", np.max(actualError), "max. error bound:", np.max(errorBound[valid]), "within bound:", np.mean(actualError <= errorBound[valid]))
@@ -0,0 +1,285 @@
+"""
+this file is a (declarative) design-space sweep engine, it replaces the big nested for-loops (see excelExporter.py's __main__)
+you give it a list/range of values for each coil parameter, and it evaluates the Cartesian product of all of them.
+The designs are evaluated in chunks with the vectorized calcCoilBatch() from PCBcoilV2, sothat memory use is bounded (no coilClass objects are made),
+ and every chunk is filtered and then passed on to a sink (a function that does something with the results, like saving them to a file)
+
+the chunks are dicts of 1D numpy arrays, with the same keys as calcCoilBatch() returns, plus the parameters themselves ('turns', 'diam', etc.),
+ and the 'shape' (_shapeBaseClass object) and 'formula' (str), which are the same for the whole chunk.
+
+parallelSweep() does the same, but spreads the chunks over multiple processes, which write their results directly to shared memory (instead of pickling them back)
+
+TODO:
+- (maybe) more built-in sinks, like directly to a .xlsx file (pandas can't really append to an excel file though)
+"""
+
+import numpy as np
+import os
+from multiprocessing import shared_memory
+from concurrent.futures import ProcessPoolExecutor
+from typing import Callable # just for type-hints to provide some nice syntax colering
+
+from PCBcoilV2 import calcCoilBatch, coilClass, shapes, ozCopperToMM, _shapeBaseClass, layerStackClass
+
+defaultChunkSize: int = 2**18 # number of designs evaluated at once. ~250k designs is ~30MB of arrays per chunk, which is fast and still fits in memory easily
+
+sweepParameterNames: tuple[str] = ('turns', 'diam', 'clearance', 'traceWidth', 'layers', 'PCBthickness', 'copperThickness') # the numerical parameters (same names as calcCoilBatch() arguments)
+
+## some basic filters. A filter is any function that takes a chunk and returns a boolean array (True for designs to keep)
+filterPositiveInnerDiam: Callable[[dict[str,np.ndarray]], np.ndarray] = lambda chunk : (chunk['trueInnerDiam'] > 0.0) # discard coils where the spiral goes past its own center
+filterValidInductance: Callable[[dict[str,np.ndarray]], np.ndarray] = lambda chunk : (np.isfinite(chunk['inductance']) & (chunk['inductance'] > 0.0)) # discard NaN and negative results
+def filterInductanceRange(minInductance: float = 0.0, maxInductance: float = np.inf) -> Callable[[dict[str,np.ndarray]], np.ndarray]:
+    """ returns a filter that only keeps designs with an inductance (in Henry) between min and max """
+    return(lambda chunk : ((chunk['inductance'] >= minInductance) & (chunk['inductance'] <= maxInductance)))
+def filterMaxResistance(maxResistance: float) -> Callable[[dict[str,np.ndarray]], np.ndarray]:
+    """ returns a filter that only keeps designs with a resistance (in Ohms) below maxResistance """
+    return(lambda chunk : (chunk['resistance'] <= maxResistance))
+def filterSRFoutsideBand(minFrequency: float, maxFrequency: float = None, margin: float = 1.0) -> Callable[[dict[str,np.ndarray]], np.ndarray]:
+    """ returns a filter that discards designs that (may) self-resonate in/near the operating band (in Hz), i.e. with an SRF between (minFrequency/margin) and (maxFrequency*margin)
+        if maxFrequency is None, the SRF must be above the band: everything below (minFrequency*margin) is discarded, e.g. filterSRFoutsideBand(13.56e6, margin=3.0) keeps coils that resonate above ~40MHz """
+    if(maxFrequency is None):  return(lambda chunk : (chunk['SRF'] >= (minFrequency*margin)))
+    return(lambda chunk : ((chunk['SRF'] < (minFrequency/margin)) | (chunk['SRF'] > (maxFrequency*margin)))) # (NaN compares as False, so unknown SRFs are discarded too)
+def filterMinQ(minQ: float) -> Callable[[dict[str,np.ndarray]], np.ndarray]:
+    """ returns a filter that only keeps designs with a Q factor of at least minQ at every one of the swept frequencies (only works for sweeps with frequencies, see sweep()) """
+    return(lambda chunk : np.all(chunk['Q'] >= minQ, axis=-1))
+
+## some basic sinks. A sink is any function that takes a (filtered) chunk. It's called once for every chunk
+class collectSink:
+    """ a sink that just keeps all the chunks in memory (only use this if the (filtered) results are not too big) """
+    def __init__(self):
+        self.chunks: list[dict[str,np.ndarray]] = []
+    def __call__(self, chunk: dict[str,np.ndarray]):
+        self.chunks.append(chunk)
+    def __len__(self) -> int:
+        return(sum([len(chunk['turns']) for chunk in self.chunks]))
+    def result(self) -> dict[str,np.ndarray]:
+        """ concatenate all chunks into one dict of arrays ('shape' and 'formula' become arrays of objects/strings) """
+        if(len(self.chunks) == 0):  return({})
+        output: dict[str,np.ndarray] = {}
+        for key in self.chunks[0]:
+            if(isinstance(self.chunks[0][key], np.ndarray)):
+                output[key] = np.concatenate([chunk[key] for chunk in self.chunks])
+            else: # 'shape' and 'formula' are stored once per chunk
+                output[key] = np.concatenate([np.full(len(chunk['turns']), chunk[key], dtype=object) for chunk in self.chunks])
+        return(output)
+    def toCoilList(self) -> list[coilClass]:
+        """ make a coilClass object for every design (e.g. for excelExporter.exportCoils()). Only do this for small results! """
+        return([coilClass(turns=int(chunk['turns'][i]), diam=float(chunk['diam'][i]), clearance=float(chunk['clearance'][i]), traceWidth=float(chunk['traceWidth'][i]), layers=int(chunk['layers'][i]),
+                          PCBthickness=float(chunk['PCBthickness'][i]), copperThickness=float(chunk['copperThickness'][i]), shape=chunk['shape'], formula=chunk['formula'])
+                for chunk in self.chunks for i in range(len(chunk['turns']))])
+
+class bestSink(collectSink):
+    """ a sink that only keeps the (count) best designs, according to a scoring function (lower is better, NaN is discarded)
+        the score is stored in the chunks as 'score' """
+    def __init__(self, scoreFunc: Callable[[dict[str,np.ndarray]], np.ndarray], count: int):
+        super().__init__()
+        self.scoreFunc = scoreFunc
+        self.count = count
+    def __call__(self, chunk: dict[str,np.ndarray]):
+        chunk['score'] = self.scoreFunc(chunk)
+        self.chunks.append(chunk)
+        if(len(self) > (2*self.count)):  self._prune() # (pruning every now and then is a lot cheaper than pruning every chunk)
+    def _prune(self):
+        """ discard everything that is not in the top (count) """
+        if(len(self.chunks) == 0):  return
+        allScores = np.concatenate([chunk['score'] for chunk in self.chunks])
+        if(len(allScores) <= self.count):  return
+        threshold = np.partition(allScores, self.count-1)[self.count-1] # the score of the (count)-th best design (NaNs are sorted to the end by np.partition)
+        if(np.isnan(threshold)):  threshold = np.inf # fewer than (count) valid scores, just discard the NaNs
+        prunedChunks: list[dict[str,np.ndarray]] = []
+        for chunk in self.chunks:
+            keep = (chunk['score'] <= threshold)
+            if(np.any(keep)):
+                prunedChunks.append({key : (chunk[key][keep] if isinstance(chunk[key], np.ndarray) else chunk[key]) for key in chunk})
+        self.chunks = prunedChunks
+    def result(self) -> dict[str,np.ndarray]:
+        """ concatenate the best designs into one dict of arrays, sorted by score (best first) """
+        self._prune()
+        output = super().result()
+        if(len(output) == 0):  return(output)
+        order = np.argsort(output['score'], kind='stable')[:self.count] # (ties may have let a few extra designs through the pruning)
+        return({key : output[key][order] for key in output})
+
+class csvSink:
+    """ a sink that streams all results to a .csv file (one row per design), without keeping anything in memory """
+    def __init__(self, filename: str, columns: tuple[str] = None, floatFormat: str = '%.9g'):
+        self.filename = filename
+        self.columns = columns # None means: all the numerical columns in the (first) chunk
+        self.floatFormat = floatFormat
+        self._file = None
+    def __call__(self, chunk: dict[str,np.ndarray]):
+        if(self._file is None): # first chunk, open the file and write the header
+            if(self.columns is None):  self.columns = tuple([key for key in chunk if (isinstance(chunk[key], np.ndarray) and (chunk[key].ndim == 1))]) # (the per-frequency results don't fit in 1 column)
+            self._file = open(self.filename, 'w', newline='')
+            self._file.write(','.join(('shape', 'formula') + tuple(self.columns)) + '\n')
+        rowFormat = chunk['shape'].__class__.__name__ + ',' + chunk['formula'] + ',' + ','.join([self.floatFormat]*len(self.columns)) # the shape and formula are the same for the whole chunk
+        np.savetxt(self._file, np.column_stack([chunk[key] for key in self.columns]), fmt=rowFormat)
+    def close(self):
+        if(self._file is not None):
+            self._file.close()
+    def __enter__(self):
+        return(self)
+    def __exit__(self, *args):
+        self.close()
+
+
+def _asShapeList(shape: _shapeBaseClass|str|list) -> list[_shapeBaseClass]:
+    """ accept a single shape, a key from the 'shapes' dict, or a list of either """
+    shapeList = (list(shape) if isinstance(shape, (list, tuple)) else [shape,])
+    return([(shapes[entry] if isinstance(entry, str) else entry) for entry in shapeList])
+
+def sweepSize(*paramValues) -> int:
+    """ the number of designs in the Cartesian product of all the parameter lists provided """
+    return(int(np.prod([np.size(values) for values in paramValues])))
+
+def _gridParamValues(turns, diam, clearance, traceWidth, layers, PCBthickness, copperThickness, layerStack: layerStackClass) -> tuple[list[np.ndarray], layerStackClass]:
+    """ the list of values for each dimension of the grid. If a layerStack is used, (layers, PCBthickness, copperThickness) are replaced by 1 dimension: the index of the stack-up """
+    if(layerStack is None):
+        return([np.atleast_1d(np.asarray(values)) for values in (turns, diam, clearance, traceWidth, layers, PCBthickness, copperThickness)], None)
+    if(layerStack.copperThicknesses.ndim == 1):  layerStack = layerStackClass(layerStack.copperThicknesses[None], layerStack.dielectricThicknesses[None]) # (a single stack-up)
+    return([np.atleast_1d(np.asarray(values)) for values in (turns, diam, clearance, traceWidth)] + [np.arange(len(layerStack))], layerStack)
+
+def _gridChunk(paramValues: list[np.ndarray], chunkStart: int, chunkEnd: int, layerStack: layerStackClass) -> tuple[dict[str,np.ndarray], layerStackClass]:
+    """ the parameters of designs [chunkStart, chunkEnd) of the grid (and the stack-ups of those designs, if a layerStack is used) """
+    gridIndices = np.unravel_index(np.arange(chunkStart, chunkEnd), tuple([len(values) for values in paramValues])) # convert the flat index range to an index for each parameter list
+    chunk: dict[str,np.ndarray] = {name : values[indices] for (name, values, indices) in zip(sweepParameterNames, paramValues, gridIndices)}
+    if(layerStack is None):  return(chunk, None)
+    chunkStack = layerStack[gridIndices[4]]
+    chunk.update({'layers' : np.full(chunkEnd-chunkStart, layerStack.layers), 'PCBthickness' : chunkStack.PCBthickness, 'copperThickness' : chunkStack.copperThicknesses[:,0], 'layerStackIndex' : gridIndices[4]})
+    return(chunk, chunkStack)
+
+def _filterAndSink(chunk: dict[str,np.ndarray], shapeObj: _shapeBaseClass, formulaStr: str, filters: list[Callable], sink: Callable[[dict[str,np.ndarray]], None]) -> int:
+    """ apply all filters to an (evaluated) chunk, and pass what remains to the sink. Returns the number of designs passed to the sink """
+    if(len(filters) > 0):
+        keep = np.ones(len(chunk['turns']), dtype=bool)
+        for filterFunc in filters:
+            keep &= filterFunc(chunk)
+        if(not np.all(keep)):
+            chunk = {key : chunk[key][keep] for key in chunk}
+    if(len(chunk['turns']) == 0):  return(0)
+    chunk['shape'] = shapeObj;  chunk['formula'] = formulaStr
+    sink(chunk)
+    return(len(chunk['turns']))
+
+def sweep(turns: list[int], diam: list[float], clearance: list[float], traceWidth: list[float], layers: list[int] = (1,), PCBthickness: list[float] = (1.6,), copperThickness: list[float] = (ozCopperToMM(1.0),),
+          shape: list[_shapeBaseClass] = (shapes['circle'],), formula: list[str] = ('cur_sheet',), filters: list[Callable] = (), sink: Callable[[dict[str,np.ndarray]], None] = None, chunkSize: int = defaultChunkSize,
+          layerStack: layerStackClass = None, frequencies: list[float] = None, useSurrogate: bool = False, cache: 'resultCacheClass' = None) -> int:
+    """ evaluate every combination of the given parameter values (lists, tuples, ranges or 1D arrays, single values are fine too)
+        designs are evaluated in chunks of (at most) chunkSize, every filter is applied to each chunk, and what remains is passed to sink(chunk)
+        shape/formula combinations that don't exist (e.g. 'monomial' for a circularSpiral) are skipped
+        if a layerStack is provided (one or more stack-ups, see PCBcoilV2.layerStackClass), every stack-up is tried instead of the layers/PCBthickness/copperThickness lists,
+         and the chunks get an extra 'layerStackIndex' column
+        if frequencies (in Hz) are provided, the chunks also get the 'ACresistance' and 'Q' columns, which are 2D: (designs, frequencies), see calcCoilBatch()
+        if useSurrogate, the single-layer inductance is interpolated from a lookup table (see surrogateModel.py), which is made (or loaded) for every shape+formula
+        if a cache (see resultCache.py) is provided, only the designs that are not in it are calculated (and then stored in it)
+        returns the number of designs that were passed to the sink """
+    if(sink is None):  print("sweep() has no sink, the results will be discarded!");  sink = lambda chunk : None
+    paramValues, layerStack = _gridParamValues(turns, diam, clearance, traceWidth, layers, PCBthickness, copperThickness, layerStack)
+    gridSize = sweepSize(*paramValues)
+    batchFunc = (cache.calcCoilBatch if (cache is not None) else calcCoilBatch) # (the same arguments and results)
+    designCount = 0
+    for shapeObj in _asShapeList(shape):
+        for formulaStr in (list(formula) if isinstance(formula, (list, tuple)) else [formula,]):
+            if(formulaStr not in shapeObj.formulaCoefficients):  print("sweep() skipping shape=", shapeObj, " and formula=", formulaStr, "(formula not in formulaCoefficients)");  continue
+            surrogate = None
+            if(useSurrogate):
+                import surrogateModel # (only imported when needed)
+                surrogate = surrogateModel.getSurrogate(shapeObj, formulaStr)
+            for chunkStart in range(0, gridSize, chunkSize):
+                chunk, chunkStack = _gridChunk(paramValues, chunkStart, min(chunkStart+chunkSize, gridSize), layerStack)
+                chunk.update(batchFunc(*[chunk[name] for name in sweepParameterNames], shape=shapeObj, formula=formulaStr, layerStack=chunkStack, frequencies=frequencies, surrogate=surrogate))
+                designCount += _filterAndSink(chunk, shapeObj, formulaStr, filters, sink)
+    return(designCount)
+
+
+## multi-process sweeping:
+parallelResultColumns: tuple[str] = ('simpleInnerDiam', 'trueInnerDiam', 'trueDiam', 'layerSpacing', 'traceLength', 'resistance', 'inductanceSingleLayer', 'inductance', 'capacitance', 'SRF') # the calcCoilBatch() results that the workers write to shared memory
+
+_workerSharedMemory: shared_memory.SharedMemory = None # (only used inside the worker processes)
+_workerBuffer: np.ndarray = None
+_workerParamValues: list[np.ndarray] = None
+_workerLayerStack: layerStackClass = None
+
+def _parallelWorkerInit(sharedMemoryName: str, bufferShape: tuple[int], paramValues: list[np.ndarray], layerStack: layerStackClass):
+    """ runs once in every worker process: attach to the shared result buffer """
+    global _workerSharedMemory, _workerBuffer, _workerParamValues, _workerLayerStack
+    _workerSharedMemory = shared_memory.SharedMemory(name=sharedMemoryName) # (the worker processes share the resource_tracker of the main process, so attaching does not register the memory twice)
+    _workerBuffer = np.ndarray(bufferShape, dtype=np.float64, buffer=_workerSharedMemory.buf)
+    _workerParamValues = paramValues
+    _workerLayerStack = layerStack
+
+def _parallelWorkerTask(slot: int, bufferOffset: int, chunkStart: int, chunkEnd: int, shapeObj: _shapeBaseClass, formulaStr: str) -> int:
+    """ evaluate designs [chunkStart, chunkEnd) of the grid, and write the results directly to the shared buffer (instead of pickling them back) """
+    chunk, chunkStack = _gridChunk(_workerParamValues, chunkStart, chunkEnd, _workerLayerStack)
+    results = calcCoilBatch(*[chunk[name] for name in sweepParameterNames], shape=shapeObj, formula=formulaStr, layerStack=chunkStack)
+    for (column, key) in enumerate(parallelResultColumns):
+        _workerBuffer[slot, column, bufferOffset:bufferOffset+(chunkEnd-chunkStart)] = results[key]
+    return(chunkEnd-chunkStart)
+
+def parallelSweep(turns: list[int], diam: list[float], clearance: list[float], traceWidth: list[float], layers: list[int] = (1,), PCBthickness: list[float] = (1.6,), copperThickness: list[float] = (ozCopperToMM(1.0),),
+                  shape: list[_shapeBaseClass] = (shapes['circle'],), formula: list[str] = ('cur_sheet',), filters: list[Callable] = (), sink: Callable[[dict[str,np.ndarray]], None] = None,
+                  chunkSize: int = defaultChunkSize, workers: int = None, layerStack: layerStackClass = None) -> int:
+    """ the same as sweep(), but the evaluation is spread over (workers) processes (default: all CPU cores)
+        the grid is split into contiguous shards of chunkSize, which are handed out in order, and the results are written to a shared memory block.
+        the filters and the sink are run in this (main) process, in the same (deterministic) order as sweep(), so the sink receives exactly the same chunks.
+        (the per-frequency results (see sweep()) are not supported here, as the shared buffer has a fixed number of columns)
+        NOTE: on Windows (and MacOS), this must be called from within an 'if __name__ == "__main__":' block (and the filters/sink can be anything, as they're not sent to the workers)
+        returns the number of designs that were passed to the sink """
+    if(sink is None):  print("parallelSweep() has no sink, the results will be discarded!");  sink = lambda chunk : None
+    workers = (os.cpu_count() if (workers is None) else max(int(workers), 1))
+    paramValues, layerStack = _gridParamValues(turns, diam, clearance, traceWidth, layers, PCBthickness, copperThickness, layerStack)
+    gridSize = sweepSize(*paramValues)
+    combinations: list[tuple[_shapeBaseClass,str]] = []
+    for shapeObj in _asShapeList(shape):
+        for formulaStr in (list(formula) if isinstance(formula, (list, tuple)) else [formula,]):
+            if(formulaStr not in shapeObj.formulaCoefficients):  print("parallelSweep() skipping shape=", shapeObj, " and formula=", formulaStr, "(formula not in formulaCoefficients)");  continue
+            combinations.append((shapeObj, formulaStr))
+    ## a batch is (workers) chunks. There are 2 buffer slots, sothat the workers can evaluate the next batch while the main process filters the current one
+    shards: list[tuple[_shapeBaseClass,str,int,int]] = [(shapeObj, formulaStr, chunkStart, min(chunkStart+chunkSize, gridSize)) for (shapeObj, formulaStr) in combinations for chunkStart in range(0, gridSize, chunkSize)]
+    batches: list[list[tuple]] = [shards[i:i+workers] for i in range(0, len(shards), workers)]
+    if(len(batches) == 0):  return(0)
+    batchCapacity = workers*min(chunkSize, gridSize)
+    bufferShape = (2, len(parallelResultColumns), batchCapacity)
+    sharedMemory = shared_memory.SharedMemory(create=True, size=int(np.prod(bufferShape))*np.dtype(np.float64).itemsize)
+    designCount = 0;  buffer: np.ndarray = None
+    try:
+        buffer = np.ndarray(bufferShape, dtype=np.float64, buffer=sharedMemory.buf)
+        with ProcessPoolExecutor(max_workers=workers, initializer=_parallelWorkerInit, initargs=(sharedMemory.name, bufferShape, paramValues, layerStack)) as executor:
+            def submitBatch(batchIndex: int) -> list:
+                offsets = np.cumsum([0] + [(chunkEnd-chunkStart) for (_, _, chunkStart, chunkEnd) in batches[batchIndex]])
+                return([executor.submit(_parallelWorkerTask, batchIndex%2, int(offsets[i]), chunkStart, chunkEnd, shapeObj, formulaStr) for (i, (shapeObj, formulaStr, chunkStart, chunkEnd)) in enumerate(batches[batchIndex])])
+            pending = submitBatch(0)
+            for batchIndex in range(len(batches)):
+                for future in pending:  future.result() # wait for the whole batch (and raise any exceptions from the workers)
+                pending = (submitBatch(batchIndex+1) if ((batchIndex+1) < len(batches)) else []) # (the other slot is free, as its batch was already filtered)
+                bufferOffset = 0
+                for (shapeObj, formulaStr, chunkStart, chunkEnd) in batches[batchIndex]:
+                    chunk, _ = _gridChunk(paramValues, chunkStart, chunkEnd, layerStack)
+                    chunk.update({key : buffer[batchIndex%2, column, bufferOffset:bufferOffset+(chunkEnd-chunkStart)].copy() for (column, key) in enumerate(parallelResultColumns)}) # (copied, because the slot will be overwritten)
+                    bufferOffset += (chunkEnd-chunkStart)
+                    designCount += _filterAndSink(chunk, shapeObj, formulaStr, filters, sink)
+    finally:
+        buffer = None # (the shared memory can't be closed while there are still numpy arrays using it)
+        sharedMemory.close()
+        sharedMemory.unlink()
+    return(designCount)
+
+
+if __name__ == "__main__": # an example of how this file may be used
+    import time
+    sweepParams = {'turns' : range(1, 31), 'diam' : np.arange(10, 51, 1.0), 'clearance' : np.arange(0.1, 0.51, 0.05), 'traceWidth' : np.arange(0.2, 2.01, 0.1),
+                   'layers' : (1,2,4,6), 'PCBthickness' : (0.6, 0.8, 1.2, 1.6), 'copperThickness' : (0.018, 0.035)}
+    sweepStartTime = time.time()
+    results = collectSink()
+    designCount = sweep(**sweepParams, shape=list(shapes.values()), formula=('wheeler', 'cur_sheet'),
+                        filters=(filterPositiveInnerDiam, filterValidInductance, filterInductanceRange(9.5e-6, 10.5e-6)), sink=results) # find all ~10uH coils
+    print("sweep of", sweepSize(*sweepParams.values())*len(shapes)*2, "designs took", round(time.time()-sweepStartTime, 2), "seconds,", designCount, "designs passed the filters")
+    result = results.result()
+    if(designCount > 0):
+        best = np.argmin(result['resistance'])
+        print("lowest resistance 10uH coil:", {key : result[key][best] for key in result})
+    sweepStartTime = time.time()
+    parallelResults = collectSink()
+    parallelSweep(**sweepParams, shape=list(shapes.values()), formula=('wheeler', 'cur_sheet'),
+                  filters=(filterPositiveInnerDiam, filterValidInductance, filterInductanceRange(9.5e-6, 10.5e-6)), sink=parallelResults)
+    print("parallelSweep() with", os.cpu_count(), "workers took", round(time.time()-sweepStartTime, 2), "seconds, same results:", all([np.array_equal(parallelResults.result()[key], result[key]) for key in result]))